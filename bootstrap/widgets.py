@@ -261,8 +261,10 @@ class ButtonGroup(forms.RadioSelect):
         return data.get(name, None)
 
 class Typeahead(forms.TextInput):
-    def __init__(self, prefetch_url="", *args, **kwargs):
+    def __init__(self, prefetch_url="", remote_url="", *args, **kwargs):
+        # A prefetch URL returns every suggestion at once, while a remote URL is searched as the user types.
         self.prefetch_url = prefetch_url
+        self.remote_url = remote_url
 
         super(Typeahead, self).__init__(*args, **kwargs)
 
@@ -272,6 +274,8 @@ class Typeahead(forms.TextInput):
         attrs['class'] = " ".join(class_attr)
         if self.prefetch_url:
             attrs['data-prefetch'] = self.prefetch_url
+        if self.remote_url:
+            attrs['data-remote'] = self.remote_url
         return super(Typeahead, self).render(name, value, attrs=attrs)
 
     class Media:
@@ -0,0 +1,140 @@
+from __future__ import unicode_literals
+
+from django.test import SimpleTestCase
+
+from lxml import etree
+
+from .word_document import WordDocument, TrackableObject, AbstractNum, Num
+
+import docx
+import gc
+import io
+import os
+import threading
+import weakref
+import zipfile
+
+
+def build_question_document(number_of_questions):
+	'''Builds a document laid out like a block export, with a list of options and of explanations for each question.'''
+	doc = WordDocument()
+	doc.add_heading("Questions")
+
+	def add_questions():
+		for n in range(number_of_questions):
+			doc.add_paragraph("Question %d" % (n + 1))
+			doc.add_list_html(["<p>Option <b>%s</b></p>" % letter for letter in "ABCDE"])
+			doc.add_list(["Explanation %s" % letter for letter in "ABCDE"])
+			yield n
+
+	return doc, zipfile.ZipFile(doc.save_to_temporary_file(add_questions()))
+
+
+def template_snapshot():
+	# The size and modification time of every file in the docx template.
+	snapshot = {}
+	for dirpath, dirnames, filenames in os.walk(docx.template_dir):
+		for filename in filenames:
+			path = os.path.join(dirpath, filename)
+			snapshot[path] = (os.path.getsize(path), os.path.getmtime(path))
+	return snapshot
+
+
+class DocumentPartSizeTest(SimpleTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super(DocumentPartSizeTest, cls).setUpClass()
+		doc, cls.small_archive = build_question_document(1)
+		doc, cls.large_archive = build_question_document(2000)
+
+	def test_styles_are_a_constant_size(self):
+		# Every list shares one paragraph style, so the styles don't grow with the number of questions.
+		self.assertEqual(self.small_archive.getinfo('word/styles.xml').file_size, self.large_archive.getinfo('word/styles.xml').file_size)
+		self.assertEqual(self.large_archive.read('word/styles.xml').count(b'w:styleId="ListUpperLetter"'), 1)
+
+	def test_numbering_adds_one_num_per_list(self):
+		# Each list only adds a num which restarts the lettering, and they all share the same abstractNum.
+		small_numbering = self.small_archive.read('word/numbering.xml')
+		large_numbering = self.large_archive.read('word/numbering.xml')
+
+		self.assertEqual(large_numbering.count(b'<w:abstractNum '), small_numbering.count(b'<w:abstractNum '))
+		self.assertEqual(large_numbering.count(b'<w:num ') - small_numbering.count(b'<w:num '), 2 * 1999)
+
+
+class ConcurrentBuildTest(SimpleTestCase):
+	def assertValidDocument(self, archive, number_of_questions):
+		self.assertIsNone(archive.testzip())
+		parts = dict((name, etree.fromstring(archive.read(name))) for name in archive.namelist() if name.endswith('.xml') or name.endswith('.rels'))
+
+		namespaces = {'w': docx.nsprefixes['w']}
+		body, numbering = parts['word/document.xml'], parts['word/numbering.xml']
+		questions = [text for text in body.xpath('//w:t/text()', namespaces=namespaces) if text.startswith("Question ")]
+		self.assertEqual(len(questions), number_of_questions)
+		# Every list in the document must refer to a num which was written to its own numbering.
+		used_num_ids = set(body.xpath('//w:numPr/w:numId/@w:val', namespaces=namespaces))
+		defined_num_ids = set(numbering.xpath('/w:numbering/w:num/@w:numId', namespaces=namespaces))
+		self.assertEqual(len(used_num_ids), 2 * number_of_questions)
+		self.assertTrue(used_num_ids <= defined_num_ids)
+
+	def test_parallel_builds_are_valid(self):
+		template_before = template_snapshot()
+		# Each thread builds a document with a different number of questions, so any mixing between them shows up.
+		question_counts = [150, 151, 152, 153]
+		archives = {}
+		errors = []
+
+		def build(number_of_questions):
+			try:
+				doc, archives[number_of_questions] = build_question_document(number_of_questions)
+			except Exception as e:
+				errors.append(e)
+
+		threads = [threading.Thread(target=build, args=(number_of_questions, )) for number_of_questions in question_counts]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(errors, [])
+		for number_of_questions in question_counts:
+			self.assertValidDocument(archives[number_of_questions], number_of_questions)
+		self.assertEqual(template_snapshot(), template_before)
+
+	def test_save_writes_to_a_file_object(self):
+		template_before = template_snapshot()
+		doc = WordDocument()
+		doc.add_paragraph("Question 1")
+		doc.add_list(["Option A", "Option B"])
+		doc.add_list(["Explanation A", "Explanation B"])
+		out = io.BytesIO()
+		doc.save(out)
+
+		out.seek(0)
+		self.assertValidDocument(zipfile.ZipFile(out), 1)
+		self.assertEqual(template_snapshot(), template_before)
+
+
+class DocumentReleaseTest(SimpleTestCase):
+	def test_many_documents_release_their_objects(self):
+		# Builds documents one after another as a long running worker would. Each document allocates its own ids and
+		# lets go of them once it is saved, so nothing builds up between documents.
+		first_numbering = None
+		document_references = []
+		for n in range(1000):
+			doc, archive = build_question_document(2)
+			numbering = archive.read('word/numbering.xml')
+			if first_numbering is None:
+				first_numbering = numbering
+
+			# The ids start again for every document, so the last document is numbered the same as the first.
+			self.assertEqual(numbering, first_numbering)
+			self.assertEqual(doc._latest_ids, {})
+			self.assertEqual(doc._tracked_objects, {})
+			document_references.append(weakref.ref(doc))
+			del doc, archive
+
+		gc.collect()
+		self.assertEqual([reference for reference in document_references if reference() is not None], [])
+		for object_type in (TrackableObject, AbstractNum, Num):
+			self.assertFalse(hasattr(object_type, '_latest_id'))
+			self.assertFalse(hasattr(object_type, '_cache'))
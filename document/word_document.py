@@ -2,13 +2,72 @@ from __future__ import unicode_literals
 
 from lxml import etree
 import docx
-import cStringIO as StringIO
 import zipfile
+import threading
+import itertools
+import tempfile
 import os
 import bs4
 
 CURRENT_PATH = os.path.dirname(os.path.realpath(__file__ ))
 
+# The styles and numbering are generated for each document, so the copies in the template are never used.
+GENERATED_PARTS = ['word/styles.xml', 'word/numbering.xml']
+FILES_TO_IGNORE = ['.DS_Store', 'stylesBase.xml', 'numberingBase.xml']
+
+_template_parts = None
+_base_parts = {}
+_template_lock = threading.Lock()
+
+
+def get_template_parts():
+	'''Returns the archive name and contents of each static file in the docx template, which are read once per process.'''
+	global _template_parts
+	if _template_parts is None:
+		with _template_lock:
+			if _template_parts is None:
+				parts = []
+				for dirpath, dirnames, filenames in os.walk(docx.template_dir):
+					for filename in filenames:
+						templatefile = os.path.join(dirpath, filename)
+						archivename = os.path.relpath(templatefile, docx.template_dir).replace(os.sep, '/')
+						if filename in FILES_TO_IGNORE or archivename in GENERATED_PARTS:
+							continue
+						with open(templatefile, 'rb') as f:
+							parts.append((archivename, f.read()))
+				_template_parts = parts
+	return _template_parts
+
+
+def get_base_tree(filename):
+	'''Returns a new tree for one of the base style or numbering files, which are read once per process.'''
+	if filename not in _base_parts:
+		with _template_lock:
+			if filename not in _base_parts:
+				with open(os.path.join(CURRENT_PATH, filename), 'rb') as f:
+					_base_parts[filename] = f.read()
+	return etree.ElementTree(etree.fromstring(_base_parts[filename]))
+
+
+def write_docx(out, treesandfiles, files=()):
+	'''
+	Writes a docx archive containing the given trees and the static template files to a file-like object.
+	files is a list of paths and archive names for parts which have already been written to disk.
+	'''
+	document_file = zipfile.ZipFile(out, mode='w', compression=zipfile.ZIP_DEFLATED)
+
+	for tree, archivename in treesandfiles:
+		treestring = etree.tostring(tree, encoding="UTF-8", pretty_print=True, standalone=True)
+		document_file.writestr(archivename, treestring)
+
+	for path, archivename in files:
+		document_file.write(path, archivename)
+
+	for archivename, contents in get_template_parts():
+		document_file.writestr(archivename, contents)
+
+	document_file.close()
+
 # A hack for creating the base style and numbering files.
 # Eventually replace this by generating the numbering and style files from scratch.
 INITIAL_NUMID = 13
@@ -46,30 +105,22 @@ def generate_wordrelationships(relationshiplist):
 
 
 class TrackableObject(object):
-	_latest_id = 0
+	# Ids are allocated by the document which the object belongs to, starting after initial_id.
+	initial_id = 0
 
 	def __init__(self, document=None):
-		if not hasattr(type(self), "_cache"):
-			type(self)._cache = {}
-
-		type(self)._latest_id += 1
-		self.id = type(self)._latest_id
-		self._add_to_list(self)
-
 		self.document = document
+		self.id = document.track_object(self)
 
 	def namespace_string(self, s):
 		return self.document.namespace_string(s)
 
-	def _add_to_list(self, instance):
-		self._cache[instance.id] = instance
-
 
 class AbstractNum(TrackableObject):
 	# Add an abstractNum element to the numbering.xml file.
 	# Describes the properties of a numberedList.
 
-	_latest_id = 11
+	initial_id = INITIAL_ABSTRACT_NUMID - 1
 
 	BULLET_FORMAT = "bullet"
 	DECIMAL_FORMAT = "decimal"
@@ -135,7 +186,7 @@ class AbstractNum(TrackableObject):
 
 
 class Num(TrackableObject):
-	_latest_id = 13
+	initial_id = INITIAL_NUMID
 
 	# Add a num element to the numbering.xml file.
 	# Describes a specific instance of a number based on an abstractNum element.
@@ -335,22 +386,13 @@ class List(DocumentElement):
 
 
 	def add_styles(self, style_tree, numbering_tree, abstractNum=None):
-		# Add a num element to the numbering.xml file.
+		# Every list shares the same paragraph style (defined in stylesBase.xml) and abstractNum. Word only restarts
+		# the lettering for a new num element, so each list adds a small num which overrides the starting letter,
+		# and its paragraphs refer to the num directly.
 		num_element = Num(abstractNum=abstractNum, document=self.document)
 		num_element.as_element(numbering_tree)
 
 		self.num_id = num_element.id
-		self.style = "%s%s" % (self.style, num_element.id)
-
-		# Add a style element to the style.xml file
-		style_element = etree.SubElement(style_tree, self.namespace_string("style"))
-		style_element.attrib[self.namespace_string("styleId")] = self.style
-		style_element.attrib[self.namespace_string("type")] = "paragraph"
-		pPr_element = etree.SubElement(style_element, self.namespace_string("pPr"))
-		numPr_element = etree.SubElement(pPr_element, self.namespace_string("numPr"))
-		numId_element = etree.SubElement(numPr_element, self.namespace_string("numId"))
-		numId_element.attrib[self.namespace_string('val')] = str(num_element.id)
-		etree.SubElement(pPr_element, self.namespace_string("contextualSpacing"))
 
 			# if element.name == "p":
 			# 	p = Paragraph(document=self)
@@ -419,14 +461,38 @@ class WordDocument(object):
 	def __init__(self):
 		self._document_elements = []
 		self._relationships = []
-		self._nums = []
-		self._abstract_nums = []
+		self._latest_ids = {}
+		self._tracked_objects = {}
 		self._document = None
+		self._styles = None
+		self._numbering = None
+		self._abstract_num = None
 		self.has_hyperlink = False
 
 	def add_element(self, element):
 		self._document_elements.append(element)
 
+	def track_object(self, instance):
+		# Returns the next id for objects of the same type in this document.
+		object_type = type(instance)
+		object_id = self._latest_ids.get(object_type, object_type.initial_id) + 1
+		self._latest_ids[object_type] = object_id
+		self._tracked_objects.setdefault(object_type, {})[object_id] = instance
+		return object_id
+
+	def get_tracked_object(self, object_type, object_id):
+		return self._tracked_objects.get(object_type, {}).get(object_id)
+
+	def release(self):
+		# Drops the generated parts of the document and the objects which were given ids for them once it has been
+		# saved, so they can be freed.
+		self._latest_ids = {}
+		self._tracked_objects = {}
+		self._document = None
+		self._styles = None
+		self._numbering = None
+		self._abstract_num = None
+
 	def last_element(self):
 		try:
 			return self._document_elements[-1]
@@ -490,13 +556,23 @@ class WordDocument(object):
 	def namespace_string(self, tag):
 		return "{%s}%s" % (self.namespace, tag)
 
-	def build_styles(self):
-		style_template = etree.parse(os.path.join(CURRENT_PATH, 'stylesBase.xml'))
-		numbering_template = etree.parse(os.path.join(CURRENT_PATH, 'numberingBase.xml'))
-		style_root = style_template.getroot()
-		numbering_root = numbering_template.getroot()		
+	def start_styles(self):
+		self._styles = get_base_tree('stylesBase.xml')
+		self._numbering = get_base_tree('numberingBase.xml')
+
+		self._abstract_num = AbstractNum(document=self)
+		self._abstract_num.add_level(0, start_from=1)
+		self._abstract_num.as_element(self._numbering.getroot())
 
+	def add_element_styles(self, elements):
+		style_root = self._styles.getroot()
+		numbering_root = self._numbering.getroot()
+		for element in elements:
+			element.add_styles(style_root, numbering_root, abstractNum=self._abstract_num)
+
+	def finish_styles(self):
 		if self.has_hyperlink:
+			style_root = self._styles.getroot()
 			style_element = etree.SubElement(style_root,self.namespace_string("style"))
 			style_element.attrib[self.namespace_string("styleId")] = "Hyperlink"
 			style_element.attrib[self.namespace_string('type')] = "character"
@@ -511,20 +587,10 @@ class WordDocument(object):
 			u_element = etree.SubElement(rPr_element, self.namespace_string("u"))
 			u_element.attrib[self.namespace_string('val')] = "single"
 
-		a = AbstractNum(document=self)
-		a.add_level(0, start_from=1)
-		a.as_element(numbering_root)
-
-		for element in self._document_elements:
-			element.add_styles(style_root, numbering_root, abstractNum=a)
-
-		style_outfile = open(os.path.join(docx.template_dir, 'word/styles.xml'), 'w')
-		style_template.write(style_outfile, pretty_print=True)
-		style_outfile.close()
-
-		numbering_outfile = open(os.path.join(docx.template_dir, 'word/numbering.xml'), 'w')
-		numbering_template.write(numbering_outfile, pretty_print=True)
-		numbering_outfile.close()
+	def build_styles(self):
+		self.start_styles()
+		self.add_element_styles(self._document_elements)
+		self.finish_styles()
 
 	def build_document(self):
 		document = docx.newdocument()
@@ -536,11 +602,26 @@ class WordDocument(object):
 
 		self._document = document
 
-	def save(self, out):
-		self.build_document()
-		file_buffer = StringIO.StringIO()
-		document_file = zipfile.ZipFile(file_buffer, mode='w', compression=zipfile.ZIP_DEFLATED)
-
+	def write_body(self, out, pending=()):
+		'''
+		Writes word/document.xml to a file incrementally. pending is an iterable which adds elements to the document
+		as it is consumed (for example a generator which calls add_paragraph). The elements added at each step are
+		written out and discarded, so only one step is held in memory at a time.
+		'''
+		self.start_styles()
+		with etree.xmlfile(out, encoding='UTF-8') as xf:
+			xf.write_declaration(standalone=True)
+			with xf.element(self.namespace_string('document'), nsmap={'w': self.namespace}):
+				with xf.element(self.namespace_string('body')):
+					for step in itertools.chain([None], pending):
+						elements, self._document_elements = self._document_elements, []
+						self.add_element_styles(elements)
+						for part in elements:
+							for element in part.get_elements():
+								xf.write(element)
+		self.finish_styles()
+
+	def get_package_trees(self):
 		title = 'Questions'
 		subject = 'A set of peer-reviewed MCQ questions for this block.'
 		creator = 'Michael Hagarty'
@@ -554,29 +635,33 @@ class WordDocument(object):
 		#relationships += self._hyperlinks
 		wordrelationships = generate_wordrelationships(relationships)
 
-		treesandfiles = {
-			self._document: 'word/document.xml',
-			coreprops: 'docProps/core.xml',
-			appprops: 'docProps/app.xml',
-			contenttypes: '[Content_Types].xml',
-			websettings: 'word/webSettings.xml',
-			wordrelationships: 'word/_rels/document.xml.rels'
-		}
+		return [
+			(self._styles, 'word/styles.xml'),
+			(self._numbering, 'word/numbering.xml'),
+			(coreprops, 'docProps/core.xml'),
+			(appprops, 'docProps/app.xml'),
+			(contenttypes, '[Content_Types].xml'),
+			(websettings, 'word/webSettings.xml'),
+			(wordrelationships, 'word/_rels/document.xml.rels'),
+		]
 
-		for tree in treesandfiles:
-			treestring = etree.tostring(tree, encoding="UTF-8", pretty_print=True, standalone=True)
-			document_file.writestr(treesandfiles[tree], treestring)
-
-		files_to_ignore = ['.DS_Store', 'stylesBase.xml', 'numberingBase.xml']
-		for dirpath, dirnames, filenames in os.walk(docx.template_dir):
-			for filename in filenames:
-				if filename in files_to_ignore:
-					continue
-				templatefile = os.path.join(dirpath, filename)
-				archivename = templatefile.replace(docx.template_dir, '')[1:]
-				document_file.write(templatefile, archivename)
-
-		document_file.close()
-
-		out.write(file_buffer.getvalue())
-		file_buffer.close()
+	def save(self, out):
+		self.build_document()
+		write_docx(out, [(self._document, 'word/document.xml')] + self.get_package_trees())
+		self.release()
+
+	def save_to_temporary_file(self, pending=()):
+		'''
+		Saves the document to a temporary file, writing the body incrementally as described in write_body. Returns
+		the temporary file, positioned at the start, which is deleted when it is closed.
+		'''
+		with tempfile.NamedTemporaryFile(suffix='.xml') as body_file:
+			self.write_body(body_file, pending)
+			body_file.flush()
+
+			out = tempfile.TemporaryFile()
+			write_docx(out, self.get_package_trees(), files=[(body_file.name, 'word/document.xml')])
+
+		self.release()
+		out.seek(0)
+		return out
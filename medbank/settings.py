@@ -64,6 +64,9 @@ DATE_FORMAT = 'j N Y'
 # Example: "/var/www/example.com/static/"
 STATIC_ROOT = os.path.join(current_path, 'assets')
 
+# Absolute path to the directory which holds generated files, such as exported documents.
+MEDIA_ROOT = os.path.join(current_path, 'media')
+
 # URL prefix for static files.
 # Example: "http://example.com/static/", "http://static.example.com/"
 STATIC_URL = '/static/'
@@ -102,6 +105,7 @@ MIDDLEWARE_CLASSES = (
     # Uncomment the next line for simple clickjacking protection:
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'questions.middleware.CurrentStageMiddleware',
+    'questions.middleware.DeferredEmailMiddleware',
     'impersonate.middleware.ImpersonateMiddleware',
     'medbank.middleware.ExtraErrorEmailInfoMiddleware',
 )
@@ -183,11 +187,22 @@ TEST_RUNNER = 'django.test.runner.DiscoverRunner'
 
 EMAIL_BACKEND = 'post_office.EmailBackend'
 
+# Emails to many recipients are sent by the send_email_batches management command directly through this backend,
+# EMAIL_BATCH_SIZE recipients at a time. Temporary errors are retried EMAIL_BATCH_RETRIES times, waiting
+# EMAIL_BATCH_RETRY_DELAY seconds before the first retry and twice as long before each one after that.
+EMAIL_BATCH_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BATCH_SIZE = 50
+EMAIL_BATCH_RETRIES = 3
+EMAIL_BATCH_RETRY_DELAY = 5
+
 STAGE_SELECTION_VIEW = 'medbank.views.pick_stage'
 
 QUESTIONS_PER_USER = 3
 USERS_PER_ACTIVITY = 2
 
+# The total size in bytes of generated documents to keep before the least recently used are deleted.
+DOCUMENT_ARTIFACT_MAX_SIZE = 200 * 1024 * 1024
+
 IMPERSONATE_REDIRECT_URL = "/questions/"
 IMPERSONATE_REQUIRE_SUPERUSER = True
 IMPERSONATE_ALLOW_SUPERUSER = True
@@ -4,7 +4,7 @@ from django.shortcuts import render_to_response, redirect
 from django.template import RequestContext, loader
 from django.contrib.auth import logout
 from django.contrib.auth import login, authenticate
-from django.http import HttpResponseServerError
+from django.http import HttpResponseServerError, HttpResponseNotModified
 from django.core.urlresolvers import reverse
 from django.core.exceptions import PermissionDenied
 from django.views.generic import View, ListView, DetailView, FormView, TemplateView
@@ -15,6 +15,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils.decorators import method_decorator
+from django.utils.cache import patch_cache_control
 from django.core.mail import send_mail
 
 
@@ -22,6 +23,9 @@ import forms
 from questions import models
 from questions.views.base import user_is_superuser, JsonResponseMixin
 
+import datetime
+import hashlib
+
 
 def class_view_decorator(function_decorator):
     """Convert a function based decorator into a class based decorator usable
@@ -169,11 +173,47 @@ class FeedbackView(FormView):
 
 @class_view_decorator(user_is_superuser)
 class UserList(JsonResponseMixin, View):
-    def get(self, request, *args, **kwargs):
-        user_list = []
+    """
+        Looks up users whose usernames start with the query (?q=), ignoring case. Results are returned a page at a time
+        (?page=, ?limit=) along with each user's current stage, if they have one.
+    """
+    default_limit = 20
+    max_limit = 50
+    # Browsers can reuse the results for the same query for this many seconds without checking them again.
+    cache_timeout = 60
 
-        users = User.objects.order_by("username")
-        for user in users:
-            user_list.append(user.username)
+    def get_positive_integer(self, name, default):
+        try:
+            value = int(self.request.GET.get(name, default))
+        except (TypeError, ValueError):
+            return default
+        return value if value > 0 else default
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get("q", "").strip()
+        limit = min(self.get_positive_integer("limit", self.default_limit), self.max_limit)
+        page = self.get_positive_integer("page", 1)
+
+        users = []
+        if query:
+            offset = (page - 1) * limit
+            # One extra user is loaded to tell whether there is another page.
+            users = list(User.objects.filter(username__istartswith=query).order_by("username").values_list("id", "username")[offset:offset + limit + 1])
+        has_next = len(users) > limit
+        users = users[:limit]
+
+        stages = dict(models.Year.objects.filter(student__user__in=[user_id for user_id, username in users], year=datetime.datetime.now().year)
+                                         .values_list("student__user", "stage__name"))
+        data = {
+            "results": [{"username": username, "stage": stages.get(user_id)} for user_id, username in users],
+            "page": page,
+            "has_next": has_next,
+        }
 
-        return self.render_to_json_response(user_list)
+        response = self.render_to_json_response(data)
+        etag = '"%s"' % hashlib.md5(response.content).hexdigest()
+        if request.META.get("HTTP_IF_NONE_MATCH") == etag:
+            response = HttpResponseNotModified()
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, max_age=self.cache_timeout)
+        return response
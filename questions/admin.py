@@ -1,20 +1,32 @@
 from __future__ import unicode_literals
 
 from django.contrib import admin
+from django.shortcuts import redirect
 
 from .models import (Question, TeachingActivity, TeachingActivityYear, TeachingBlock,
 	TeachingBlockYear, Student, Year, Stage, Comment,
 	QuizAttempt, QuestionAttempt, QuizSpecification, QuizQuestionSpecification,
-	StudentDashboardSetting, ApprovalRecord, QuestionWritingPeriod, BlockWeek)
+	StudentDashboardSetting, ApprovalRecord, QuestionWritingPeriod, BlockWeek, StudentBlockAccess, QuestionBankExport)
 
 class TeachingActivityYearAdmin(admin.ModelAdmin):
 	filter_horizontal = ['question_writers',]
 
+class TeachingBlockAdmin(admin.ModelAdmin):
+	actions = ['export_questions']
+
+	def export_questions(self, request, queryset):
+		# Building the documents for many blocks takes far longer than a request is allowed to, so the export is built by
+		# the run_document_jobs worker and downloaded from its page once it has finished.
+		export = QuestionBankExport.objects.create(base_uri=request.build_absolute_uri("/"), requested_by=request.user.student, total=queryset.count())
+		export.blocks.add(*queryset)
+		return redirect(export.get_absolute_url())
+	export_questions.short_description = "Export the approved questions for the selected blocks"
+
 admin.site.register(Question)
 admin.site.register(ApprovalRecord)
 admin.site.register(TeachingActivity)
 admin.site.register(TeachingActivityYear, TeachingActivityYearAdmin)
-admin.site.register(TeachingBlock)
+admin.site.register(TeachingBlock, TeachingBlockAdmin)
 admin.site.register(TeachingBlockYear)
 admin.site.register(Student)
 admin.site.register(Year)
@@ -26,4 +38,5 @@ admin.site.register(QuizSpecification)
 admin.site.register(QuizQuestionSpecification)
 admin.site.register(StudentDashboardSetting)
 admin.site.register(QuestionWritingPeriod)
-admin.site.register(BlockWeek)
\ No newline at end of file
+admin.site.register(BlockWeek)
+admin.site.register(StudentBlockAccess)
\ No newline at end of file
@@ -1,17 +1,16 @@
+from __future__ import absolute_import
+
 from django.core.urlresolvers import reverse
 from django.db.models import F, Max
 
-import models
+from . import models
 
+from document.word_document import get_base_tree, write_docx
 from lxml import etree
-import os
 import docx
 import cStringIO as StringIO
-import zipfile
 import math
 
-current_path = os.path.dirname(os.path.realpath(__file__ ))
-
 def build_answer_table(data, n=3):
     ret = []
     l = int(math.ceil(len(data)/float(n)))
@@ -95,16 +94,12 @@ def generate_document(tb, answer, request, block=None, questions=None):
 
     body.append(docx.heading(heading, 1))
     if tb:
-        qq = list(models.Question.objects.filter(teaching_activity_year__block_week__writing_period__block_year=tb, status=models.Question.APPROVED_STATUS))
+        qq = list(models.Question.objects.filter(block_year=tb, status=models.Question.APPROVED_STATUS))
     else:
         qq = list(questions)
-    qq = sorted(qq, key=lambda x: x.body.strip()[:-1][::-1] if x.body.strip()[-1] in "?:." else x.body.strip()[::-1])
-    style_file = os.path.join(current_path, 'stylesBase.xml')
-    style_tree = etree.parse(style_file)
-    style_outfile = open(os.path.join(docx.template_dir, 'word/styles.xml'), 'w')
-    numbering_file = os.path.join(current_path, 'numberingBase.xml')
-    numbering_tree = etree.parse(numbering_file)
-    numbering_outfile = open(os.path.join(docx.template_dir, 'word/numbering.xml'), 'w')
+    qq = sorted(qq, key=lambda x: x.download_sort_key)
+    style_tree = get_base_tree('stylesBase.xml')
+    numbering_tree = get_base_tree('numberingBase.xml')
 
     namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
     xhtml_namespace = "{%s}" % namespace
@@ -227,10 +222,6 @@ def generate_document(tb, answer, request, block=None, questions=None):
         d = etree.SubElement(c, "%su" % xhtml_namespace)
         d.attrib['%sval' % xhtml_namespace] = "single"
 
-    style_tree.write(style_outfile)
-    numbering_tree.write(numbering_outfile)
-    style_outfile.close()
-    numbering_outfile.close()
 
     title = 'Questions'
     subject = 'A set of peer-reviewed MCQ questions for this block.'
@@ -243,30 +234,16 @@ def generate_document(tb, answer, request, block=None, questions=None):
     relationships = list(enumerate(relationships, start=1))
     relationships += hyperlinks
     wordrelationships = new_wordrelationships(relationships)
-    docx.savedocx(document, coreprops, appprops, contenttypes, websettings, wordrelationships, 'hello.docx')
 
     f = StringIO.StringIO()
-    docxfile = zipfile.ZipFile(f, mode='w', compression=zipfile.ZIP_DEFLATED)
-    treesandfiles = {
-        document: 'word/document.xml',
-        coreprops: 'docProps/core.xml',
-        appprops: 'docProps/app.xml',
-        contenttypes: '[Content_Types].xml',
-        websettings: 'word/webSettings.xml',
-        wordrelationships: 'word/_rels/document.xml.rels'
-    }
-    for tree in treesandfiles:
-        treestring = etree.tostring(tree, pretty_print=True)
-        docxfile.writestr(treesandfiles[tree], treestring)
-
-    files_to_ignore = ['.DS_Store', 'stylesBase.xml', 'numberingBase.xml']
-    for dirpath, dirnames, filenames in os.walk(docx.template_dir):
-        for filename in filenames:
-            if filename in files_to_ignore:
-                continue
-            templatefile = os.path.join(dirpath, filename)
-            archivename = templatefile.replace(docx.template_dir, '')[1:]
-            docxfile.write(templatefile, archivename)
-
-    docxfile.close()
+    write_docx(f, [
+        (document, 'word/document.xml'),
+        (style_tree, 'word/styles.xml'),
+        (numbering_tree, 'word/numbering.xml'),
+        (coreprops, 'docProps/core.xml'),
+        (appprops, 'docProps/app.xml'),
+        (contenttypes, '[Content_Types].xml'),
+        (websettings, 'word/webSettings.xml'),
+        (wordrelationships, 'word/_rels/document.xml.rels'),
+    ])
     return f
@@ -1,16 +1,96 @@
-from django.template.loader import render_to_string
+from django.template.loader import get_template
 from django.contrib.staticfiles import finders
+from django.core.mail import EmailMessage, get_connection
+from django.core.signals import request_finished
+from django.dispatch import receiver
+from django.conf import settings
 
 import post_office
 
 import premailer
 
+import codecs
+import logging
+import smtplib
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
 css_files = [finders.find('medbank/css/bootstrap-email.css'), finders.find('medbank/css/bootstrap-custom.css')]
 
-def _send_email(template_name, template_context, recipient, sender="SUMS MedBank <medbank@sydneymedsoc.org.au>", subject=""):
-	html = render_to_string("%s.html" % template_name, template_context)
-	css_inliner = premailer.Premailer(html, external_styles=css_files, disable_validation=True)
-	html = css_inliner.transform()
+# The stylesheets and templates only change when the site is deployed, so they are loaded once per process.
+_css_inliner = None
+_templates = {}
+_loading_lock = threading.Lock()
+
+# Emails which are waiting to be sent once the current request has finished.
+_deferred = threading.local()
+
+
+class StylesheetInliner(premailer.Premailer):
+	# Premailer parses its stylesheets again for every email, which takes much longer than applying them. The parsed
+	# rules only depend on the stylesheets, so they are kept for as long as the inliner is.
+	def __init__(self, *args, **kwargs):
+		super(StylesheetInliner, self).__init__(*args, **kwargs)
+		self._style_rules = {}
+
+	def _parse_style_rules(self, css_body, ruleset_index):
+		key = (css_body, ruleset_index)
+		if key not in self._style_rules:
+			self._style_rules[key] = super(StylesheetInliner, self)._parse_style_rules(css_body, ruleset_index)
+		return self._style_rules[key]
+
+
+def get_css_inliner():
+	# Returns an inliner for the email stylesheets which can be used for any number of emails.
+	global _css_inliner
+	if _css_inliner is None:
+		with _loading_lock:
+			if _css_inliner is None:
+				css_text = []
+				for css_file in css_files:
+					with codecs.open(css_file, encoding="utf-8") as f:
+						css_text.append(f.read())
+				_css_inliner = StylesheetInliner(css_text=css_text, disable_validation=True)
+	return _css_inliner
+
+
+def get_email_template(template_name):
+	if template_name not in _templates:
+		with _loading_lock:
+			_templates[template_name] = get_template(template_name)
+	return _templates[template_name]
+
+
+def render_email(template_name, template_context):
+	html = get_email_template("%s.html" % template_name).render(template_context)
+	return get_css_inliner().transform(html)
+
+
+def start_deferring_emails():
+	# Emails sent after this are held until the end of the request, so that rendering them doesn't delay the response.
+	_deferred.emails = []
+
+
+def discard_deferred_emails():
+	# The request failed, so anything it did has been rolled back and the emails about it shouldn't be sent.
+	_deferred.emails = []
+
+
+@receiver(request_finished)
+def send_deferred_emails(sender, **kwargs):
+	emails, _deferred.emails = getattr(_deferred, 'emails', None), None
+	for email in emails or []:
+		try:
+			_deliver_email(*email)
+		except Exception:
+			logger.exception("Unable to send an email after the request had finished.")
+
+
+def _deliver_email(template_name, template_context, recipient, sender, subject):
+	html = render_email(template_name, template_context)
 	# txt = render_to_string("%s.txt" % template_name, template_context.copy())
 
 	post_office.mail.send(
@@ -22,6 +102,15 @@ def _send_email(template_name, template_context, recipient, sender="SUMS MedBank
 	)
 
 
+def _send_email(template_name, template_context, recipient, sender="SUMS MedBank <medbank@sydneymedsoc.org.au>", subject=""):
+	email = (template_name, template_context, recipient, sender, subject)
+	if getattr(_deferred, 'emails', None) is None:
+		# This isn't part of a request, so there is no reason to wait.
+		_deliver_email(*email)
+	else:
+		_deferred.emails.append(email)
+
+
 
 def send_question_creation_email(student, question, question_url, template_name="email/question_created"):
 	# Sends an email to the creator of the question confirming that their question has been submitted.
@@ -39,3 +128,77 @@ def send_question_updated_email(student, question, question_url, template_name="
 	_send_email("email/update_submitted", template_context, student.user.email, subject="Update submitted")
 	_send_email("email/question_updated", template_context, question.creator.user.email, subject="Question updated")
 
+
+# Inline styles for the tags which can be used in emails written by an administrator.
+BULK_EMAIL_TAG_STYLES = (
+	('<strong>', '<strong style="font-weight:bold">'),
+	('<p>', '<p style="font-family:\'Helvetica Neue\',Helvetica,Arial,sans-serif;font-size:14px;margin: 0 0 10px;">'),
+	('<a href="', '<a style="color:#428bca;text-decoration:none;" href="'),
+	('\r\n', ''),
+	('\r', ''),
+	('\n', ''),
+)
+
+
+def render_bulk_email(html):
+	# Styles an email written by an administrator so that it is rendered consistently by email clients.
+	for tag, styled_tag in BULK_EMAIL_TAG_STYLES:
+		html = html.replace(tag, styled_tag)
+
+	return '<html><body style="font-family:\'Helvetica Neue\',Helvetica,Arial,sans-serif;font-size:14px;">%s</body></html>' % html
+
+
+def _is_temporary_error(error):
+	if isinstance(error, smtplib.SMTPResponseException):
+		return 400 <= error.smtp_code < 500
+	return isinstance(error, (smtplib.SMTPServerDisconnected, socket.error))
+
+
+def _send_with_retry(connection, message, retries, retry_delay):
+	for attempt in range(retries + 1):
+		try:
+			connection.send_messages([message])
+			return
+		except (smtplib.SMTPException, socket.error) as e:
+			if attempt == retries or not _is_temporary_error(e):
+				raise
+
+		# The mail server may have dropped the connection, so a new one is opened before trying again.
+		connection.close()
+		time.sleep(retry_delay * 2 ** attempt)
+		try:
+			connection.open()
+		except (smtplib.SMTPException, socket.error):
+			# Sending the message will try to connect again.
+			pass
+
+
+def send_email_batch(batch, chunk_size=None, retries=None, retry_delay=None):
+	# Sends an email batch which has been claimed by a worker over a single connection to the mail server. The progress
+	# of the batch is saved after every chunk of chunk_size recipients, so a batch which fails part way through carries
+	# on from the last chunk when it is retried. Sending a message is retried with an increasing delay when the mail
+	# server reports a temporary error, and recipients which are refused are recorded without stopping the batch.
+	chunk_size = chunk_size or settings.EMAIL_BATCH_SIZE
+	retries = settings.EMAIL_BATCH_RETRIES if retries is None else retries
+	retry_delay = settings.EMAIL_BATCH_RETRY_DELAY if retry_delay is None else retry_delay
+
+	recipients = batch.recipient_list()
+	failed_recipients = batch.failed_recipient_list()
+
+	connection = get_connection(settings.EMAIL_BATCH_BACKEND, fail_silently=False)
+	connection.open()
+	try:
+		for start in range(batch.sent_count, len(recipients), chunk_size):
+			for recipient in recipients[start:start + chunk_size]:
+				message = EmailMessage(batch.subject, batch.body, batch.from_email, [recipient], connection=connection)
+				message.content_subtype = "html"
+				try:
+					_send_with_retry(connection, message, retries, retry_delay)
+				except smtplib.SMTPRecipientsRefused:
+					failed_recipients.append(recipient)
+
+			batch.set_progress(min(start + chunk_size, len(recipients)), failed_recipients)
+	finally:
+		connection.close()
+
+	batch.finish()
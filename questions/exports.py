@@ -0,0 +1,264 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.core.files import File
+from django.db import connections, transaction, IntegrityError
+
+from questions import models
+
+import document
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import urlparse
+import zipfile
+
+
+def build_answer_table(answers, number_of_columns=3):
+    # Lays out the answers in columns of question numbers and answers, filling each column before the next.
+    table_data = []
+    number_of_rows = int(math.ceil(len(answers)/float(number_of_columns)))
+    number_of_columns = min(int(math.ceil(len(answers)/float(number_of_rows))), number_of_columns)
+
+    for i in range(number_of_columns):
+        for j, answer in enumerate(answers[i*number_of_rows:(i+1)*number_of_rows]):
+            ll = []
+            try:
+                ll = table_data[j]
+            except IndexError:
+                table_data.insert(j, ll)
+
+            ll += [unicode(j + 1 + i*number_of_rows), answer]
+
+    header = []
+    for i in range(number_of_columns):
+        header += ["Question", "Answer"]
+    table_data.insert(0, header)
+    return table_data
+
+
+def add_questions_to_document(doc, teaching_block, questions, show_answers, build_absolute_uri, progress=None):
+    # A generator which adds one question to the document at each step, so that the document can write each
+    # question out before the next one is read. progress is called with the number of questions added so far.
+    for question_number, question in enumerate(questions.iterator()):
+        doc.add_paragraph("Question %s" % (question_number + 1))
+        doc.add_html(question.body)
+        doc.add_list_html(question.options_list())
+
+        if show_answers:
+            # Older questions are shuffled when they are decoded, so the answer letter comes from the same options.
+            doc.add_paragraph("Answer: %s" % (question.answer_letter or question.answer))
+            doc.add_paragraph("The following explanations were provided:")
+            doc.add_list(question.unicode_explanation_list())
+            if teaching_block.code_includes_week:
+                doc.add_paragraph("%s.%02d Lecture %d: %s" % (teaching_block.code, question.teaching_activity_year.block_week.sort_index, question.teaching_activity_year.position, question.teaching_activity_year.name))
+            else:
+                doc.add_paragraph("%s %s: %s" % (teaching_block.code, question.teaching_activity_year.teaching_activity.get_activity_type_display(), question.teaching_activity_year.name))
+
+            p = doc.add_paragraph("To view this question online, click ")
+            p.add_hyperlink("here", build_absolute_uri(question.get_absolute_url()))
+
+            doc.add_paragraph("")
+
+        if progress:
+            progress(question_number + 1)
+        yield question
+
+
+def block_document(teaching_block, questions, show_answers, build_absolute_uri, progress=None):
+    """
+        Builds a Word document of the questions for a block and returns it as a temporary file. The questions are
+        read from the database and written to the document one at a time, so that large sets of questions can be
+        exported without holding them all in memory. build_absolute_uri is used to link each question to its page,
+        and progress (if given) is called with the number of questions written so far.
+    """
+    questions = questions.select_related('teaching_activity_year__block_week', 'teaching_activity_year__teaching_activity') \
+                         .order_by('download_sort_key', 'id')
+
+    doc = document.WordDocument()
+    doc.add_heading(teaching_block.name)
+    if show_answers:
+        doc.add_heading("Answer grid")
+        doc.add_table(build_answer_table(list(questions.values_list('answer', flat=True))), has_heading_row=False)
+        doc.insert_pagebreak(break_type='page', orientation='portrait')
+        doc.add_heading("Questions and explanations")
+
+    return doc.save_to_temporary_file(add_questions_to_document(doc, teaching_block, questions, show_answers, build_absolute_uri, progress=progress))
+
+
+def block_document_hash(teaching_block, years, show_answers, questions, base_uri):
+    # The document changes if a different set of questions is approved or one of them is saved, so the hash includes
+    # the id and revision of every question. The name and place of each question's activity are printed with it but
+    # can change without the question being saved (e.g. when the activities are uploaded again), so they are included
+    # too, as are the details of the block. The base URI is included for the links to each question.
+    question_details = list(questions.order_by('id').values_list(
+        'id', 'revision', 'teaching_activity_year__teaching_activity__name', 'teaching_activity_year__teaching_activity__activity_type',
+        'teaching_activity_year__block_week__sort_index', 'teaching_activity_year__position',
+    ))
+    key = json.dumps([teaching_block.id, teaching_block.name, teaching_block.code, teaching_block.code_includes_week, sorted(years), show_answers, base_uri, question_details])
+    return hashlib.sha1(key).hexdigest()
+
+
+def find_block_document_artifact(teaching_block, years, show_answers, build_absolute_uri):
+    # Returns the hash of the document and the artifact containing it, or None if it needs to be built.
+    years = sorted(int(year) for year in years)
+    questions = models.Question.objects.get_approved_questions_for_block_and_years(teaching_block, years)
+    content_hash = block_document_hash(teaching_block, years, show_answers, questions, build_absolute_uri("/"))
+
+    try:
+        artifact = models.DocumentArtifact.objects.get(content_hash=content_hash)
+    except models.DocumentArtifact.DoesNotExist:
+        return content_hash, None
+
+    if not artifact.file_exists():
+        # The file has been removed from storage, so the document needs to be built again.
+        artifact.delete()
+        return content_hash, None
+
+    artifact.touch()
+    return content_hash, artifact
+
+
+def get_block_document_artifact(teaching_block, years, show_answers, build_absolute_uri, progress=None):
+    """
+        Returns an artifact containing the Word document of the approved questions for a block in the given years.
+        An existing artifact is reused if the questions have not changed since it was generated, otherwise the
+        document is built and stored, evicting the least recently used artifacts if necessary.
+    """
+    content_hash, artifact = find_block_document_artifact(teaching_block, years, show_answers, build_absolute_uri)
+    if artifact:
+        return artifact
+
+    years = sorted(int(year) for year in years)
+    questions = models.Question.objects.get_approved_questions_for_block_and_years(teaching_block, years)
+    docx_file = block_document(teaching_block, questions, show_answers, build_absolute_uri, progress=progress)
+    artifact = models.DocumentArtifact(
+        block=teaching_block,
+        years=",".join(unicode(year) for year in years),
+        show_answers=show_answers,
+        content_hash=content_hash,
+        size=os.fstat(docx_file.fileno()).st_size,
+    )
+    try:
+        artifact.file.save("%s.docx" % content_hash, File(docx_file), save=False)
+        with transaction.atomic():
+            artifact.save()
+    except IntegrityError:
+        # Another request stored the same document first.
+        artifact.file.delete(save=False)
+        return models.DocumentArtifact.objects.get(content_hash=content_hash)
+    finally:
+        docx_file.close()
+
+    models.DocumentArtifact.objects.evict(keep=artifact.id)
+    return artifact
+
+
+def run_document_job(job):
+    """Builds the document for a job which has been claimed by a worker, recording its progress as it goes."""
+    years = job.year_list()
+    job.set_total(models.Question.objects.get_approved_questions_for_block_and_years(job.block, years).count())
+    artifact = get_block_document_artifact(job.block, years, job.show_answers, job.build_absolute_uri, progress=job.set_progress)
+    job.finish(artifact)
+    return artifact
+
+
+def export_block_to_file(arguments):
+    """
+        Builds the document for every year of a block and copies it to a named temporary file, which the caller must
+        delete. Returns the block id, the name of the document and the path to the file, or None for the path if the
+        block has no approved questions. This runs in a separate process when blocks are exported in parallel, so it
+        takes and returns only simple values.
+    """
+    block_id, show_answers, base_uri = arguments
+    teaching_block = models.TeachingBlock.objects.get(id=block_id)
+    # Block names aren't unique, so the code is included to stop two blocks from having the same name in the zip file.
+    filename = "%s_%sQuestions%s.docx" % (teaching_block.code, teaching_block.filename(), "Answers" if show_answers else "")
+
+    years = list(teaching_block.years.values_list('year', flat=True))
+    questions = models.Question.objects.get_approved_questions_for_block_and_years(teaching_block, years)
+    if not questions.exists():
+        return block_id, filename, None
+
+    docx_file = block_document(teaching_block, questions, show_answers, lambda location: urlparse.urljoin(base_uri, location))
+    try:
+        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as block_file:
+            shutil.copyfileobj(docx_file, block_file)
+    finally:
+        docx_file.close()
+
+    return block_id, filename, block_file.name
+
+
+def start_export_process(directory):
+    # Every temporary file the process creates is put in directory, which the process exporting the blocks removes
+    # once it has finished. That process also stops the pool itself when it is interrupted, so the processes in the
+    # pool don't handle the signals which stop it (e.g. with the handlers of the run_document_jobs worker).
+    tempfile.tempdir = directory
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def export_blocks(blocks, out, base_uri, show_answers=True, processes=None, progress=None):
+    """
+        Writes a zip file containing a document for each of the given blocks to out. The documents are built in a pool
+        of processes (one per core by default), since building them is mostly CPU bound. progress (if given) is called
+        with each block, the path to its document (or None if it had no questions) and the number of blocks finished
+        so far. Returns the number of documents in the zip file.
+    """
+    blocks = dict((block.id, block) for block in blocks)
+    # The documents are written to a directory which is removed afterwards, so that none are left behind if the export
+    # fails, including those which were being built or hadn't yet been added to the zip file.
+    directory = tempfile.mkdtemp(prefix='export')
+    arguments = [(block_id, show_answers, base_uri) for block_id in blocks]
+
+    number_of_documents = 0
+    try:
+        # Each process needs its own database connection, so none are shared with the processes when they are forked.
+        connections.close_all()
+        pool = multiprocessing.Pool(processes=processes or multiprocessing.cpu_count(),
+                                    initializer=start_export_process, initargs=(directory,))
+
+        archive = zipfile.ZipFile(out, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True)
+        try:
+            for number_finished, (block_id, filename, path) in enumerate(pool.imap_unordered(export_block_to_file, arguments), start=1):
+                if path:
+                    # The documents are already compressed, so they are stored in the zip file as they are.
+                    archive.write(path, filename)
+                    os.remove(path)
+                    number_of_documents += 1
+                if progress:
+                    progress(blocks[block_id], path, number_finished)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            archive.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return number_of_documents
+
+
+def run_bank_export(export):
+    """Builds the zip file for a question bank export which has been claimed by a worker, recording its progress as it goes."""
+    blocks = list(export.blocks.all())
+    if export.total != len(blocks):
+        export.total = len(blocks)
+        models.QuestionBankExport.objects.filter(id=export.id).update(total=export.total)
+
+    with tempfile.TemporaryFile(suffix='.zip') as zip_file:
+        export_blocks(blocks, zip_file, export.base_uri, show_answers=export.show_answers,
+                      progress=lambda block, path, number_finished: export.set_progress(number_finished))
+        export.size = zip_file.tell()
+        zip_file.seek(0)
+        export.file.save("question_bank_%s.zip" % export.id, File(zip_file), save=False)
+
+    export.finish()
+    return export
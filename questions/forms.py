@@ -238,40 +238,6 @@ class NewQuestionForm(bootstrap.ModelForm):
         exclude = ('status', 'approver', 'exemplary_question', 'requires_special_formatting', 'date_assigned', 'date_completed')
 
 
-class TeachingActivityValidationForm(bootstrap.ModelForm):
-    class Meta:
-        model = TeachingActivity
-        fields = '__all__'
-
-
-class TeachingActivityYearValidationForm(bootstrap.ModelForm):
-    class Meta:
-        model = TeachingActivityYear
-        exclude = ('teaching_activity', 'block_week')
-
-
-class BlockWeekValidationForm(bootstrap.ModelForm):
-    class Meta:
-        model = BlockWeek
-        fields = ('name', )
-
-class NewTeachingActivityForm(bootstrap.ModelForm):
-    class Meta:
-        model = TeachingActivity
-        fields = '__all__'
-
-
-class NewTeachingActivityYearForm(bootstrap.ModelForm):
-    class Meta:
-        model = TeachingActivityYear
-        fields = ('position',)
-
-class NewBlockWeekForm(bootstrap.ModelForm):
-    class Meta:
-        model = BlockWeek
-        fields = ('name', 'sort_index')
-        
-
 class TeachingActivityBulkUploadForm(bootstrap.Form):
     ta_file = forms.FileField(label="Activity Information File")
     year = forms.IntegerField()
@@ -560,7 +526,7 @@ class StudentSelectionForm(bootstrap.Form):
     def __init__(self, user_url="", *args, **kwargs):
         super(StudentSelectionForm, self).__init__(*args, **kwargs)
         if user_url:
-            self.fields['user'].widget = bootstrap.Typeahead(prefetch_url=user_url)
+            self.fields['user'].widget = bootstrap.Typeahead(remote_url=user_url)
 
 class StudentLookupForm(bootstrap.Form):
     user = forms.ModelChoiceField(queryset=User.objects.select_related().order_by("username"), to_field_name="username", widget=forms.TextInput(), label="Unikey")
@@ -568,7 +534,7 @@ class StudentLookupForm(bootstrap.Form):
     def __init__(self, user_url="", *args, **kwargs):
         super(StudentLookupForm, self).__init__(*args, **kwargs)
         if user_url:
-            self.fields['user'].widget = bootstrap.Typeahead(prefetch_url=user_url)
+            self.fields['user'].widget = bootstrap.Typeahead(remote_url=user_url)
 
 class DeleteQuestionWritingPeriodForm(bootstrap.Form):
     CONFIRMED = "true"
@@ -0,0 +1,247 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TeachingActivity, TeachingActivityYear, BlockWeek, ActivityUpload, StagedActivity
+
+import csv
+
+# The columns which must be present in an activity upload, with the name shown to the user if one is missing.
+REQUIRED_COLUMNS = (
+    ('reference_id', "Reference ID"),
+    ('name', "Name"),
+    ('activity_type', "Activity type"),
+    ('week', "Week"),
+    ('position', "Position"),
+)
+
+NAME_MAX_LENGTH = TeachingActivity._meta.get_field('name').max_length
+WEEK_MAX_LENGTH = BlockWeek._meta.get_field('name').max_length
+
+
+class MissingColumnError(ValueError):
+    def __init__(self, column_name):
+        super(MissingColumnError, self).__init__("Missing column %s" % column_name)
+        self.column_name = column_name
+
+
+def read_activity_rows(upload_file):
+    """
+        Parses an uploaded activity file one line at a time and returns a list of rows, each of which is a mapping from
+        column title to value. Column titles are lowercased with spaces replaced by underscores. Raises a
+        MissingColumnError if any of the required columns are not present.
+    """
+    reader = csv.reader(upload_file)
+    try:
+        column_titles = [title.decode('utf-8').strip().lower().replace(" ", "_") for title in next(reader)]
+    except StopIteration:
+        column_titles = []
+
+    for title, pretty_name in REQUIRED_COLUMNS:
+        if title not in column_titles:
+            raise MissingColumnError(pretty_name)
+
+    return [dict(zip(column_titles, (value.decode('utf-8').strip() for value in row))) for row in reader if any(row)]
+
+
+def load_existing_activities(writing_period, reference_ids):
+    """
+        Loads the current details of the teaching activities with the given reference IDs. Returns a tuple of
+        (activities, activity_years).
+        * activities: a dictionary from reference ID to a tuple of (id, name, activity_type)
+        * activity_years: a dictionary from reference ID to a tuple of (id, week name, position) for the activities
+          which are already in the writing period
+    """
+    reference_ids = set(reference_ids)
+    activities = TeachingActivity.objects.filter(reference_id__in=reference_ids).values_list('reference_id', 'id', 'name', 'activity_type')
+    activity_years = TeachingActivityYear.objects.filter(block_week__writing_period=writing_period, teaching_activity__reference_id__in=reference_ids) \
+                                                 .order_by('-id').values_list('teaching_activity__reference_id', 'id', 'block_week__name', 'position')
+
+    return dict((activity[0], activity[1:]) for activity in activities), dict((year[0], year[1:]) for year in activity_years)
+
+
+def validate_activity_rows(writing_period, rows):
+    """
+        Checks every row of an activity upload and compares it to the activities which already exist. Only the
+        teaching activities which are referenced by the rows are loaded.
+
+        Returns a tuple of (staged_activities, errors).
+        * staged_activities: a list of unsaved StagedActivity objects, one for each row
+        * errors: a dictionary from the type of error to a list of the rows or staged activities which caused it
+    """
+    errors = {}
+    bad_activity_types = errors.setdefault('bad_activity_type', [])
+    bad_reference_id = errors.setdefault('bad_reference_id', [])
+    bad_teaching_activity = errors.setdefault('bad_teaching_activity', [])
+    bad_activity_year = errors.setdefault("bad_activity_year", [])
+    bad_activity_week = errors.setdefault("bad_activity_week", [])
+    duplicated_by_reference_id = errors.setdefault("duplicated_by_reference_id", [])
+    duplicated_by_position = errors.setdefault("duplicated_by_position", [])
+    duplicated_by_name = errors.setdefault("duplicated_by_name", [])
+
+    accepted_types = TeachingActivity.accepted_types()
+
+    # The reference IDs are checked first so that every existing activity in the file can be loaded at once.
+    valid_rows = []
+    for row in rows:
+        activity_type = accepted_types.get(row.get('activity_type'))
+        if activity_type is None:
+            bad_activity_types.append(row)
+            continue
+
+        try:
+            reference_id = int(row.get('reference_id'))
+        except (TypeError, ValueError):
+            bad_reference_id.append(row)
+            continue
+
+        if reference_id < 0:
+            bad_reference_id.append(row)
+            continue
+
+        valid_rows.append((row, reference_id, activity_type))
+
+    existing_activities, existing_activity_years = load_existing_activities(writing_period, (reference_id for row, reference_id, activity_type in valid_rows))
+
+    staged_activities = []
+    # Mappings to check for duplicated activities.
+    staged_activities_by_reference_id = {}
+    staged_activities_by_position = {}
+    staged_activities_by_name = {}
+
+    for row, reference_id, activity_type in valid_rows:
+        existing_activity = existing_activities.get(reference_id)
+
+        # An existing activity keeps its name if the row doesn't have one.
+        name = row.get('name') or (existing_activity[1] if existing_activity else "")
+        if not name or len(name) > NAME_MAX_LENGTH:
+            bad_teaching_activity.append(row)
+            continue
+
+        try:
+            position = int(row.get('position'))
+        except (TypeError, ValueError):
+            bad_activity_year.append(row)
+            continue
+
+        week = row.get('week') or ""
+        if not week or len(week) > WEEK_MAX_LENGTH:
+            bad_activity_week.append(row)
+            continue
+
+        staged_activity = StagedActivity(reference_id=reference_id, name=name, activity_type=activity_type, week=week, position=position)
+        if existing_activity:
+            staged_activity.previous_name, staged_activity.previous_activity_type = existing_activity[1:]
+            if reference_id in existing_activity_years:
+                staged_activity.previous_week, staged_activity.previous_position = existing_activity_years[reference_id][1:]
+
+            if (name, activity_type, week, position) == (staged_activity.previous_name, staged_activity.previous_activity_type, staged_activity.previous_week, staged_activity.previous_position):
+                staged_activity.status = StagedActivity.UNCHANGED_STATUS
+            else:
+                staged_activity.status = StagedActivity.CHANGED_STATUS
+        staged_activities.append(staged_activity)
+
+        staged_activities_by_reference_id.setdefault(reference_id, []).append(staged_activity)
+        # Keeps track to check that there are no two activities with the same position.
+        staged_activities_by_position.setdefault((week, position, activity_type), []).append(staged_activity)
+        # Keeps track to check that we haven't made a mistake and there are no two activities with the same name.
+        staged_activities_by_name.setdefault(name.lower(), []).append(staged_activity)
+
+    for duplicates, staged_activities_by_key in ((duplicated_by_reference_id, staged_activities_by_reference_id),
+                                                 (duplicated_by_position, staged_activities_by_position),
+                                                 (duplicated_by_name, staged_activities_by_name)):
+        for activities_with_same_key in staged_activities_by_key.values():
+            if len(activities_with_same_key) > 1:
+                duplicates += activities_with_same_key
+
+    return staged_activities, errors
+
+
+def stage_activity_upload(writing_period, staged_activities, uploaded_by=None):
+    """Saves validated activities under a new upload so that they can be reviewed and then committed by its token."""
+    ActivityUpload.objects.delete_expired()
+
+    with transaction.atomic():
+        upload = ActivityUpload.objects.create(writing_period=writing_period, uploaded_by=uploaded_by)
+        for staged_activity in staged_activities:
+            staged_activity.upload = upload
+        StagedActivity.objects.bulk_create(staged_activities)
+
+    return upload
+
+
+def commit_activity_upload(upload):
+    """
+        Saves the staged activities of an upload to its writing period in a single transaction. New weeks and teaching
+        activities are created, existing activities are updated and activities which are already in the writing period
+        are moved to their new week and position.
+
+        The staged activities are compared against the current activities again, so committing is safe even if they
+        have changed since the upload was staged. Returns False if the upload had already been committed.
+    """
+    with transaction.atomic():
+        # Locking the upload stops it from being committed twice at once.
+        upload = ActivityUpload.objects.select_for_update().select_related('writing_period').get(id=upload.id)
+        if upload.committed:
+            return False
+
+        writing_period = upload.writing_period
+        # Activities which were unchanged when they were staged are compared again too, in case they have been
+        # edited since.
+        staged_activities = list(upload.activities.all())
+        existing_activities, existing_activity_years = load_existing_activities(writing_period, (staged_activity.reference_id for staged_activity in staged_activities))
+
+        # Weeks which already exist in the writing period are reused, and new weeks are added after them.
+        week_ids_by_name = {}
+        last_sort_index = 0
+        for week_name, week_id, sort_index in writing_period.weeks.order_by('sort_index', 'id').values_list('name', 'id', 'sort_index'):
+            week_ids_by_name.setdefault(week_name, week_id)
+            last_sort_index = max(last_sort_index, sort_index)
+
+        new_week_names = sorted(set(staged_activity.week for staged_activity in staged_activities) - set(week_ids_by_name))
+        BlockWeek.objects.bulk_create([
+            BlockWeek(name=week_name, sort_index=last_sort_index + n + 1, writing_period=writing_period) for n, week_name in enumerate(new_week_names)
+        ])
+        # Bulk creation doesn't give new objects their IDs, so they are loaded again.
+        week_ids_by_name.update(writing_period.weeks.filter(name__in=new_week_names).values_list('name', 'id'))
+
+        new_activities = []
+        for staged_activity in staged_activities:
+            if staged_activity.reference_id not in existing_activities:
+                new_activities.append(TeachingActivity(reference_id=staged_activity.reference_id, name=staged_activity.name, activity_type=staged_activity.activity_type))
+                continue
+
+            activity_id, name, activity_type = existing_activities[staged_activity.reference_id]
+            if (name, activity_type) != (staged_activity.name, staged_activity.activity_type):
+                TeachingActivity.objects.filter(id=activity_id).update(name=staged_activity.name, activity_type=staged_activity.activity_type)
+        TeachingActivity.objects.bulk_create(new_activities)
+
+        activity_ids_by_reference_id = dict((reference_id, activity[0]) for reference_id, activity in existing_activities.items())
+        activity_ids_by_reference_id.update(
+            TeachingActivity.objects.filter(reference_id__in=[activity.reference_id for activity in new_activities]).values_list('reference_id', 'id')
+        )
+
+        new_activity_years = []
+        for staged_activity in staged_activities:
+            week_id = week_ids_by_name[staged_activity.week]
+            if staged_activity.reference_id not in existing_activity_years:
+                new_activity_years.append(TeachingActivityYear(
+                    teaching_activity_id=activity_ids_by_reference_id[staged_activity.reference_id],
+                    block_week_id=week_id,
+                    position=staged_activity.position,
+                ))
+                continue
+
+            # The activity stays in the same writing period, so its questions don't need to be updated.
+            activity_year_id, week_name, position = existing_activity_years[staged_activity.reference_id]
+            if (week_name, position) != (staged_activity.week, staged_activity.position):
+                TeachingActivityYear.objects.filter(id=activity_year_id).update(block_week=week_id, position=staged_activity.position)
+        TeachingActivityYear.objects.bulk_create(new_activity_years)
+
+        upload.date_committed = timezone.now()
+        upload.save()
+        # The staged activities aren't needed once they have been committed.
+        upload.activities.all().delete()
+
+    return True
@@ -0,0 +1,104 @@
+from __future__ import division
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QuestionAttempt, QuizSpecificationAnalysis, ItemAnalysis
+
+import numpy
+
+# The proportion of attempts in each of the upper and lower groups used to calculate discrimination.
+DISCRIMINATION_GROUP_PROPORTION = 0.27
+
+
+def load_response_matrix(specification):
+    """
+        Loads the answers to a quiz specification as a matrix of attempts by questions, where each entry is 1 if the
+        question was answered correctly and 0 otherwise. Only attempts where every question has been completed are
+        included. Returns the quiz attempt ids, the question ids and the matrix.
+    """
+    rows = QuestionAttempt.objects.filter(quiz_attempt__quiz_specification=specification) \
+                                  .values_list('quiz_attempt', 'question', 'answer', 'question__answer', 'date_completed')
+    rows = list(rows)
+    if not rows:
+        return numpy.array([], dtype=int), numpy.array([], dtype=int), numpy.zeros((0, 0))
+
+    attempt_ids, question_ids, answers, correct_answers, dates_completed = zip(*rows)
+    attempt_ids, attempt_index = numpy.unique(attempt_ids, return_inverse=True)
+    question_ids, question_index = numpy.unique(question_ids, return_inverse=True)
+
+    correct = numpy.array(answers, dtype=object) == numpy.array(correct_answers, dtype=object)
+    incomplete = numpy.array([date_completed is None for date_completed in dates_completed])
+
+    matrix = numpy.zeros((len(attempt_ids), len(question_ids)))
+    matrix[attempt_index, question_index] = correct
+
+    complete_attempts = numpy.bincount(attempt_index, weights=incomplete, minlength=len(attempt_ids)) == 0
+    return attempt_ids[complete_attempts], question_ids, matrix[complete_attempts]
+
+
+def analyse_response_matrix(matrix):
+    """
+        Calculates the item statistics for every question in a response matrix at once.
+        * difficulty: the proportion of attempts which answered the question correctly
+        * discrimination: the difference in difficulty between the top and bottom 27% of attempts by total score
+        * point_biserial: the correlation between answering the question correctly and the total score
+        * reliability: the KR-20 reliability of the quiz as a whole
+
+        Statistics which cannot be calculated (e.g. there are too few attempts) are returned as NaN.
+    """
+    number_of_attempts, number_of_items = matrix.shape
+    nan_items = numpy.empty(number_of_items)
+    nan_items.fill(numpy.nan)
+    if number_of_attempts < 2:
+        return {'difficulty': matrix.mean(axis=0) if number_of_attempts else nan_items, 'discrimination': nan_items,
+                'point_biserial': nan_items, 'reliability': numpy.nan}
+
+    totals = matrix.sum(axis=1)
+    difficulty = matrix.mean(axis=0)
+
+    group_size = max(int(round(number_of_attempts * DISCRIMINATION_GROUP_PROPORTION)), 1)
+    order = numpy.argsort(totals, kind='mergesort')
+    discrimination = matrix[order[-group_size:]].mean(axis=0) - matrix[order[:group_size]].mean(axis=0)
+
+    total_variance = totals.var()
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        covariance = ((matrix - difficulty) * (totals - totals.mean())[:, numpy.newaxis]).mean(axis=0)
+        point_biserial = covariance / (matrix.std(axis=0) * numpy.sqrt(total_variance))
+    point_biserial[~numpy.isfinite(point_biserial)] = numpy.nan
+
+    reliability = numpy.nan
+    if number_of_items > 1 and total_variance > 0:
+        reliability = (number_of_items / (number_of_items - 1)) * (1 - (difficulty * (1 - difficulty)).sum() / total_variance)
+
+    return {'difficulty': difficulty, 'discrimination': discrimination, 'point_biserial': point_biserial, 'reliability': reliability}
+
+
+def _to_float(value):
+    return None if numpy.isnan(value) else float(value)
+
+
+def update_analysis_for_specification(specification):
+    """Recalculates and stores the item analysis for a quiz specification."""
+    attempt_ids, question_ids, matrix = load_response_matrix(specification)
+    results = analyse_response_matrix(matrix)
+
+    with transaction.atomic():
+        analysis, created = QuizSpecificationAnalysis.objects.update_or_create(specification=specification, defaults={
+            'number_of_attempts': len(attempt_ids),
+            'reliability': _to_float(results['reliability']),
+            'date_calculated': timezone.now(),
+        })
+        analysis.items.all().delete()
+        ItemAnalysis.objects.bulk_create([
+            ItemAnalysis(
+                analysis=analysis,
+                question_id=int(question_id),
+                difficulty=_to_float(results['difficulty'][n]),
+                discrimination=_to_float(results['discrimination'][n]),
+                point_biserial=_to_float(results['point_biserial'][n]),
+            )
+            for n, question_id in enumerate(question_ids)
+        ])
+
+    return analysis
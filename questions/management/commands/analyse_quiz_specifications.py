@@ -0,0 +1,22 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from questions.models import QuizSpecification
+from questions.item_analysis import update_analysis_for_specification
+
+
+class Command(BaseCommand):
+    help = "Recalculates the item analysis for quiz specifications. Analyses every specification if no slugs are given."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*')
+
+    def handle(self, *args, **options):
+        specifications = QuizSpecification.objects.all()
+        if options['slugs']:
+            specifications = specifications.filter(slug__in=options['slugs'])
+
+        for specification in specifications:
+            analysis = update_analysis_for_specification(specification)
+            self.stdout.write("Analysed %d attempts for %s." % (analysis.number_of_attempts, specification))
@@ -0,0 +1,42 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from questions.models import Question, StudentBlockAccess
+
+
+class Command(BaseCommand):
+    help = "Checks that the block year and writing period stored on each question match its teaching activity."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', dest='fix', default=False,
+                            help="Update any questions which do not match their teaching activity.")
+
+    def handle(self, *args, **options):
+        questions = Question.objects.values_list('id', 'writing_period', 'block_year',
+                                                 'teaching_activity_year__block_week__writing_period',
+                                                 'teaching_activity_year__block_week__writing_period__block_year')
+
+        mismatched = []
+        for question_id, writing_period_id, block_year_id, expected_writing_period_id, expected_block_year_id in questions.iterator():
+            if (writing_period_id, block_year_id) != (expected_writing_period_id, expected_block_year_id):
+                mismatched.append((question_id, expected_writing_period_id, expected_block_year_id))
+                self.stdout.write("Question %s has writing period %s and block year %s, expected %s and %s." % (
+                    question_id, writing_period_id, block_year_id, expected_writing_period_id, expected_block_year_id
+                ))
+
+        if not mismatched:
+            self.stdout.write("All questions are consistent.")
+            return
+
+        if not options['fix']:
+            self.stdout.write("%d questions are inconsistent. Run with --fix to update them." % len(mismatched))
+            return
+
+        with transaction.atomic():
+            for question_id, writing_period_id, block_year_id in mismatched:
+                Question.objects.filter(id=question_id).update(writing_period=writing_period_id, block_year=block_year_id)
+            StudentBlockAccess.objects.rebuild()
+
+        self.stdout.write("Fixed %d questions." % len(mismatched))
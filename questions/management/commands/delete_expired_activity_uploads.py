@@ -0,0 +1,13 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from questions.models import ActivityUpload
+
+
+class Command(BaseCommand):
+    help = "Deletes activity uploads which are older than the staging timeout, along with their staged activities."
+
+    def handle(self, *args, **options):
+        count = ActivityUpload.objects.delete_expired()
+        self.stdout.write("Deleted %d expired activity uploads." % count)
@@ -0,0 +1,39 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questions import exports
+from questions.models import TeachingBlock
+
+
+class Command(BaseCommand):
+    help = "Exports the approved questions for every block (or the blocks with the given codes) as a zip file of documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument('codes', nargs='*', help="The codes of the blocks to export. Every block is exported if none are given.")
+        parser.add_argument('--output', dest='output', default='question_bank.zip',
+                            help="The path of the zip file to create.")
+        parser.add_argument('--processes', type=int, dest='processes', default=None,
+                            help="The number of blocks to build at once. Defaults to the number of cores.")
+        parser.add_argument('--questions-only', action='store_false', dest='show_answers', default=True,
+                            help="Leave the answers and explanations out of the documents.")
+        parser.add_argument('--base-uri', dest='base_uri', required=True,
+                            help="The address of the site, e.g. https://example.com/, used for the links to each question.")
+
+    def handle(self, *args, **options):
+        blocks = TeachingBlock.objects.all()
+        if options['codes']:
+            blocks = blocks.filter(code__in=options['codes'])
+        blocks = list(blocks)
+        if not blocks:
+            raise CommandError("There are no blocks to export.")
+
+        def progress(block, path, number_finished):
+            status = "exported" if path else "skipped as it has no approved questions"
+            self.stdout.write("%s %s (%d of %d)." % (block, status, number_finished, len(blocks)))
+
+        with open(options['output'], 'wb') as out:
+            number_of_documents = exports.export_blocks(blocks, out, options['base_uri'], show_answers=options['show_answers'],
+                                                        processes=options['processes'], progress=progress)
+
+        self.stdout.write("Exported %d blocks to %s." % (number_of_documents, options['output']))
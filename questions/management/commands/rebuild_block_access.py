@@ -0,0 +1,13 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from questions.models import StudentBlockAccess
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the record of which blocks each student is able to view approved questions for."
+
+    def handle(self, *args, **options):
+        number_of_records = StudentBlockAccess.objects.rebuild()
+        self.stdout.write("Rebuilt %d block access records." % number_of_records)
@@ -0,0 +1,13 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from questions.models import QuestionSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the summary of answers given to each question from the question attempts."
+
+    def handle(self, *args, **options):
+        number_of_summaries = QuestionSummary.objects.rebuild()
+        self.stdout.write("Rebuilt %d question summaries." % number_of_summaries)
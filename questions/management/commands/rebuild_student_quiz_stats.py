@@ -0,0 +1,13 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from questions.models import StudentQuizStats
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the quiz performance stats for each student from their question attempts."
+
+    def handle(self, *args, **options):
+        number_of_stats = StudentQuizStats.objects.rebuild()
+        self.stdout.write("Rebuilt quiz stats for %d students." % number_of_stats)
@@ -0,0 +1,16 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from questions.models import QuizSpecification, QuizSpecificationStats
+
+
+class Command(BaseCommand):
+    help = "Recalculates the score distribution for every quiz specification."
+
+    def handle(self, *args, **options):
+        specification_ids = QuizSpecification.objects.values_list('id', flat=True)
+        for specification_id in specification_ids:
+            QuizSpecificationStats.objects.refresh_for_specification(specification_id)
+
+        self.stdout.write("Refreshed the scores for %d quiz specifications." % len(specification_ids))
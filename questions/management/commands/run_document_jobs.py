@@ -0,0 +1,65 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from questions import exports
+from questions.models import DocumentJob, QuestionBankExport
+
+import signal
+import time
+import traceback
+
+
+class WorkerStopped(Exception):
+    pass
+
+
+def stop_worker(signum, frame):
+    raise WorkerStopped("The worker was stopped by signal %s." % signum)
+
+
+class Command(BaseCommand):
+    help = "Builds the documents which have been requested for download and the question bank exports requested by " \
+           "administrators, waiting for new requests until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', dest='once', default=False,
+                            help="Stop once there are no pending jobs instead of waiting for more.")
+        parser.add_argument('--sleep', type=float, dest='sleep', default=2,
+                            help="The number of seconds to wait before checking for new jobs.")
+
+    def handle(self, *args, **options):
+        # Stopping the worker interrupts the job it is building so that the job can be marked as failed.
+        signal.signal(signal.SIGTERM, stop_worker)
+        signal.signal(signal.SIGINT, stop_worker)
+        try:
+            self.run_jobs(options['once'], options['sleep'])
+        except WorkerStopped:
+            self.stdout.write("Stopped.")
+
+    def run_jobs(self, once, sleep):
+        while True:
+            close_old_connections()
+            # Students are waiting for their documents, so they are built before any exports of the question bank.
+            job, run_job = DocumentJob.objects.claim_next(), exports.run_document_job
+            if job is None:
+                job, run_job = QuestionBankExport.objects.claim_next(), exports.run_bank_export
+            if job is None:
+                if once:
+                    return
+                time.sleep(sleep)
+                continue
+
+            self.stdout.write("Starting %s." % job)
+            try:
+                run_job(job)
+            except WorkerStopped as e:
+                job.fail(unicode(e))
+                self.stderr.write("%s failed because the worker was stopped." % job)
+                raise
+            except Exception:
+                job.fail(traceback.format_exc())
+                self.stderr.write("%s failed.\n%s" % (job, job.error))
+            else:
+                self.stdout.write("Finished %s." % job)
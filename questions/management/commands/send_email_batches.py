@@ -0,0 +1,63 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from questions import emails
+from questions.models import EmailBatch
+
+import signal
+import time
+import traceback
+
+
+class MailerStopped(Exception):
+    pass
+
+
+def stop_mailer(signum, frame):
+    raise MailerStopped("The mailer sending this email was stopped by signal %s." % signum)
+
+
+class Command(BaseCommand):
+    help = "Sends the emails which have been queued for many recipients, waiting for new emails until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', dest='once', default=False,
+                            help="Stop once there are no pending emails instead of waiting for more.")
+        parser.add_argument('--sleep', type=float, dest='sleep', default=5,
+                            help="The number of seconds to wait before checking for new emails.")
+        parser.add_argument('--chunk-size', type=int, dest='chunk_size', default=None,
+                            help="The number of recipients to send to between each update of the progress.")
+
+    def handle(self, *args, **options):
+        # Stopping the mailer interrupts the batch it is sending so that the batch can be marked as failed and retried.
+        signal.signal(signal.SIGTERM, stop_mailer)
+        signal.signal(signal.SIGINT, stop_mailer)
+        try:
+            self.send_batches(options['once'], options['sleep'], options['chunk_size'])
+        except MailerStopped:
+            self.stdout.write("Stopped.")
+
+    def send_batches(self, once, sleep, chunk_size):
+        while True:
+            close_old_connections()
+            batch = EmailBatch.objects.claim_next()
+            if batch is None:
+                if once:
+                    return
+                time.sleep(sleep)
+                continue
+
+            self.stdout.write("Sending email batch %s to %s recipients." % (batch.id, batch.total))
+            try:
+                emails.send_email_batch(batch, chunk_size=chunk_size)
+            except MailerStopped as e:
+                batch.fail(unicode(e))
+                self.stderr.write("Email batch %s failed after %s recipients because the mailer was stopped." % (batch.id, batch.sent_count))
+                raise
+            except Exception:
+                batch.fail(traceback.format_exc())
+                self.stderr.write("Email batch %s failed after %s recipients.\n%s" % (batch.id, batch.sent_count, batch.error))
+            else:
+                self.stdout.write("Finished email batch %s." % batch.id)
@@ -0,0 +1,24 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from questions.models import Question
+
+
+class Command(BaseCommand):
+    help = "Regenerates the stored plain text and download sort key for every question."
+
+    def handle(self, *args, **options):
+        number_of_questions = 0
+        for question in Question.objects.all().iterator():
+            question.update_text()
+            # The fields are updated directly so that saving does not create a new revision of the question.
+            Question.objects.filter(id=question.id).update(
+                body_text=question.body_text,
+                options_text=question.options_text,
+                explanation_text=question.explanation_text,
+                download_sort_key=question.download_sort_key,
+            )
+            number_of_questions += 1
+
+        self.stdout.write("Updated the text of %d questions." % number_of_questions)
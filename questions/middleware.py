@@ -4,6 +4,7 @@ from django.shortcuts import redirect
 from django.conf import settings
 
 from .models import Stage
+from . import emails
 
 class CurrentStageMiddleware(object):
 	def process_view(self, request, view_func, view_args, view_kwargs):
@@ -14,3 +15,13 @@ class CurrentStageMiddleware(object):
 				request.user.student.get_current_stage()
 			except Stage.DoesNotExist:
 				return redirect('pick_stage')
+
+
+class DeferredEmailMiddleware(object):
+	# Holds the emails sent during a request until the response has been returned. They are sent when the request
+	# finishes, unless the view raised an exception.
+	def process_request(self, request):
+		emails.start_deferring_emails()
+
+	def process_exception(self, request, exception):
+		emails.discard_deferred_emails()
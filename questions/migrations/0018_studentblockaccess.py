@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+def populate_student_block_access(apps, schema_editor):
+    Question = apps.get_model("questions", "Question")
+    StudentBlockAccess = apps.get_model("questions", "StudentBlockAccess")
+
+    block_year_path = 'teaching_activity_year__block_week__writing_period__block_year'
+    counts = Question.objects.filter(**{'%s__isnull' % block_year_path: False}) \
+                             .values('creator', block_year_path, '%s__block' % block_year_path) \
+                             .annotate(questions_written=models.Count('id')) \
+                             .order_by()
+
+    accesses = []
+    for count in counts:
+        accesses.append(StudentBlockAccess(
+            student_id=count['creator'],
+            block_year_id=count[block_year_path],
+            block_id=count['%s__block' % block_year_path],
+            questions_written=count['questions_written'],
+            unlocked=count['questions_written'] >= settings.QUESTIONS_PER_USER,
+        ))
+
+    StudentBlockAccess.objects.bulk_create(accesses)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0017_auto_20150524_1928'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentBlockAccess',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('questions_written', models.PositiveIntegerField(default=0)),
+                ('unlocked', models.BooleanField(default=False)),
+                ('block', models.ForeignKey(related_name='student_accesses', to='questions.TeachingBlock')),
+                ('block_year', models.ForeignKey(related_name='student_accesses', to='questions.TeachingBlockYear')),
+                ('student', models.ForeignKey(related_name='block_accesses', to='questions.Student')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='studentblockaccess',
+            unique_together=set([('student', 'block_year')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='studentblockaccess',
+            index_together=set([('student', 'block', 'unlocked')]),
+        ),
+        migrations.RunPython(populate_student_block_access),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def populate_question_block_years(apps, schema_editor):
+    Question = apps.get_model("questions", "Question")
+    TeachingActivityYear = apps.get_model("questions", "TeachingActivityYear")
+
+    activity_years = TeachingActivityYear.objects.filter(block_week__isnull=False) \
+                                                 .values_list('id', 'block_week__writing_period', 'block_week__writing_period__block_year')
+    for activity_year_id, writing_period_id, block_year_id in activity_years:
+        Question.objects.filter(teaching_activity_year__id=activity_year_id) \
+                        .update(writing_period=writing_period_id, block_year=block_year_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0018_studentblockaccess'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='block_year',
+            field=models.ForeignKey(related_name='questions', blank=True, editable=False, to='questions.TeachingBlockYear', null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='writing_period',
+            field=models.ForeignKey(related_name='questions', blank=True, editable=False, to='questions.QuestionWritingPeriod', null=True),
+        ),
+        migrations.RunPython(populate_question_block_years),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+import json
+
+
+def convert_plain_text_explanations(apps, schema_editor):
+    # Older questions have a single plain text explanation for the answer. These used to be converted to the
+    # per-option format every time a question was loaded, so they are converted once here instead.
+    Question = apps.get_model("questions", "Question")
+
+    questions = Question.objects.exclude(explanation="").exclude(explanation__contains="{").values_list('id', 'options', 'answer', 'explanation')
+    for question_id, options, answer, explanation in list(questions):
+        options = json.loads(options) if options else {}
+        if "answer" in options:
+            # Questions which store an answer and distractors keep their explanations with the options.
+            continue
+
+        converted_explanation = dict((option, explanation if option == answer else "") for option in options)
+        Question.objects.filter(id=question_id).update(explanation=json.dumps(converted_explanation))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0019_question_block_year_writing_period'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_plain_text_explanations),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0020_convert_plain_text_explanations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='body_text',
+            field=models.TextField(editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='options_text',
+            field=models.TextField(editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='explanation_text',
+            field=models.TextField(editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='download_sort_key',
+            field=models.CharField(db_index=True, max_length=255, editable=False, blank=True),
+        ),
+    ]
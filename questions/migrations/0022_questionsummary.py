@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+import json
+
+
+def populate_question_summaries(apps, schema_editor):
+    QuestionAttempt = apps.get_model("questions", "QuestionAttempt")
+    QuestionSummary = apps.get_model("questions", "QuestionSummary")
+
+    counts = QuestionAttempt.objects.filter(date_completed__isnull=False, answer__isnull=False) \
+                                    .values('question', 'question__answer', 'answer') \
+                                    .annotate(
+                                        attempts=models.Count('id'),
+                                        total_confidence_rating=models.Sum('confidence_rating'),
+                                        confidence_rating_count=models.Count('confidence_rating'),
+                                        total_time_taken=models.Sum('time_taken'),
+                                        time_taken_count=models.Count('time_taken'),
+                                    ) \
+                                    .order_by()
+
+    summaries = {}
+    answer_counts = {}
+    for count in counts:
+        summary = summaries.setdefault(count['question'], QuestionSummary(question_id=count['question']))
+        answer_counts.setdefault(count['question'], {})[count['answer']] = count['attempts']
+        summary.total_attempts += count['attempts']
+        if count['answer'] == count['question__answer']:
+            summary.correct_attempts += count['attempts']
+        summary.total_confidence_rating += count['total_confidence_rating'] or 0
+        summary.confidence_rating_count += count['confidence_rating_count']
+        summary.total_time_taken += count['total_time_taken'] or 0
+        summary.time_taken_count += count['time_taken_count']
+
+    for question_id, summary in summaries.items():
+        summary.answer_counts = json.dumps(answer_counts[question_id])
+
+    QuestionSummary.objects.bulk_create(summaries.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0021_question_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSummary',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('total_attempts', models.PositiveIntegerField(default=0)),
+                ('correct_attempts', models.PositiveIntegerField(default=0)),
+                ('answer_counts', models.TextField(default='{}')),
+                ('total_confidence_rating', models.PositiveIntegerField(default=0)),
+                ('confidence_rating_count', models.PositiveIntegerField(default=0)),
+                ('total_time_taken', models.BigIntegerField(default=0)),
+                ('time_taken_count', models.PositiveIntegerField(default=0)),
+                ('question', models.OneToOneField(related_name='summary', to='questions.Question')),
+            ],
+        ),
+        migrations.RunPython(populate_question_summaries),
+    ]
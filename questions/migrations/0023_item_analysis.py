@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0022_questionsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemAnalysis',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('difficulty', models.FloatField(null=True, blank=True)),
+                ('discrimination', models.FloatField(null=True, blank=True)),
+                ('point_biserial', models.FloatField(null=True, blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizSpecificationAnalysis',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('number_of_attempts', models.PositiveIntegerField(default=0)),
+                ('reliability', models.FloatField(null=True, blank=True)),
+                ('date_calculated', models.DateTimeField()),
+                ('specification', models.OneToOneField(related_name='analysis', to='questions.QuizSpecification')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='itemanalysis',
+            name='analysis',
+            field=models.ForeignKey(related_name='items', to='questions.QuizSpecificationAnalysis'),
+        ),
+        migrations.AddField(
+            model_name='itemanalysis',
+            name='question',
+            field=models.ForeignKey(related_name='item_analyses', to='questions.Question'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='itemanalysis',
+            unique_together=set([('analysis', 'question')]),
+        ),
+    ]
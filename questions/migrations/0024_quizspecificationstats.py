@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0023_item_analysis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizSpecificationStats',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('number_of_attempts', models.PositiveIntegerField(default=0)),
+                ('average_score', models.FloatField(null=True, blank=True)),
+                ('highest_score', models.PositiveIntegerField(null=True, blank=True)),
+                ('lowest_score', models.PositiveIntegerField(null=True, blank=True)),
+                ('lower_quartile_score', models.FloatField(null=True, blank=True)),
+                ('median_score', models.FloatField(null=True, blank=True)),
+                ('upper_quartile_score', models.FloatField(null=True, blank=True)),
+                ('score_counts', models.TextField(default='{}')),
+                ('specification', models.OneToOneField(related_name='stats', to='questions.QuizSpecification')),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def populate_quiz_attempt_progress(apps, schema_editor):
+    QuizAttempt = apps.get_model("questions", "QuizAttempt")
+
+    attempts = QuizAttempt.objects.annotate(
+        number_of_questions=models.Count('questions'),
+        number_completed=models.Sum(models.Case(models.When(questions__date_completed__isnull=False, then=1), default=0, output_field=models.IntegerField())),
+        number_correct=models.Sum(models.Case(models.When(questions__answer=models.F('questions__question__answer'), then=1), default=0, output_field=models.IntegerField())),
+        last_completed=models.Max('questions__date_completed'),
+    ).values_list('id', 'number_of_questions', 'number_completed', 'number_correct', 'last_completed')
+
+    for attempt_id, question_count, completed_count, correct_count, completed_at in list(attempts):
+        completed_count = completed_count or 0
+        QuizAttempt.objects.filter(id=attempt_id).update(
+            question_count=question_count,
+            completed_count=completed_count,
+            correct_count=correct_count or 0,
+            completed_at=completed_at if completed_count >= question_count else None,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0025_question_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='completed_at',
+            field=models.DateTimeField(null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_quiz_attempt_progress),
+    ]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+import json
+
+
+def populate_student_quiz_stats(apps, schema_editor):
+    QuestionAttempt = apps.get_model("questions", "QuestionAttempt")
+    StudentQuizStats = apps.get_model("questions", "StudentQuizStats")
+
+    attempts = QuestionAttempt.objects.filter(date_completed__isnull=False) \
+                                      .values_list('quiz_attempt__student', 'answer', 'question__answer', 'question__block_year__block', 'date_completed') \
+                                      .order_by('quiz_attempt__student', 'date_completed', 'quiz_attempt', 'position')
+
+    stats = {}
+    block_counts = {}
+    for student_id, answer, correct_answer, block_id, date_completed in attempts.iterator():
+        student_stats = stats.setdefault(student_id, StudentQuizStats(student_id=student_id))
+        correct = answer == correct_answer
+
+        student_stats.number_of_attempts += 1
+        if correct:
+            student_stats.number_correct += 1
+            student_stats.current_streak += 1
+            student_stats.longest_streak = max(student_stats.longest_streak, student_stats.current_streak)
+        else:
+            student_stats.current_streak = 0
+
+        if block_id is not None:
+            counts = block_counts.setdefault(student_id, {}).setdefault(str(block_id), {"attempts": 0, "correct": 0})
+            counts["attempts"] += 1
+            if correct:
+                counts["correct"] += 1
+
+        if date_completed and (not student_stats.last_activity or date_completed > student_stats.last_activity):
+            student_stats.last_activity = date_completed
+
+    for student_id, student_stats in stats.items():
+        student_stats.block_counts = json.dumps(block_counts.get(student_id, {}))
+
+    StudentQuizStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0026_quizattempt_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentQuizStats',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('number_of_attempts', models.PositiveIntegerField(default=0)),
+                ('number_correct', models.PositiveIntegerField(default=0)),
+                ('block_counts', models.TextField(default='{}')),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('last_activity', models.DateTimeField(null=True, blank=True)),
+                ('student', models.OneToOneField(related_name='quiz_stats', to='questions.Student')),
+            ],
+        ),
+        migrations.RunPython(populate_student_quiz_stats),
+    ]
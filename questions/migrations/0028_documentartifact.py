@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0027_studentquizstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentArtifact',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('years', models.CharField(max_length=100)),
+                ('show_answers', models.BooleanField(default=False)),
+                ('content_hash', models.CharField(unique=True, max_length=40)),
+                ('file', models.FileField(upload_to='exports')),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed', models.DateTimeField(default=django.utils.timezone.now, db_index=True)),
+                ('block', models.ForeignKey(related_name='document_artifacts', to='questions.TeachingBlock')),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0028_documentartifact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentJob',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('years', models.CharField(max_length=100)),
+                ('show_answers', models.BooleanField(default=False)),
+                ('base_uri', models.CharField(max_length=200)),
+                ('status', models.IntegerField(default=0, choices=[(0, 'Pending'), (1, 'Running'), (2, 'Complete'), (3, 'Failed')])),
+                ('progress', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_started', models.DateTimeField(null=True, blank=True)),
+                ('date_completed', models.DateTimeField(null=True, blank=True)),
+                ('artifact', models.ForeignKey(related_name='jobs', on_delete=django.db.models.deletion.SET_NULL, blank=True, to='questions.DocumentArtifact', null=True)),
+                ('block', models.ForeignKey(related_name='document_jobs', to='questions.TeachingBlock')),
+                ('requested_by', models.ForeignKey(related_name='document_jobs', blank=True, to='questions.Student', null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0029_documentjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityUpload',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('token', models.UUIDField(default=uuid.uuid4, unique=True, editable=False)),
+                ('date_created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('date_committed', models.DateTimeField(null=True, blank=True)),
+                ('uploaded_by', models.ForeignKey(related_name='activity_uploads', blank=True, to='questions.Student', null=True)),
+                ('writing_period', models.ForeignKey(related_name='activity_uploads', to='questions.QuestionWritingPeriod')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StagedActivity',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('reference_id', models.IntegerField()),
+                ('name', models.CharField(max_length=150)),
+                ('activity_type', models.IntegerField(choices=[(1, 'Lecture'), (0, 'PBL'), (3, 'Practical'), (4, 'Seminar'), (5, 'Week'), (6, 'CRS')])),
+                ('week', models.CharField(max_length=50)),
+                ('position', models.IntegerField()),
+                ('status', models.IntegerField(default=0, choices=[(0, 'New'), (1, 'Changed'), (2, 'Unchanged')])),
+                ('previous_name', models.CharField(max_length=150, blank=True)),
+                ('previous_activity_type', models.IntegerField(blank=True, null=True, choices=[(1, 'Lecture'), (0, 'PBL'), (3, 'Practical'), (4, 'Seminar'), (5, 'Week'), (6, 'CRS')])),
+                ('previous_week', models.CharField(max_length=50, blank=True)),
+                ('previous_position', models.IntegerField(null=True, blank=True)),
+                ('upload', models.ForeignKey(related_name='activities', to='questions.ActivityUpload')),
+            ],
+            options={
+                'ordering': ('upload', 'week', 'position', 'reference_id'),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='stagedactivity',
+            unique_together=set([('upload', 'reference_id')]),
+        ),
+    ]
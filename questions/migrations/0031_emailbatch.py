@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0030_activityupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailBatch',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('subject', models.CharField(max_length=200)),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(max_length=200)),
+                ('recipients', models.TextField()),
+                ('status', models.IntegerField(default=0, choices=[(0, 'Pending'), (1, 'Sending'), (2, 'Complete'), (3, 'Failed')])),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_recipients', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_started', models.DateTimeField(null=True, blank=True)),
+                ('date_completed', models.DateTimeField(null=True, blank=True)),
+                ('block_year', models.ForeignKey(related_name='email_batches', blank=True, to='questions.TeachingBlockYear', null=True)),
+                ('sent_by', models.ForeignKey(related_name='email_batches', blank=True, to='questions.Student', null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+# Case-insensitive prefix lookups are compared as UPPER(username::text) LIKE 'ABC%' by PostgreSQL, so the index has to
+# be on the same expression. The pattern operator class lets the index be used for LIKE in any locale.
+CREATE_INDEX_SQL = 'CREATE INDEX auth_user_username_upper_like ON auth_user (UPPER(username::text) text_pattern_ops)'
+DROP_INDEX_SQL = 'DROP INDEX IF EXISTS auth_user_username_upper_like'
+
+
+def create_username_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX_SQL)
+
+
+def drop_username_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0031_emailbatch'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_username_search_index, drop_username_search_index),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0032_user_username_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='documentjob',
+            name='date_updated',
+            field=models.DateTimeField(null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def clear_shuffled_question_text(apps, schema_editor):
+    # Older questions store an answer and a list of distractors which are shuffled whenever they are decoded, so
+    # their stored text doesn't match the order of the options and is generated when it is needed instead.
+    Question = apps.get_model("questions", "Question")
+    Question.objects.filter(options__contains='"distractor"').update(options_text="", explanation_text="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0033_documentjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_shuffled_question_text, migrations.RunPython.noop),
+    ]
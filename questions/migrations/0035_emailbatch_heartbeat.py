@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0034_clear_shuffled_question_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailbatch',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='emailbatch',
+            name='date_updated',
+            field=models.DateTimeField(null=True, blank=True),
+        ),
+    ]
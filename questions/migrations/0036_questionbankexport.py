@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0035_emailbatch_heartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionBankExport',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('show_answers', models.BooleanField(default=True)),
+                ('base_uri', models.CharField(max_length=200)),
+                ('status', models.IntegerField(default=0, choices=[(0, 'Pending'), (1, 'Running'), (2, 'Complete'), (3, 'Failed')])),
+                ('progress', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('file', models.FileField(upload_to='exports', blank=True)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_started', models.DateTimeField(null=True, blank=True)),
+                ('date_updated', models.DateTimeField(null=True, blank=True)),
+                ('date_completed', models.DateTimeField(null=True, blank=True)),
+                ('blocks', models.ManyToManyField(related_name='bank_exports', to='questions.TeachingBlock')),
+                ('requested_by', models.ForeignKey(related_name='bank_exports', blank=True, to='questions.Student', null=True)),
+            ],
+        ),
+    ]
@@ -1,12 +1,13 @@
 from __future__ import division
 
-from django.db import models
+from django.db import models, transaction
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.utils.html import format_html
 from django.utils.datastructures import SortedDict
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes import generic
 from django.template.defaultfilters import linebreaksbr
@@ -20,6 +21,8 @@ import datetime
 import string
 import random
 import hashlib
+import urlparse
+import uuid
 import collections
 from HTMLParser import HTMLParser
 from htmlentitydefs import name2codepoint, codepoint2name
@@ -52,6 +55,14 @@ class classproperty(property):
         return self.fget.__get__(None, owner)()
 
 
+def status_property(status, default=None):
+    """Returns a property which checks whether an object has a particular status, e.g. question.approved. If the object has no status, default is used instead."""
+    def check_status(self):
+        current_status = default if self.status is None else self.status
+        return current_status == status
+    return property(check_status)
+
+
 class ObjectCacheMixin(object):
     def set_cache_value(self, attribute, value):
         setattr(self, attribute, value)
@@ -244,12 +255,8 @@ class TeachingBlock(models.Model):
     def approved_questions_are_viewable_by(self, student):
         if student.user.is_superuser: return True
 
-        # A student can view approved questions if they have written questions for the block at some point.
-        block_years = self.years.filter(writing_periods__weeks__activities__questions__creator=student) \
-                                .annotate(questions_written=models.Count('writing_periods__weeks__activities__questions')) \
-                                .filter(questions_written__gte=settings.QUESTIONS_PER_USER)
-
-        return block_years.exists()
+        # A student can view approved questions if they have written enough questions for the block at some point.
+        return StudentBlockAccess.objects.filter(student=student, block=self, unlocked=True).exists()
 
     def name_for_form_fields(self):
         return self.name.replace(" ", "_").replace(",", "").lower()
@@ -285,10 +292,7 @@ class TeachingBlockYearManager(models.Manager):
         block_years = self.get_queryset().annotate(latest_release_year=models.Max('block__years__year')).filter(year__lte=models.F('latest_release_year'))
 
         if not student.user.is_superuser:
-            block_years = block_years.filter(writing_periods__weeks__activities__questions__creator=student) \
-                                    .annotate(questions_written=models.Count("writing_periods__weeks__activities__questions")) \
-                                    .filter(questions_written__gte=settings.QUESTIONS_PER_USER) \
-                                    .distinct()
+            block_years = block_years.filter(student_accesses__student=student, student_accesses__unlocked=True)
 
         return block_years
 
@@ -336,9 +340,6 @@ class TeachingBlockYear(models.Model, ObjectCacheMixin):
     def get_activity_upload_submit_url(self):
         return reverse('block-activity-upload-submit', kwargs=self.get_url_kwargs())
 
-    def get_activity_upload_confirm_url(self):
-        return reverse('block-activity-upload-confirm', kwargs=self.get_url_kwargs())
-
     def get_admin_url(self):
         return "%s?year=%s" % (self.block.get_admin_url(), self.year)
 
@@ -381,7 +382,7 @@ class TeachingBlockYear(models.Model, ObjectCacheMixin):
         return bool(self.writing_period_for_student(student)) and self.writing_period_for_student(student).can_write_questions
 
     def questions_for_status(self, status):
-        return Question.objects.filter(teaching_activity_year__block_week__writing_period__block_year=self, status=status)
+        return Question.objects.filter(block_year=self, status=status)
 
     def approved_questions(self):
         return self.questions_for_status(status=Question.APPROVED_STATUS)
@@ -390,10 +391,84 @@ class TeachingBlockYear(models.Model, ObjectCacheMixin):
         return self.approved_questions().count()
 
     def question_count_for_student(self, s):
-        return Question.objects.filter(teaching_activity_year__block_week__writing_period__block_year=self, creator=s).count()
+        return Question.objects.filter(block_year=self, creator=s).count()
 
     def questions_written_for_student(self, s):
-        return Question.objects.filter(teaching_activity_year__block_week__writing_period__block_year=self, creator=s).exists()
+        return Question.objects.filter(block_year=self, creator=s).exists()
+
+
+class StudentBlockAccessManager(models.Manager):
+    def refresh_for_student_and_block_year(self, student_id, block_year_id):
+        # Recounts the questions a student has written for a block year and unlocks the block if they have written enough.
+        questions_written = Question.objects.filter(creator__id=student_id, block_year__id=block_year_id).count()
+
+        if not questions_written:
+            self.get_queryset().filter(student__id=student_id, block_year__id=block_year_id).delete()
+            return None
+
+        block_id = TeachingBlockYear.objects.filter(id=block_year_id).values_list('block', flat=True).get()
+        access, created = self.get_queryset().update_or_create(student_id=student_id, block_year_id=block_year_id, defaults={
+            'block_id': block_id,
+            'questions_written': questions_written,
+            'unlocked': questions_written >= settings.QUESTIONS_PER_USER,
+        })
+        return access
+
+    def refresh_for_block_years(self, block_year_ids):
+        # Recounts every student who has written questions for the given block years.
+        students = Question.objects.filter(block_year__id__in=block_year_ids).values_list('creator', 'block_year').distinct()
+        existing = self.get_queryset().filter(block_year__id__in=block_year_ids).values_list('student', 'block_year')
+        for student_id, block_year_id in set(students) | set(existing):
+            self.refresh_for_student_and_block_year(student_id, block_year_id)
+
+    def rebuild(self):
+        # Recalculates access for every student from scratch using a single grouped query.
+        counts = Question.objects.filter(block_year__isnull=False) \
+                                 .values('creator', 'block_year', 'block_year__block') \
+                                 .annotate(questions_written=models.Count('id')) \
+                                 .order_by()
+
+        accesses = []
+        for count in counts:
+            accesses.append(StudentBlockAccess(
+                student_id=count['creator'],
+                block_year_id=count['block_year'],
+                block_id=count['block_year__block'],
+                questions_written=count['questions_written'],
+                unlocked=count['questions_written'] >= settings.QUESTIONS_PER_USER,
+            ))
+
+        with transaction.atomic():
+            self.get_queryset().delete()
+            self.bulk_create(accesses)
+
+        return len(accesses)
+
+
+class StudentBlockAccess(models.Model):
+    """
+        A record of how many questions a student has written for a particular block year.
+        * questions_written: the number of questions the student has written for the block year
+        * unlocked: whether the student has written enough questions to view approved questions for the block
+
+        The block is stored alongside the block year so that permission checks for a block only need a single lookup.
+        These records are kept up to date when questions are saved or deleted, and can be rebuilt using the
+        rebuild_block_access management command.
+    """
+    student = models.ForeignKey(Student, related_name="block_accesses")
+    block = models.ForeignKey(TeachingBlock, related_name="student_accesses")
+    block_year = models.ForeignKey(TeachingBlockYear, related_name="student_accesses")
+    questions_written = models.PositiveIntegerField(default=0)
+    unlocked = models.BooleanField(default=False)
+
+    objects = StudentBlockAccessManager()
+
+    class Meta:
+        unique_together = ('student', 'block_year')
+        index_together = ('student', 'block', 'unlocked')
+
+    def __unicode__(self):
+        return "%s: %s (%d)" % (self.student, self.block_year, self.questions_written)
 
 
 class QuestionWritingPeriodManager(models.Manager):
@@ -441,9 +516,6 @@ class QuestionWritingPeriod(models.Model):
     def get_activity_upload_submit_url(self):
         return reverse('block-admin-period-upload-submit', kwargs=self.get_url_kwargs())
 
-    def get_activity_upload_confirm_url(self):
-        return reverse('block-admin-period-upload-confirm', kwargs=self.get_url_kwargs())
-
     def get_edit_url(self):
         return reverse('block-admin-period-edit', kwargs=self.get_url_kwargs())
 
@@ -474,7 +546,7 @@ class QuestionWritingPeriod(models.Model):
         return Student.objects.filter(assigned_activities__block_week__writing_period=self).distinct().count()
 
     def total_questions_count(self):
-        return Question.objects.filter(teaching_activity_year__block_week__writing_period=self).exclude(status=Question.DELETED_STATUS).count()
+        return Question.objects.filter(writing_period=self).exclude(status=Question.DELETED_STATUS).count()
 
 
 
@@ -859,6 +931,125 @@ class TeachingActivityYear(models.Model):
             question.assign_to_student(student)
 
 
+class ActivityUploadManager(models.Manager):
+    def get_from_kwargs(self, **kwargs):
+        return self.get_queryset().select_related('writing_period__block_year__block').get(
+            token=kwargs.get('token'), writing_period__id=kwargs.get('id'),
+            writing_period__block_year__block__code=kwargs.get('code'), writing_period__block_year__year=kwargs.get('year'),
+        )
+
+    def delete_expired(self):
+        # Uploads are only needed until they are confirmed, so any which are older than the timeout are removed along
+        # with their staged activities.
+        expiry = timezone.now() - datetime.timedelta(seconds=ActivityUpload.STAGING_TIMEOUT)
+        expired = self.get_queryset().filter(date_created__lt=expiry)
+        count = expired.count()
+        expired.delete()
+        return count
+
+
+class ActivityUpload(models.Model):
+    """
+        An activity upload which has been validated and is waiting to be confirmed.
+        * token: identifies the upload in its URLs
+        * date_committed: when the staged activities were saved to the writing period
+    """
+    # The number of seconds an upload can wait to be confirmed before it is deleted.
+    STAGING_TIMEOUT = 60 * 60 * 24
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    writing_period = models.ForeignKey(QuestionWritingPeriod, related_name="activity_uploads")
+    uploaded_by = models.ForeignKey(Student, related_name="activity_uploads", blank=True, null=True)
+    date_created = models.DateTimeField(auto_now_add=True, db_index=True)
+    date_committed = models.DateTimeField(blank=True, null=True)
+
+    objects = ActivityUploadManager()
+
+    def __unicode__(self):
+        return "Activity upload %s for %s" % (self.token.hex, self.writing_period)
+
+    def get_url_kwargs(self):
+        url_kwargs = self.writing_period.get_url_kwargs()
+        url_kwargs['token'] = self.token.hex
+        return url_kwargs
+
+    def get_absolute_url(self):
+        return reverse('block-admin-period-upload-review', kwargs=self.get_url_kwargs())
+
+    def get_confirm_url(self):
+        return reverse('block-admin-period-upload-confirm', kwargs=self.get_url_kwargs())
+
+    def committed(self):
+        return self.date_committed is not None
+    committed = property(committed)
+
+    def expired(self):
+        return self.date_created < timezone.now() - datetime.timedelta(seconds=self.STAGING_TIMEOUT)
+    expired = property(expired)
+
+    def status_counts(self):
+        counts = dict(self.activities.order_by().values_list('status').annotate(count=models.Count('id')))
+        return [(status, name, counts.get(status, 0)) for status, name in StagedActivity.STATUS_CHOICES]
+
+
+class StagedActivity(models.Model):
+    """
+        A row of an activity upload, compared against the activities which already exist.
+        * status: whether the activity is new, changes an existing activity or its week and position in the writing
+          period, or is already in the writing period unchanged
+        * previous_name, previous_activity_type: the current details of an existing activity
+        * previous_week, previous_position: where an existing activity currently is in the writing period, if at all
+    """
+    NEW_STATUS = 0
+    CHANGED_STATUS = 1
+    UNCHANGED_STATUS = 2
+    STATUS_CHOICES = (
+        (NEW_STATUS, 'New'),
+        (CHANGED_STATUS, 'Changed'),
+        (UNCHANGED_STATUS, 'Unchanged'),
+    )
+
+    upload = models.ForeignKey(ActivityUpload, related_name="activities")
+    reference_id = models.IntegerField()
+    name = models.CharField(max_length=150)
+    activity_type = models.IntegerField(choices=TeachingActivity.TYPE_CHOICES)
+    week = models.CharField(max_length=50)
+    position = models.IntegerField()
+    status = models.IntegerField(choices=STATUS_CHOICES, default=NEW_STATUS)
+    previous_name = models.CharField(max_length=150, blank=True)
+    previous_activity_type = models.IntegerField(choices=TeachingActivity.TYPE_CHOICES, blank=True, null=True)
+    previous_week = models.CharField(max_length=50, blank=True)
+    previous_position = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('upload', 'reference_id')
+        ordering = ('upload', 'week', 'position', 'reference_id')
+
+    new = status_property(NEW_STATUS)
+    changed = status_property(CHANGED_STATUS)
+    unchanged = status_property(UNCHANGED_STATUS)
+
+    def __unicode__(self):
+        return "%s (%s)" % (self.name, self.reference_id)
+
+    def name_changed(self):
+        return self.changed and self.name != self.previous_name
+
+    def activity_type_changed(self):
+        return self.changed and self.activity_type != self.previous_activity_type
+
+    def week_changed(self):
+        return self.changed and (self.week, self.position) != (self.previous_week, self.previous_position)
+
+
+APPROVED_QUESTION_IDS_CACHE_KEY = "approved_question_ids_%s"
+# The candidate ids are cleared when questions are approved or moved, but the cache may be local to each process,
+# so the ids are also refreshed regularly.
+APPROVED_QUESTION_IDS_CACHE_TIMEOUT = 60 * 10
+QUESTION_JSON_CACHE_KEY = "question_json_%s_%s_%s"
+QUESTION_JSON_CACHE_TIMEOUT = 60 * 60 * 24
+
+
 class QuestionManager(models.Manager):
     def get_from_kwargs(self, **kwargs):
         allow_deleted = kwargs.get('allow_deleted', False)
@@ -871,8 +1062,55 @@ class QuestionManager(models.Manager):
         return questions.get()
 
     def get_approved_questions_for_block_and_years(self, block, years):
-        return self.get_queryset().filter(teaching_activity_year__teaching_activity__years__block_week__writing_period__block_year__block=block, teaching_activity_year__block_week__writing_period__block_year__year__in=years) \
-                                   .filter(status=Question.APPROVED_STATUS).distinct()
+        # A question belongs to a block if its activity has ever been taught in the block, even if the question was
+        # written for the activity in another block. The activities are found with a subquery so that each question is
+        # only returned once.
+        activities = TeachingActivity.objects.filter(years__block_week__writing_period__block_year__block=block)
+        return self.get_queryset().filter(teaching_activity_year__teaching_activity__in=activities, block_year__year__in=years) \
+                                   .filter(status=Question.APPROVED_STATUS)
+
+    def get_approved_question_ids_for_block(self, block):
+        cache_key = APPROVED_QUESTION_IDS_CACHE_KEY % block.id
+        question_ids = cache.get(cache_key)
+        if question_ids is None:
+            question_ids = list(self.get_queryset().filter(block_year__block=block, status=Question.APPROVED_STATUS).values_list('id', flat=True))
+            cache.set(cache_key, question_ids, APPROVED_QUESTION_IDS_CACHE_TIMEOUT)
+
+        return question_ids
+
+    def clear_approved_question_ids(self, block_ids):
+        cache.delete_many([APPROVED_QUESTION_IDS_CACHE_KEY % block_id for block_id in block_ids if block_id])
+
+    def get_question_ids_attempted_by(self, student):
+        return set(QuestionAttempt.objects.filter(quiz_attempt__student=student).values_list('question', flat=True))
+
+    def sample_approved_question_ids_for_block(self, block, number_of_questions, excluded_ids=None):
+        # Chooses random approved question ids for a block without loading the questions themselves.
+        candidate_ids = self.get_approved_question_ids_for_block(block)
+        if excluded_ids:
+            candidate_ids = list(set(candidate_ids) - excluded_ids)
+
+        return random.sample(candidate_ids, min(number_of_questions, len(candidate_ids)))
+
+    def get_cached_json_reprs(self, questions, include_answer=False):
+        # Returns a dictionary of question ids to their JSON representations. The representations are cached by
+        # revision, so a question's cached representation is replaced as soon as it is saved.
+        questions_by_key = dict((question.json_repr_cache_key(include_answer), question) for question in questions)
+        json_reprs = cache.get_many(questions_by_key.keys())
+
+        missing = {}
+        for key, question in questions_by_key.items():
+            if key not in json_reprs:
+                json_reprs[key] = missing[key] = question.json_repr(include_answer=include_answer)
+        if missing:
+            cache.set_many(missing, QUESTION_JSON_CACHE_TIMEOUT)
+
+        return dict((question.id, json_reprs[key]) for key, question in questions_by_key.items())
+
+    def get_approved_questions_in_order(self, question_ids):
+        # Fetches the questions in one query, leaving out any which are no longer approved since the ids were cached.
+        questions = self.get_queryset().filter(status=Question.APPROVED_STATUS).in_bulk(question_ids)
+        return [questions[question_id] for question_id in question_ids if question_id in questions]
 
 
 class QuestionParser(HTMLParser):
@@ -899,8 +1137,8 @@ class QuestionParser(HTMLParser):
         self.parsed_string += c  
 
 
-@reversion.register(exclude=["approver", "date_assigned", "date_completed", "requires_special_formatting", "approver"])
-class Question(models.Model):
+@reversion.register(exclude=["approver", "date_assigned", "date_completed", "requires_special_formatting", "approver", "block_year", "writing_period", "body_text", "options_text", "explanation_text", "download_sort_key", "revision"])
+class Question(models.Model, ObjectCacheMixin):
     APPROVED_STATUS = 0
     PENDING_STATUS = 1
     DELETED_STATUS = 2
@@ -921,6 +1159,16 @@ class Question(models.Model):
         (DELETED_STATUS, "Delete"),
     )
 
+    OPTIONS_CACHE = "_options_cached"
+    EXPLANATION_CACHE = "_explanation_cached"
+    STATISTICS_CACHE = "_statistics_cached"
+
+    approved = status_property(APPROVED_STATUS)
+    pending = status_property(PENDING_STATUS)
+    deleted = status_property(DELETED_STATUS)
+    flagged = status_property(FLAGGED_STATUS)
+    editing = status_property(EDITING_STATUS)
+
     body = models.TextField()
     options = models.TextField(blank=True)
     answer = models.CharField(max_length=1)
@@ -935,6 +1183,18 @@ class Question(models.Model):
     date_assigned = models.DateTimeField(blank=True, null=True)
     date_completed = models.DateTimeField(blank=True, null=True)
     approver = models.ForeignKey(Student, related_name="assigned_questions", blank=True, null=True)
+    # Copied from the teaching activity year when the question is saved, so that questions can be filtered by
+    # block or writing period without joining through the activity and week tables.
+    block_year = models.ForeignKey(TeachingBlockYear, related_name="questions", blank=True, null=True, editable=False)
+    writing_period = models.ForeignKey(QuestionWritingPeriod, related_name="questions", blank=True, null=True, editable=False)
+    # Plain text versions of the question which are generated when the question is saved, so that the HTML does not
+    # need to be parsed again when the question is exported or sorted. The options and explanations are JSON lists.
+    body_text = models.TextField(blank=True, editable=False)
+    options_text = models.TextField(blank=True, editable=False)
+    explanation_text = models.TextField(blank=True, editable=False)
+    download_sort_key = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    # Increased every time the question is saved, so that anything cached for an older revision is no longer used.
+    revision = models.PositiveIntegerField(default=0, editable=False)
 
     reasons = generic.GenericRelation('questions.Reason', content_type_field="related_object_content_type", object_id_field="related_object_id")
 
@@ -946,42 +1206,38 @@ class Question(models.Model):
             ('can_approve', 'Can approve questions'),
         )
 
-    def __init__(self, *args, **kwargs):
-        super(Question, self).__init__(*args, **kwargs)
-        # Adds properties to the model to check the status, e.g. self.approved, self.flagged
-        attribute_list = self.__class__.__dict__.keys()
-        for k in attribute_list:
-            if not "_STATUS" in k or hasattr(self, k.split("_")[0].lower()):
-                continue
-
-            self.add_model_status_property_method(k)
-
-        self.sorted_options = None
-
-        if '"answer":' in self.options:
-            self.sorted_options = SortedDict()
-            self.answer_letter = ""
-            decoded_options = json.loads(self.options)
-            flattened_options = [decoded_options["answer"], ] + decoded_options["distractor"]
-            random.shuffle(flattened_options)
-            for letter, option in zip(string.uppercase[:5], flattened_options):
-                self.sorted_options[letter] = option
-                if option == decoded_options["answer"]:
-                    self.answer_letter = letter
-
-        if self.explanation and "{" not in self.explanation:
-            explanation = self.options_dict()
-            for option, label in explanation.items():
-                if option == self.answer:
-                    explanation[option] = self.explanation
-                else:
-                    explanation[option] = ""
-
-            self.explanation = json.dumps(explanation)
-
     def __str__(self):
         return "%s" % (self.id,)
 
+    def save(self, *args, **kwargs):
+        self.update_block_year_and_writing_period()
+        self.update_text()
+        self.revision += 1
+        super(Question, self).save(*args, **kwargs)
+
+    def update_text(self):
+        self.body_text = self.parser.parse_string(self.body)
+        if self.sorted_options:
+            # Older questions are shuffled into a different order each time they are decoded, so stored text would not
+            # line up with the options. Their text is generated from the same decoded options whenever it is needed.
+            self.options_text = self.explanation_text = ""
+        else:
+            self.options_text = json.dumps([self.parser.parse_string(o) for o in self.options_list()])
+            self.explanation_text = json.dumps([self.parser.parse_string(e) for e in self.explanation_list()])
+
+        # Questions are sorted in downloads by their text reversed, ignoring the final punctuation mark, so that
+        # questions with similar endings (e.g. "...is the most likely diagnosis?") are grouped together.
+        sort_text = self.body_text.strip()
+        if sort_text and sort_text[-1] in "?:.":
+            sort_text = sort_text[:-1]
+        self.download_sort_key = sort_text[::-1][:255]
+
+    def update_block_year_and_writing_period(self):
+        writing_period_and_block_year = TeachingActivityYear.objects.filter(id=self.teaching_activity_year_id) \
+                                                                    .values_list('block_week__writing_period', 'block_week__writing_period__block_year') \
+                                                                    .first()
+        self.writing_period_id, self.block_year_id = writing_period_and_block_year or (None, None)
+
     def _get_text(self, element):
         element_text = ""
         formatting_tags = {'sup': '^', 'sub': '_'}
@@ -1006,14 +1262,7 @@ class Question(models.Model):
             body_text += self._get_text(element)
 
         body_text = body_text.replace(u'\xa0', u' ')
-        new_body_text = ""
-        for c in body_text:
-            if ord(c) in codepoint2name:
-                new_body_text += codepoint2name[ord(c)]
-            else:
-                new_body_text += c
-
-        return new_body_text
+        return "".join(codepoint2name.get(ord(c), c) for c in body_text)
 
     def get_body_text(self):
         soup = bs4.BeautifulSoup(self.body)
@@ -1072,12 +1321,6 @@ class Question(models.Model):
         # 2. They are an approver (or the superuser).
         return (self.creator == student and self.teaching_activity_year.questions_can_be_written_by(student)) or (self.approved and self.teaching_activity_year.teaching_activity.approved_questions_are_viewable_by(student))
 
-    def add_model_status_property_method(self, k):
-        def check_status_function(self):
-            return self.status == getattr(Question, k)
-
-        setattr(self.__class__, k.split("_")[0].lower(), property(check_status_function))
-
     def json_repr(self, include_answer=False):
         options = self.options_dict()
         label = options.keys()
@@ -1095,30 +1338,67 @@ class Question(models.Model):
 
         return json_repr
 
+    def json_repr_cache_key(self, include_answer=False):
+        return QUESTION_JSON_CACHE_KEY % (self.id, self.revision, "answer" if include_answer else "question")
+
     def unicode_body(self):
+        if self.body_text:
+            return self.body_text
+
         return self.parser.parse_string(self.body)
 
     def unicode_options_list(self):
-        ol = self.options_list()
+        if self.options_text:
+            return json.loads(self.options_text)
 
-        return [self.parser.parse_string(o) for o in ol]
+        return [self.parser.parse_string(o) for o in self.options_list()]
 
     def unicode_explanation_list(self):
-        el = self.explanation_list()
+        if self.explanation_text:
+            return json.loads(self.explanation_text)
 
-        return [self.parser.parse_string(e) for e in el]
+        return [self.parser.parse_string(e) for e in self.explanation_list()]
 
-    def options_dict(self):
-        if self.sorted_options:
-            return dict((letter, option["text"]) for letter, option in self.sorted_options.items())
+    def _decoded_options(self):
+        # The options are decoded once and kept until the raw JSON changes. Older questions store the options as an
+        # answer and a list of distractors, which are shuffled into lettered options the first time they are decoded.
+        cached = self.get_cache_value(self.OPTIONS_CACHE)
+        if cached and cached[0] == self.options:
+            return cached[1]
+
+        decoded_options = json.loads(self.options) if self.options else {}
+        sorted_options = None
+        answer_letter = ""
+        options = SortedDict()
+
+        if "answer" in decoded_options:
+            sorted_options = SortedDict()
+            flattened_options = [decoded_options["answer"], ] + decoded_options["distractor"]
+            random.shuffle(flattened_options)
+            for letter, option in zip(string.uppercase[:5], flattened_options):
+                sorted_options[letter] = option
+                options[letter] = option["text"]
+                if option == decoded_options["answer"]:
+                    answer_letter = letter
         else:
-            d = SortedDict()
-            e = json.loads(self.options)
-            f = e.keys()
-            f.sort()
-            for k in f:
-                d[k] = e[k]
-        return d
+            for key in sorted(decoded_options.keys()):
+                options[key] = decoded_options[key]
+
+        decoded = (sorted_options, answer_letter, options)
+        self.set_cache_value(self.OPTIONS_CACHE, (self.options, decoded))
+        return decoded
+
+    def sorted_options(self):
+        return self._decoded_options()[0]
+    sorted_options = property(sorted_options)
+
+    def answer_letter(self):
+        return self._decoded_options()[1]
+    answer_letter = property(answer_letter)
+
+    def options_dict(self):
+        # A copy is returned so that callers can modify it without affecting the cached options.
+        return SortedDict(self._decoded_options()[2])
 
     def options_dict_text(self):
         d = self.options_dict()
@@ -1130,19 +1410,14 @@ class Question(models.Model):
         return d
 
     def options_list(self):
-        if self.sorted_options:
-            return [option["text"] for option in self.sorted_options.values()]
-        else:
-            l = list(json.loads(self.options).iteritems())
-            l.sort(key=lambda x: x[0])
-            return [j for i, j in l]
+        return self._decoded_options()[2].values()
 
     def options_tuple(self):
-        j = json.loads(self.options)
-        return [(c, j[c]) for c in string.ascii_uppercase[:len(j)]]
+        options = self._decoded_options()[2]
+        return [(c, options[c]) for c in string.ascii_uppercase[:len(options)]]
 
     def option_value(self, option):
-        return self.options_dict()[option]
+        return self._decoded_options()[2][option]
 
     def correct_answer(self):
         return self.answer or self.answer_letter
@@ -1153,19 +1428,16 @@ class Question(models.Model):
     def decode_explanation(self, explanation=None):
         explanation = explanation or self.explanation
         explanation_dict = SortedDict()
-        if self.sorted_options:
-            for letter, option in self.sorted_options.items():
+        sorted_options = self.sorted_options
+        if sorted_options:
+            for letter, option in sorted_options.items():
                 explanation_dict[letter] = option["explanation"]
         else:
-            if "{" in self.explanation:
-                explanation = json.loads(self.explanation)
+            if "{" in explanation:
+                explanation = json.loads(explanation)
             else:
-                explanation = self.options_dict()
-                for option, label in explanation.items():
-                    if option == self.answer:
-                        explanation[option] = self.explanation
-                    else:
-                        explanation[option] = ""
+                # Older questions only have an explanation for the answer.
+                explanation = dict((option, explanation if option == self.answer else "") for option in self._decoded_options()[2])
             keys = explanation.keys()
             keys.sort()
             for key in keys:
@@ -1174,7 +1446,14 @@ class Question(models.Model):
         return explanation_dict
 
     def explanation_dict(self):
-        return self.decode_explanation()
+        # The decoded explanation depends on the options as well, as older questions store it with the options.
+        key = (self.explanation, self.options)
+        cached = self.get_cache_value(self.EXPLANATION_CACHE)
+        if not cached or cached[0] != key:
+            cached = (key, self.decode_explanation())
+            self.set_cache_value(self.EXPLANATION_CACHE, cached)
+
+        return SortedDict(cached[1])
 
     def explanation_for_answer(self):
         explanation = self.explanation_dict()
@@ -1190,13 +1469,22 @@ class Question(models.Model):
         return self.comments.filter(reply_to__isnull=True)
 
     def block(self):
-        return self.teaching_activity_year.block_week.writing_period.block_year
+        return self.block_year
+
+    def statistics(self):
+        value = self.get_cache_value(self.STATISTICS_CACHE)
+        if value is not None:
+            return value
+
+        statistics = QuestionStatistics([self.id, ]).for_question(self.id)
+        self.set_cache_value(self.STATISTICS_CACHE, statistics)
+        return statistics
 
     def number_correct_attempts(self):
-        return self.attempts.filter(answer=models.F("question__answer")).count()
+        return self.statistics().correct_attempts
 
     def total_attempts(self):
-        return self.attempts.count()
+        return self.statistics().total_attempts
 
     def success_rate(self):
         return self.number_correct_attempts() / self.total_attempts()
@@ -1205,36 +1493,113 @@ class Question(models.Model):
         return self.success_rate() * 100
 
     def get_average_confidence_rating(self):
-        return self.attempts.aggregate(models.Avg('confidence_rating'))['confidence_rating__avg']
+        return self.statistics().average_confidence_rating
 
     def answer_ratios(self):
-        ratio_dict = {}
-        for option in self.options_dict():
-            ratio_dict[option] = self.attempts.filter(answer=option).count()
+        return self.statistics().answer_ratios(self.options_dict())
 
-        ratio_dict[QuestionAttempt.DEFAULT_ANSWER] = self.attempts.filter(answer="").count()
+    def discrimination(self, specification=None):
+        # Discrimination is calculated for every question in a quiz specification at once (see questions.item_analysis),
+        # so this uses the latest stored analysis for the question.
+        item_analyses = self.item_analyses.order_by('-analysis__date_calculated')
+        if specification:
+            item_analyses = item_analyses.filter(analysis__specification=specification)
 
-        total_answers = sum(ratio_dict.values())
+        item_analysis = item_analyses.first()
+        if not item_analysis or item_analysis.discrimination is None:
+            return 0
+        return item_analysis.discrimination
 
-        if total_answers == 0:
-            ratio_dict = dict((k, 0) for k in ratio_dict)
-        else:
-            ratio_dict = dict((k, v / total_answers) for k,v in ratio_dict.iteritems())
 
-        return ratio_dict
+@receiver(models.signals.pre_save, sender=Question)
+def remember_previous_question_values(sender, instance, **kwargs):
+    # Keep track of who wrote the question, where it was and its status, in case any of these change.
+    if kwargs['raw'] or not instance.pk:
+        return
 
-    def discrimination(self):
-        test_quiz_attempts = list(self.attempts.filter(quiz_attempt__quiz_specification__id=4))
-        test_quiz_attempts.sort(key=lambda a: a.quiz_attempt.score())
+    instance._previous_values = Question.objects.filter(pk=instance.pk).values_list('creator', 'block_year', 'block_year__block', 'status').first()
 
-        if len(test_quiz_attempts) < 2: return 0
 
-        group_size = int(round(len(test_quiz_attempts) * 0.3))
-        upper_group = test_quiz_attempts[-group_size:]
-        lower_group = test_quiz_attempts[:group_size]
+@receiver(models.signals.post_save, sender=Question)
+def update_block_access_on_save(sender, instance, **kwargs):
+    if kwargs['raw']:
+        return
 
-        difference = sum(qa.score() for qa in upper_group) - sum(qa.score() for qa in lower_group)
-        return difference/group_size
+    current = (instance.creator_id, instance.block_year_id)
+    previous_values = getattr(instance, "_previous_values", None)
+    previous = previous_values[:2] if previous_values else None
+    if previous and previous != current and previous[1]:
+        StudentBlockAccess.objects.refresh_for_student_and_block_year(*previous)
+
+    if instance.block_year_id:
+        StudentBlockAccess.objects.refresh_for_student_and_block_year(*current)
+
+
+@receiver(models.signals.post_save, sender=Question)
+def update_approved_question_ids_on_save(sender, instance, **kwargs):
+    if kwargs['raw']:
+        return
+
+    previous_values = getattr(instance, "_previous_values", None)
+    if previous_values:
+        creator_id, block_year_id, block_id, status = previous_values
+        if (block_year_id, status) == (instance.block_year_id, instance.status):
+            return
+        if status == Question.APPROVED_STATUS:
+            Question.objects.clear_approved_question_ids([block_id, ])
+
+    if instance.approved and instance.block_year_id:
+        Question.objects.clear_approved_question_ids(TeachingBlockYear.objects.filter(id=instance.block_year_id).values_list('block', flat=True))
+
+
+@receiver(models.signals.post_delete, sender=Question)
+def update_block_access_on_delete(sender, instance, **kwargs):
+    if instance.block_year_id:
+        StudentBlockAccess.objects.refresh_for_student_and_block_year(instance.creator_id, instance.block_year_id)
+        if instance.approved:
+            Question.objects.clear_approved_question_ids(TeachingBlockYear.objects.filter(id=instance.block_year_id).values_list('block', flat=True))
+
+
+def questions_moved_between_block_years(block_year_ids):
+    StudentBlockAccess.objects.refresh_for_block_years(block_year_ids)
+    Question.objects.clear_approved_question_ids(TeachingBlockYear.objects.filter(id__in=block_year_ids).values_list('block', flat=True))
+
+
+@receiver(models.signals.post_save, sender=TeachingActivityYear)
+def update_question_block_years_for_activity_year(sender, instance, **kwargs):
+    # Questions store their block year and writing period, so they need to follow the activity if it is moved.
+    if kwargs['raw']:
+        return
+
+    writing_period = instance.block_week.writing_period if instance.block_week else None
+    block_year_id = writing_period.block_year_id if writing_period else None
+    questions = Question.objects.filter(teaching_activity_year=instance).exclude(writing_period=writing_period, block_year__id=block_year_id)
+    previous_block_year_ids = set(questions.values_list('block_year', flat=True))
+    if questions.update(writing_period=writing_period, block_year=block_year_id):
+        questions_moved_between_block_years((previous_block_year_ids | set([block_year_id, ])) - set([None, ]))
+
+
+@receiver(models.signals.post_save, sender=BlockWeek)
+def update_question_block_years_for_week(sender, instance, **kwargs):
+    if kwargs['raw']:
+        return
+
+    block_year_id = instance.writing_period.block_year_id
+    questions = Question.objects.filter(teaching_activity_year__block_week=instance).exclude(writing_period=instance.writing_period, block_year__id=block_year_id)
+    previous_block_year_ids = set(questions.values_list('block_year', flat=True))
+    if questions.update(writing_period=instance.writing_period, block_year=block_year_id):
+        questions_moved_between_block_years((previous_block_year_ids | set([block_year_id, ])) - set([None, ]))
+
+
+@receiver(models.signals.post_save, sender=QuestionWritingPeriod)
+def update_question_block_years_for_writing_period(sender, instance, **kwargs):
+    if kwargs['raw']:
+        return
+
+    questions = Question.objects.filter(writing_period=instance).exclude(block_year=instance.block_year_id)
+    previous_block_year_ids = set(questions.values_list('block_year', flat=True))
+    if questions.update(block_year=instance.block_year_id):
+        questions_moved_between_block_years((previous_block_year_ids | set([instance.block_year_id, ])) - set([None, ]))
 
 
 class ApprovalRecordManager(models.Manager):
@@ -1285,24 +1650,12 @@ class ApprovalRecord(models.Model):
 
     objects = ApprovalRecordManager()
 
-
-    def __init__(self, *args, **kwargs):
-        super(ApprovalRecord, self).__init__(*args, **kwargs)
-        # Adds properties to the model to check the status, e.g. self.approved, self.flagged
-        for k in self.__class__.__dict__.keys():
-            if not "_STATUS" in k or hasattr(self, k.split("_")[0].lower()):
-                continue
-
-            self.add_model_status_property_method(k)
-
-    def add_model_status_property_method(self, k):
-        def check_status_function(self):
-            if self.status is not None:
-                return self.status == getattr(self, k)
-            else:
-                return self.PENDING_STATUS == getattr(self, k)
-
-        setattr(self.__class__, k.split("_")[0].lower(), property(check_status_function))
+    # A record without a status is treated as pending.
+    approved = status_property(APPROVED_STATUS, default=PENDING_STATUS)
+    pending = status_property(PENDING_STATUS, default=PENDING_STATUS)
+    deleted = status_property(DELETED_STATUS, default=PENDING_STATUS)
+    flagged = status_property(FLAGGED_STATUS, default=PENDING_STATUS)
+    editing = status_property(EDITING_STATUS, default=PENDING_STATUS)
 
     def was_assigned_before_being_completed(self):
         return self.date_assigned and (not self.date_completed or self.date_assigned < self.date_completed)
@@ -1352,6 +1705,9 @@ class QuizSpecification(models.Model):
     def get_add_questions_confirmation_url(self):
         return reverse('quiz-specification-questions-add-confirm', kwargs=self.get_url_kwargs())
 
+    def get_analyse_url(self):
+        return reverse('quiz-specification-analyse', kwargs=self.get_url_kwargs())
+
     def generate_slug(self):
         return hex_to_base_26(hashlib.sha1("%s%s" % (self.name, self.description)).hexdigest())
 
@@ -1363,75 +1719,103 @@ class QuizSpecification(models.Model):
 
         return questions_to_return
 
+    def get_question_ids(self):
+        # Returns the ids of the questions for a new attempt, in the order of the specifications and without
+        # duplicates. Questions from a block are sampled again on every call, so it should be called once per attempt.
+        question_ids = []
+        for q in self.questions.all():
+            question_ids += q.get_question_ids()
+
+        existing_ids = set(Question.objects.filter(id__in=question_ids).values_list('id', flat=True))
+        unique_ids = []
+        for question_id in question_ids:
+            if question_id in existing_ids and question_id not in unique_ids:
+                unique_ids.append(question_id)
+        return unique_ids
+
     def get_questions_in_order(self):
-        return self.get_questions().order_by('teaching_activity_year__block_week__writing_period__block_year')
+        return self.get_questions().order_by('block_year')
 
     def number_of_questions(self):
         return self.get_questions().count()
 
-    def get_correct_question_attempts(self):
-        # Get all of the QuestionAttempts for this specification which are correct.
-
-        if hasattr(self, "_question_attempts"):
-            return getattr(self, "_question_attempts")
-
-        question_attempts = QuestionAttempt.objects.filter(quiz_attempt__quiz_specification=self) \
-                            .filter(question__answer=models.F("answer")) \
-                            .select_related('quiz_attempt')
-
-        setattr(self, "_question_attempts", question_attempts)
-        return question_attempts
-
+    def stats_or_none(self):
+        try:
+            return self.stats
+        except QuizSpecificationStats.DoesNotExist:
+            return None
 
     def average_score(self):
-        # attempts = self.attempts.all()
-
-        # Get all of the QuestionAttempts for this specification which are correct.
-        question_attempts = self.get_correct_question_attempts()
-
-        total_score = 0
-        attempts = []
-        for question_attempt in question_attempts:
-            total_score += 1
-            if question_attempt.quiz_attempt not in attempts:
-                attempts.append(question_attempt.quiz_attempt)
-
-        if not attempts: return 0
-        return float(total_score)/len(attempts)
+        stats = self.stats_or_none()
+        return stats.average_score if stats and stats.number_of_attempts else 0
 
     def highest_score(self):
-        question_attempts = self.get_correct_question_attempts()
+        stats = self.stats_or_none()
+        return stats.highest_score if stats and stats.number_of_attempts else 0
 
-        # Group them by QuizAttempt
-        quiz_attempts = {}
-        for question_attempt in question_attempts:
-            l = quiz_attempts.setdefault(question_attempt.quiz_attempt, [])
-            l.append(question_attempt)
+    def lowest_score(self):
+        stats = self.stats_or_none()
+        return stats.lowest_score if stats and stats.number_of_attempts else 0
+
+
+def percentile(sorted_values, fraction):
+    """Returns the given percentile (as a fraction) of a sorted list of values, interpolating between the closest values."""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class QuizSpecificationStatsManager(models.Manager):
+    def refresh_for_specification(self, specification_id):
+        # Uses the scores stored on each complete attempt for the specification.
+        scores = QuizAttempt.objects.filter(quiz_specification__id=specification_id, completed_count__gte=models.F('question_count')) \
+                                    .values_list('correct_count', flat=True)
+        scores = sorted(scores)
+
+        defaults = {'number_of_attempts': len(scores), 'score_counts': json.dumps(collections.Counter(scores))}
+        if scores:
+            defaults.update({
+                'average_score': sum(scores) / len(scores),
+                'highest_score': scores[-1],
+                'lowest_score': scores[0],
+                'lower_quartile_score': percentile(scores, 0.25),
+                'median_score': percentile(scores, 0.5),
+                'upper_quartile_score': percentile(scores, 0.75),
+            })
+        else:
+            defaults.update(dict((field, None) for field in ('average_score', 'highest_score', 'lowest_score', 'lower_quartile_score', 'median_score', 'upper_quartile_score')))
 
-        highest = 0
-        if quiz_attempts:
-            highest = max(len(question_attempts) for quiz_attempt, question_attempts in quiz_attempts.items())
+        stats, created = self.get_queryset().update_or_create(specification_id=specification_id, defaults=defaults)
+        return stats
 
-        return highest
 
-    def lowest_score(self):
-        # Check whether people have gotten every question wrong. These will be mist in self.get_correct_question_attempts()
-        complete_fails = self.attempts.exclude(questions__question__answer=models.F("questions__answer")).distinct()
-        if complete_fails.exists(): return 0
-
-        question_attempts = self.get_correct_question_attempts()
+class QuizSpecificationStats(models.Model):
+    """
+        The distribution of scores for the complete attempts at a quiz specification.
+        * number_of_attempts: the number of complete attempts
+        * score_counts: a JSON object with the number of attempts which achieved each score
 
-        # Group them by QuizAttempt
-        quiz_attempts = {}
-        for question_attempt in question_attempts:
-            l = quiz_attempts.setdefault(question_attempt.quiz_attempt, [])
-            l.append(question_attempt)
+        The other fields are summaries of the scores, and are empty if there are no complete attempts. The stats are
+        refreshed whenever an attempt at the specification is completed.
+    """
+    specification = models.OneToOneField(QuizSpecification, related_name="stats")
+    number_of_attempts = models.PositiveIntegerField(default=0)
+    average_score = models.FloatField(blank=True, null=True)
+    highest_score = models.PositiveIntegerField(blank=True, null=True)
+    lowest_score = models.PositiveIntegerField(blank=True, null=True)
+    lower_quartile_score = models.FloatField(blank=True, null=True)
+    median_score = models.FloatField(blank=True, null=True)
+    upper_quartile_score = models.FloatField(blank=True, null=True)
+    score_counts = models.TextField(default="{}")
+
+    objects = QuizSpecificationStatsManager()
 
-        lowest = 0
-        if quiz_attempts:
-            lowest = min(len(question_attempts) for quiz_attempt, question_attempts in quiz_attempts.items())
+    def __unicode__(self):
+        return "Scores for %s" % (self.specification, )
 
-        return lowest
+    def score_counts_dict(self):
+        return dict((int(score), count) for score, count in json.loads(self.score_counts).items())
 
 
 class QuizQuestionSpecification(models.Model):
@@ -1457,10 +1841,13 @@ class QuizQuestionSpecification(models.Model):
             return "%s (%s)" % (self.get_specification_type_display(), self.get_parameters_dict()["question"])
         elif self.specification_type == self.QUESTION_LIST:
             return "%s (%s)" % (self.get_specification_type_display(), ", ".join(str(x) for x in self.get_parameters_dict()["question_list"]))
+        elif self.specification_type == self.RANDOM_FROM_BLOCK:
+            parameters = self.get_parameters_dict()
+            return "%s (%s from block %s)" % (self.get_specification_type_display(), parameters["number_of_questions"], parameters["block"])
 
     @classmethod
     def from_parameters(cls, **kwargs):
-        allowed_kwargs = ['question', 'question_list']
+        allowed_kwargs = ['question', 'question_list', 'block', 'number_of_questions']
         parameters = {}
         instance = cls()
 
@@ -1484,21 +1871,70 @@ class QuizQuestionSpecification(models.Model):
         instance.specification_type = cls.QUESTION_LIST
         return instance
 
+    @classmethod
+    def from_block(cls, block, number_of_questions):
+        instance = cls.from_parameters(block=block.id, number_of_questions=number_of_questions)
+        instance.specification_type = cls.RANDOM_FROM_BLOCK
+        return instance
+
     def get_parameters_dict(self):
         return json.loads(self.parameters)
 
-    def get_questions(self):
+    def get_question_ids(self):
         parameters = self.get_parameters_dict()
-        questions_to_return = Question.objects.none()
 
         if 'question' in parameters:
-            condition = models.Q(id__in=[parameters["question"],])
+            return [parameters["question"]]
         elif 'question_list' in parameters:
-            condition = models.Q(id__in=parameters["question_list"])
+            return list(parameters["question_list"])
+        elif 'block' in parameters:
+            # A new random choice of questions is made each time.
+            try:
+                block = TeachingBlock.objects.get(id=parameters["block"])
+            except TeachingBlock.DoesNotExist:
+                return []
+            return Question.objects.sample_approved_question_ids_for_block(block, parameters["number_of_questions"])
+        return []
+
+    def get_questions(self):
+        return Question.objects.filter(id__in=self.get_question_ids()).select_related("teaching_activity_year")
+
+
+class QuizSpecificationAnalysis(models.Model):
+    """
+        The results of the most recent item analysis for a quiz specification.
+        * number_of_attempts: the number of complete attempts which were analysed
+        * reliability: the KR-20 reliability of the quiz, if it could be calculated
+
+        The analysis is calculated by questions.item_analysis and stored, as it is too slow to calculate on every request.
+    """
+    specification = models.OneToOneField(QuizSpecification, related_name="analysis")
+    number_of_attempts = models.PositiveIntegerField(default=0)
+    reliability = models.FloatField(blank=True, null=True)
+    date_calculated = models.DateTimeField()
+
+    def __unicode__(self):
+        return "Analysis of %s" % (self.specification, )
+
+    def items_by_question(self):
+        return dict((item.question_id, item) for item in self.items.all())
 
-        questions_to_return |= Question.objects.filter(condition)
 
-        return questions_to_return.select_related("teaching_activity_year")
+class ItemAnalysis(models.Model):
+    """
+        The statistics for a single question within a quiz specification analysis.
+        * difficulty: the proportion of attempts which answered the question correctly
+        * discrimination: the difference in difficulty between the top and bottom 27% of attempts by score
+        * point_biserial: the correlation between answering the question correctly and the score for the quiz
+    """
+    analysis = models.ForeignKey(QuizSpecificationAnalysis, related_name="items")
+    question = models.ForeignKey(Question, related_name="item_analyses")
+    difficulty = models.FloatField(blank=True, null=True)
+    discrimination = models.FloatField(blank=True, null=True)
+    point_biserial = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('analysis', 'question')
 
 
 class QuizAttemptManager(models.Manager):
@@ -1506,13 +1942,23 @@ class QuizAttemptManager(models.Manager):
         return self.get_queryset().get(slug=kwargs.get('slug'))
 
     def get_latest_quiz_attempt_for_student(self, student):
-        return self.get_quiz_attempts_for_student(student).latest("date_submitted")
+        return self.get_queryset().filter(student=student).select_related('quiz_specification').latest("date_submitted")
 
     def get_quiz_attempts_for_student(self, student):
         return self.get_queryset().filter(student=student).prefetch_related("questions")
 
 
 class QuizAttempt(models.Model):
+    """
+        An attempt by a student at a quiz. The progress of the attempt is stored with it so that lists of attempts
+        can be displayed without counting their questions.
+        * question_count: the number of questions in the attempt
+        * completed_count: the number of questions which have been completed
+        * correct_count: the number of questions which were answered correctly
+        * completed_at: the date the last question was completed, once every question has been completed
+
+        The progress is refreshed whenever answers are submitted.
+    """
     INDIVIDUAL_QUIZ_TYPE = "individual"
     CLASSIC_QUIZ_TYPE = "classic"
     QUIZ_TYPE_CHOICES = (
@@ -1524,6 +1970,10 @@ class QuizAttempt(models.Model):
     quiz_specification = models.ForeignKey(QuizSpecification, related_name="attempts", blank=True, null=True)
     slug = models.SlugField(max_length=36)
     quiz_type = models.CharField(choices=QUIZ_TYPE_CHOICES, max_length=20)
+    question_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(blank=True, null=True)
 
     objects = QuizAttemptManager()
 
@@ -1542,6 +1992,9 @@ class QuizAttempt(models.Model):
     def get_submission_url(self):
         return reverse("quiz-attempt-submit-all", kwargs=self.get_url_kwargs())
 
+    def get_batch_submission_url(self):
+        return reverse("quiz-attempt-submit-batch", kwargs=self.get_url_kwargs())
+
     def get_report_url(self):
         return reverse("quiz-attempt-report", kwargs=self.get_url_kwargs())
 
@@ -1556,24 +2009,41 @@ class QuizAttempt(models.Model):
 
     @classmethod
     def create_from_list_and_student(cls, question_list, student, quiz_type="", quiz_specification=None):
-        instance = cls()
-        instance.student = student
-        instance.quiz_type = quiz_type
-        if quiz_specification: instance.quiz_specification = quiz_specification
-        instance.save()
+        return cls.create_from_question_ids_and_student([question.id for question in question_list], student, quiz_type=quiz_type, quiz_specification=quiz_specification)
 
-        if len(question_list) != len(set(question_list)):
+    @classmethod
+    def create_from_question_ids_and_student(cls, question_ids, student, quiz_type="", quiz_specification=None):
+        # The attempt and all of its questions are created together, so a quiz is never left half created.
+        if len(question_ids) != len(set(question_ids)):
             raise ValueError("The list of questions provided has duplicate entries.")
 
-        for n, question in enumerate(question_list):
-            attempt = QuestionAttempt()
-            attempt.quiz_attempt = instance
-            attempt.question = question
-            attempt.position = n+1
-            attempt.save()
+        with transaction.atomic():
+            instance = cls()
+            instance.student = student
+            instance.quiz_type = quiz_type
+            instance.question_count = len(question_ids)
+            if quiz_specification: instance.quiz_specification = quiz_specification
+            instance.save()
+
+            QuestionAttempt.objects.bulk_create([
+                QuestionAttempt(quiz_attempt=instance, question_id=question_id, position=n + 1)
+                for n, question_id in enumerate(question_ids)
+            ])
 
         return instance
 
+    @classmethod
+    def create_from_specification_and_student(cls, quiz_specification, student, quiz_type="", shuffle=True, question_ids=None):
+        # question_ids are the questions already chosen from the specification (e.g. to check there are any), so that
+        # the random questions in it are only sampled once for the attempt.
+        if question_ids is None:
+            question_ids = quiz_specification.get_question_ids()
+        question_ids = list(question_ids)
+        if shuffle:
+            random.shuffle(question_ids)
+
+        return cls.create_from_question_ids_and_student(question_ids, student, quiz_type=quiz_type, quiz_specification=quiz_specification)
+
     def get_questions(self):
         q = []
 
@@ -1598,32 +2068,50 @@ class QuizAttempt(models.Model):
         return hex_to_base_26(hashlib.sha1(to_hash).hexdigest())
 
     def date_completed(self):
-        if self.incomplete_questions().exists(): return None
-        return self.questions.aggregate(models.Max('date_completed'))['date_completed__max']
+        return self.completed_at if self.complete else None
     date_completed = property(date_completed)
 
     def incomplete_questions(self):
         return self.questions.filter(date_completed__isnull=True)
 
     def questions_in_order(self):
-        return self.questions.order_by('position')
+        return self.questions.select_related('question').order_by('position')
 
     def incomplete_questions_in_order(self):
         return self.incomplete_questions().order_by("position")
 
     def score(self):
-        return self.questions.filter(answer=models.F("question__answer")).count()
+        return self.correct_count
 
     def number_of_questions_completed(self):
-        return self.questions.filter(date_completed__isnull=False).count()
+        return self.completed_count
 
     def number_of_questions_incomplete(self):
-        return self.incomplete_questions().count()
+        return self.question_count - self.completed_count
 
     def complete(self):
-        return not self.incomplete_questions().exists()
+        return self.completed_count >= self.question_count
     complete = property(complete)
 
+    def refresh_progress(self):
+        # Recounts the questions in the attempt. The counts are written with an update rather than a save, because
+        # saving an attempt generates a new slug. This should be called with the attempt locked, as submit_answers does,
+        # so that a concurrent submission can't write older counts afterwards.
+        progress = self.questions.aggregate(
+            question_count=models.Count('id'),
+            completed_count=models.Sum(models.Case(models.When(date_completed__isnull=False, then=1), default=0, output_field=models.IntegerField())),
+            correct_count=models.Sum(models.Case(models.When(answer=models.F('question__answer'), then=1), default=0, output_field=models.IntegerField())),
+            completed_at=models.Max('date_completed'),
+        )
+        progress['completed_count'] = progress['completed_count'] or 0
+        progress['correct_count'] = progress['correct_count'] or 0
+        if progress['completed_count'] < progress['question_count']:
+            progress['completed_at'] = None
+
+        QuizAttempt.objects.filter(id=self.id).update(**progress)
+        for field, value in progress.items():
+            setattr(self, field, value)
+
     def complete_questions_in_order(self):
         if self.quiz_specification:
             attempts = list(self.questions.all())
@@ -1639,11 +2127,54 @@ class QuizAttempt(models.Model):
             attempts = self.questions.order_by("position")
         return attempts
 
+    def submit_answers(self, answers, date_completed=None):
+        """
+            Completes the question attempts for several questions at once. answers is a dictionary of question ids to
+            dictionaries with a choice, confidence_rating and time_taken. Questions which have already been completed
+            are left unchanged. Returns the question attempts which were completed.
+        """
+        date_completed = date_completed or timezone.now()
+        question_ids = list(answers.keys())
+
+        def answer_case(output_field, value):
+            # Picks the value for each question from its answer, so that every question is completed by one update.
+            return models.Case(
+                *[models.When(question=question_id, then=models.Value(value(answer), output_field=output_field)) for question_id, answer in answers.items()],
+                output_field=output_field
+            )
+
+        with transaction.atomic():
+            # Locking the attempt makes submissions to the same attempt wait for each other, so that each one recounts
+            # the progress including the answers of the others.
+            QuizAttempt.objects.select_for_update().get(id=self.id)
+            # Attempts are only updated if they are still incomplete, so an answer can never be submitted twice.
+            QuestionAttempt.objects.filter(quiz_attempt=self, question__id__in=question_ids, date_completed__isnull=True).update(
+                answer=answer_case(models.CharField(), lambda answer: answer.get("choice") or QuestionAttempt.DEFAULT_ANSWER),
+                confidence_rating=answer_case(models.IntegerField(), lambda answer: answer.get("confidence_rating") or QuestionAttempt.DEFAULT_CONFIDENCE),
+                time_taken=answer_case(models.PositiveIntegerField(), lambda answer: answer.get("time_taken") or 0),
+                date_completed=date_completed,
+            )
+
+            # Nothing else completes questions while the attempt is locked, so the questions completed at this time
+            # are the ones which were just updated.
+            completed = list(self.questions.filter(question__id__in=question_ids, date_completed=date_completed).select_related('question__block_year'))
+            QuestionSummary.objects.record_attempts(completed)
+            StudentQuizStats.objects.record_attempts(self.student_id, completed)
+            if completed:
+                self.refresh_progress()
+
+        self.update_specification_stats()
+        return completed
+
+    def update_specification_stats(self):
+        # Called when questions are submitted, so that the specification's scores include this attempt once it is complete.
+        if self.quiz_specification_id and self.complete:
+            QuizSpecificationStats.objects.refresh_for_specification(self.quiz_specification_id)
+
     def percent_score(self):
-        number_of_questions = self.quiz_specification.number_of_questions() if self.quiz_specification else self.questions.count()
-        if number_of_questions == 0:
+        if self.question_count == 0:
             return 0.0
-        return self.score() / number_of_questions * 100
+        return self.correct_count / self.question_count * 100
 
 
 @receiver(models.signals.pre_save, sender=QuizSpecification)
@@ -1725,10 +2256,13 @@ class QuestionAttempt(models.Model):
         return int(self.answer == self.question.answer)
 
     def get_average_confidence_rating_display(self):
-        average = int(round(self.question.get_average_confidence_rating()))
+        average = self.question.get_average_confidence_rating()
+        if average is None:
+            return ""
+
         try:
-            return dict(self.THIRD_PERSON_CONFIDENCE_CHOICES)[average]
-        except:
+            return dict(self.THIRD_PERSON_CONFIDENCE_CHOICES)[int(round(average))]
+        except KeyError:
             return ""
 
     def get_confidence_rating_display_second_person(self):
@@ -1742,6 +2276,780 @@ class QuestionAttempt(models.Model):
         return dict(self.THIRD_PERSON_CONFIDENCE_CHOICES)[self.confidence_rating]
 
 
+class QuestionSummaryManager(models.Manager):
+    def calculate(self, question_ids=None):
+        # Calculates unsaved summaries for the given questions (or every question) with a single grouped query.
+        attempts = QuestionAttempt.objects.filter(date_completed__isnull=False, answer__isnull=False)
+        if question_ids is not None:
+            attempts = attempts.filter(question__id__in=question_ids)
+
+        counts = attempts.values('question', 'question__answer', 'answer') \
+                         .annotate(
+                             attempts=models.Count('id'),
+                             total_confidence_rating=models.Sum('confidence_rating'),
+                             confidence_rating_count=models.Count('confidence_rating'),
+                             total_time_taken=models.Sum('time_taken'),
+                             time_taken_count=models.Count('time_taken'),
+                         ) \
+                         .order_by()
+
+        summaries = {}
+        answer_counts = {}
+        for count in counts:
+            summary = summaries.setdefault(count['question'], QuestionSummary(question_id=count['question']))
+            answer_counts.setdefault(count['question'], {})[count['answer']] = count['attempts']
+            summary.total_attempts += count['attempts']
+            if count['answer'] == count['question__answer']:
+                summary.correct_attempts += count['attempts']
+            summary.total_confidence_rating += count['total_confidence_rating'] or 0
+            summary.confidence_rating_count += count['confidence_rating_count']
+            summary.total_time_taken += count['total_time_taken'] or 0
+            summary.time_taken_count += count['time_taken_count']
+
+        for question_id, summary in summaries.items():
+            summary.answer_counts = json.dumps(answer_counts[question_id])
+
+        return summaries
+
+    def rebuild(self, question_ids=None):
+        summaries = self.calculate(question_ids).values()
+
+        with transaction.atomic():
+            existing = self.get_queryset()
+            if question_ids is not None:
+                existing = existing.filter(question__id__in=question_ids)
+            existing.delete()
+            self.bulk_create(summaries)
+
+        return len(summaries)
+
+    def record_attempt(self, question_attempt):
+        # Adds a newly completed attempt to the summary for its question.
+        if question_attempt.answer is None:
+            return
+
+        with transaction.atomic():
+            summary, created = self.get_queryset().select_for_update().get_or_create(question_id=question_attempt.question_id)
+            summary.add_attempt(question_attempt)
+            summary.save()
+
+    def record_attempts(self, question_attempts):
+        # Adds several newly completed attempts at once, locking all of the affected summaries in a single query.
+        question_attempts = [question_attempt for question_attempt in question_attempts if question_attempt.answer is not None]
+        if not question_attempts:
+            return
+
+        question_ids = set(question_attempt.question_id for question_attempt in question_attempts)
+        with transaction.atomic():
+            existing_ids = set(self.get_queryset().filter(question__id__in=question_ids).values_list('question', flat=True))
+            self.bulk_create([QuestionSummary(question_id=question_id) for question_id in question_ids - existing_ids])
+            summaries = dict((summary.question_id, summary) for summary in self.get_queryset().select_for_update().filter(question__id__in=question_ids))
+
+            for question_attempt in question_attempts:
+                summaries[question_attempt.question_id].add_attempt(question_attempt)
+            for summary in summaries.values():
+                summary.save()
+
+
+class QuestionSummary(models.Model):
+    """
+        A running total of the answers given to a question, so that statistics for many questions can be read at once.
+        * total_attempts: the number of completed attempts at the question
+        * correct_attempts: the number of those attempts which chose the correct answer
+        * answer_counts: a JSON object with the number of times each option was chosen (an empty key is used for no answer)
+
+        The confidence ratings and times taken are stored as totals and counts so that they can be updated incrementally.
+        Summaries are updated as attempts are submitted, and can be rebuilt using the rebuild_question_summaries
+        management command.
+    """
+    question = models.OneToOneField(Question, related_name="summary")
+    total_attempts = models.PositiveIntegerField(default=0)
+    correct_attempts = models.PositiveIntegerField(default=0)
+    answer_counts = models.TextField(default="{}")
+    total_confidence_rating = models.PositiveIntegerField(default=0)
+    confidence_rating_count = models.PositiveIntegerField(default=0)
+    total_time_taken = models.BigIntegerField(default=0)
+    time_taken_count = models.PositiveIntegerField(default=0)
+
+    objects = QuestionSummaryManager()
+
+    def __unicode__(self):
+        return "Summary for question %s" % (self.question_id, )
+
+    def add_attempt(self, question_attempt):
+        answer_counts = self.answer_counts_dict()
+        answer_counts[question_attempt.answer] = answer_counts.get(question_attempt.answer, 0) + 1
+        self.answer_counts = json.dumps(answer_counts)
+
+        self.total_attempts += 1
+        if question_attempt.answer == question_attempt.question.answer:
+            self.correct_attempts += 1
+        if question_attempt.confidence_rating is not None:
+            self.total_confidence_rating += int(question_attempt.confidence_rating)
+            self.confidence_rating_count += 1
+        if question_attempt.time_taken is not None:
+            self.total_time_taken += int(question_attempt.time_taken)
+            self.time_taken_count += 1
+
+    def answer_counts_dict(self):
+        return json.loads(self.answer_counts) if self.answer_counts else {}
+
+    def success_rate(self):
+        if not self.total_attempts:
+            return None
+        return self.correct_attempts / self.total_attempts
+    success_rate = property(success_rate)
+
+    def average_confidence_rating(self):
+        if not self.confidence_rating_count:
+            return None
+        return self.total_confidence_rating / self.confidence_rating_count
+    average_confidence_rating = property(average_confidence_rating)
+
+    def average_time_taken(self):
+        if not self.time_taken_count:
+            return None
+        return self.total_time_taken / self.time_taken_count
+    average_time_taken = property(average_time_taken)
+
+    def answer_ratios(self, options):
+        # Returns the proportion of attempts which chose each option, including no answer.
+        answer_counts = self.answer_counts_dict()
+        ratio_dict = dict((option, answer_counts.get(option, 0)) for option in options)
+        ratio_dict[QuestionAttempt.DEFAULT_ANSWER] = answer_counts.get(QuestionAttempt.DEFAULT_ANSWER, 0)
+
+        total_answers = sum(ratio_dict.values())
+        if total_answers == 0:
+            return dict((k, 0) for k in ratio_dict)
+
+        return dict((k, v / total_answers) for k, v in ratio_dict.iteritems())
+
+
+class QuestionStatistics(object):
+    """
+        Answer statistics for a set of questions, read from their summaries with a single query. Questions which have
+        not been attempted are given an empty summary.
+    """
+    def __init__(self, question_ids):
+        self.question_ids = list(question_ids)
+        self.summaries = dict((summary.question_id, summary) for summary in QuestionSummary.objects.filter(question__id__in=self.question_ids))
+
+    def for_question(self, question_id):
+        return self.summaries.get(question_id) or QuestionSummary(question_id=question_id)
+
+
+class StudentQuizStatsManager(models.Manager):
+    def calculate(self, student_ids=None):
+        # Calculates unsaved stats for the given students (or every student) by reading their completed attempts in order.
+        attempts = QuestionAttempt.objects.filter(date_completed__isnull=False)
+        if student_ids is not None:
+            attempts = attempts.filter(quiz_attempt__student__id__in=student_ids)
+
+        attempts = attempts.values_list('quiz_attempt__student', 'answer', 'question__answer', 'question__block_year__block', 'date_completed') \
+                           .order_by('quiz_attempt__student', 'date_completed', 'quiz_attempt', 'position')
+
+        stats = {}
+        for student_id, answer, correct_answer, block_id, date_completed in attempts.iterator():
+            student_stats = stats.setdefault(student_id, StudentQuizStats(student_id=student_id))
+            student_stats.add_answer(answer == correct_answer, block_id, date_completed)
+
+        return stats
+
+    def rebuild(self, student_ids=None):
+        stats = self.calculate(student_ids).values()
+
+        with transaction.atomic():
+            existing = self.get_queryset()
+            if student_ids is not None:
+                existing = existing.filter(student__id__in=student_ids)
+            existing.delete()
+            self.bulk_create(stats)
+
+        return len(stats)
+
+    def record_attempts(self, student_id, question_attempts):
+        # Adds newly completed attempts to the student's stats. The question attempts should have their question and
+        # its block year loaded.
+        if not question_attempts:
+            return
+
+        with transaction.atomic():
+            stats, created = self.get_queryset().select_for_update().get_or_create(student_id=student_id)
+            for question_attempt in sorted(question_attempts, key=lambda question_attempt: question_attempt.position):
+                question = question_attempt.question
+                block_id = question.block_year.block_id if question.block_year else None
+                stats.add_answer(question_attempt.answer == question.answer, block_id, question_attempt.date_completed)
+            stats.save()
+
+
+class StudentQuizStats(models.Model):
+    """
+        A running total of the questions a student has answered in quizzes, so that their performance can be shown
+        without reading all of their attempts.
+        * number_of_attempts: the number of completed question attempts
+        * number_correct: the number of those attempts which were answered correctly
+        * block_counts: a JSON object of block ids to the number of attempts and number correct for questions in that block
+        * current_streak: the number of questions answered correctly since the last incorrect answer
+        * longest_streak: the largest number of questions the student has answered correctly in a row
+        * last_activity: the date the student last completed a question
+
+        The stats are updated as answers are submitted, and can be rebuilt using the rebuild_student_quiz_stats
+        management command.
+    """
+    student = models.OneToOneField(Student, related_name="quiz_stats")
+    number_of_attempts = models.PositiveIntegerField(default=0)
+    number_correct = models.PositiveIntegerField(default=0)
+    block_counts = models.TextField(default="{}")
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(blank=True, null=True)
+
+    objects = StudentQuizStatsManager()
+
+    def __unicode__(self):
+        return "Quiz stats for %s" % (self.student_id, )
+
+    def add_answer(self, correct, block_id, date_completed):
+        self.number_of_attempts += 1
+        if correct:
+            self.number_correct += 1
+            self.current_streak += 1
+            self.longest_streak = max(self.longest_streak, self.current_streak)
+        else:
+            self.current_streak = 0
+
+        if block_id is not None:
+            block_counts = self.block_counts_dict()
+            counts = block_counts.setdefault(str(block_id), {"attempts": 0, "correct": 0})
+            counts["attempts"] += 1
+            if correct:
+                counts["correct"] += 1
+            self.block_counts = json.dumps(block_counts)
+
+        if date_completed and (not self.last_activity or date_completed > self.last_activity):
+            self.last_activity = date_completed
+
+    def block_counts_dict(self):
+        return json.loads(self.block_counts) if self.block_counts else {}
+
+    def average_score(self):
+        if not self.number_of_attempts:
+            return None
+        return self.number_correct / self.number_of_attempts * 100
+    average_score = property(average_score)
+
+    def block_scores(self):
+        # Returns the number of attempts, number correct and percentage score for each block the student has attempted.
+        block_counts = self.block_counts_dict()
+        blocks = TeachingBlock.objects.in_bulk([int(block_id) for block_id in block_counts])
+
+        scores = []
+        for block_id, block in blocks.items():
+            counts = block_counts[str(block_id)]
+            scores.append({
+                'block': block,
+                'attempts': counts["attempts"],
+                'correct': counts["correct"],
+                'percent_score': counts["correct"] / counts["attempts"] * 100 if counts["attempts"] else None,
+            })
+        scores.sort(key=lambda score: score['block'].sort_index)
+        return scores
+
+
+class DocumentArtifactManager(models.Manager):
+    def evict(self, max_size=None, keep=None):
+        # Deletes the least recently used artifacts until the total size of the rest is within the limit. The
+        # artifact with the id keep is never deleted.
+        max_size = settings.DOCUMENT_ARTIFACT_MAX_SIZE if max_size is None else max_size
+
+        total_size = 0
+        expired_ids = []
+        for artifact_id, size in self.get_queryset().order_by('-last_accessed').values_list('id', 'size'):
+            total_size += size
+            if total_size > max_size and artifact_id != keep:
+                expired_ids.append(artifact_id)
+
+        # Each artifact is deleted individually so that its file is removed as well.
+        for artifact in self.get_queryset().filter(id__in=expired_ids):
+            artifact.delete()
+        return len(expired_ids)
+
+
+class DocumentArtifact(models.Model):
+    """
+        A generated document which is kept so that it can be served again to anyone who requests the same content.
+        * content_hash: a hash of everything the content of the document depends on
+        * file: the generated document
+        * size: the size of the file in bytes
+        * last_accessed: the last time the document was served
+
+        The least recently used artifacts are deleted once their total size exceeds
+        settings.DOCUMENT_ARTIFACT_MAX_SIZE.
+    """
+    block = models.ForeignKey(TeachingBlock, related_name="document_artifacts")
+    years = models.CharField(max_length=100)
+    show_answers = models.BooleanField(default=False)
+    content_hash = models.CharField(max_length=40, unique=True)
+    file = models.FileField(upload_to="exports")
+    size = models.PositiveIntegerField(default=0)
+    date_created = models.DateTimeField(auto_now_add=True)
+    last_accessed = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = DocumentArtifactManager()
+
+    def __unicode__(self):
+        return "%s %s%s" % (self.block, self.years, " with answers" if self.show_answers else "")
+
+    def etag(self):
+        return '"%s"' % self.content_hash
+
+    def touch(self):
+        self.last_accessed = timezone.now()
+        DocumentArtifact.objects.filter(id=self.id).update(last_accessed=self.last_accessed)
+
+    def file_exists(self):
+        return bool(self.file.name) and self.file.storage.exists(self.file.name)
+
+    def open(self):
+        return self.file.storage.open(self.file.name, 'rb')
+
+
+@receiver(models.signals.post_delete, sender=DocumentArtifact)
+def delete_document_artifact_file(sender, instance, **kwargs):
+    if instance.file.name:
+        instance.file.delete(save=False)
+
+
+class DocumentJobManager(models.Manager):
+    def stale_filter(self):
+        # A running job which hasn't reported its progress for a while belonged to a worker which has stopped.
+        return models.Q(status=DocumentJob.RUNNING_STATUS) & \
+               (models.Q(date_updated__isnull=True) | models.Q(date_updated__lt=timezone.now() - DocumentJob.STALE_TIMEOUT))
+
+    def fail_abandoned(self):
+        # Stale jobs which have already been tried too many times probably stop the worker which builds them.
+        return self.get_queryset().filter(self.stale_filter(), attempts__gte=DocumentJob.MAX_ATTEMPTS) \
+                                  .update(status=DocumentJob.FAILED_STATUS, error="The worker building this document stopped.", date_completed=timezone.now())
+
+    def claim_next(self):
+        # Marks the oldest pending or stale job as running and returns it, or returns None if there are no such jobs. A
+        # job is only claimed if it is still pending or stale when it is updated, so several workers can run at once.
+        self.fail_abandoned()
+        claimable = models.Q(status=DocumentJob.PENDING_STATUS) | self.stale_filter()
+        claimable_ids = self.get_queryset().filter(claimable).order_by('date_created').values_list('id', flat=True)
+        for job_id in claimable_ids[:10]:
+            now = timezone.now()
+            claimed = self.get_queryset().filter(claimable, id=job_id) \
+                                         .update(status=DocumentJob.RUNNING_STATUS, date_started=now, date_updated=now, progress=0, attempts=models.F('attempts') + 1)
+            if claimed:
+                return self.get_queryset().select_related('block').get(id=job_id)
+        return None
+
+    def get_unfinished_job(self, block, years, show_answers, base_uri):
+        # Returns a job which is already building the same document, so that it is not built twice at once.
+        return self.get_queryset().filter(
+            block=block, years=DocumentJob.years_string(years), show_answers=show_answers, base_uri=base_uri,
+            status__in=[DocumentJob.PENDING_STATUS, DocumentJob.RUNNING_STATUS],
+        ).exclude(self.stale_filter()).order_by('date_created').first()
+
+
+class DocumentJob(models.Model):
+    """
+        A request for a block document to be built by the run_document_jobs management command.
+        * years: a comma separated list of the years to include
+        * base_uri: the absolute URI of the site, used for the links to each question
+        * progress: the number of questions which have been written to the document
+        * total: the number of questions in the document
+        * artifact: the finished document
+        * error: the reason the job failed
+        * attempts: the number of times a worker has started building the document
+        * date_updated: when the worker building the document last reported its progress
+    """
+    PENDING_STATUS = 0
+    RUNNING_STATUS = 1
+    COMPLETE_STATUS = 2
+    FAILED_STATUS = 3
+    STATUS_CHOICES = (
+        (PENDING_STATUS, 'Pending'),
+        (RUNNING_STATUS, 'Running'),
+        (COMPLETE_STATUS, 'Complete'),
+        (FAILED_STATUS, 'Failed'),
+    )
+    # The number of questions to write between each update of the progress.
+    PROGRESS_INTERVAL = 20
+    # A running job which hasn't been updated for this long is built again by another worker, up to MAX_ATTEMPTS times.
+    STALE_TIMEOUT = datetime.timedelta(minutes=10)
+    MAX_ATTEMPTS = 3
+
+    block = models.ForeignKey(TeachingBlock, related_name="document_jobs")
+    years = models.CharField(max_length=100)
+    show_answers = models.BooleanField(default=False)
+    base_uri = models.CharField(max_length=200)
+    requested_by = models.ForeignKey(Student, related_name="document_jobs", blank=True, null=True)
+    status = models.IntegerField(choices=STATUS_CHOICES, default=PENDING_STATUS)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    artifact = models.ForeignKey(DocumentArtifact, related_name="jobs", blank=True, null=True, on_delete=models.SET_NULL)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(blank=True, null=True)
+    date_updated = models.DateTimeField(blank=True, null=True)
+    date_completed = models.DateTimeField(blank=True, null=True)
+
+    objects = DocumentJobManager()
+
+    pending = status_property(PENDING_STATUS)
+    running = status_property(RUNNING_STATUS)
+    complete = status_property(COMPLETE_STATUS)
+    failed = status_property(FAILED_STATUS)
+
+    def __unicode__(self):
+        return "Document job %s for %s %s" % (self.id, self.block, self.years)
+
+    @staticmethod
+    def years_string(years):
+        return ",".join(unicode(year) for year in sorted(int(year) for year in years))
+
+    def year_list(self):
+        return [int(year) for year in self.years.split(",") if year]
+
+    def build_absolute_uri(self, location):
+        return urlparse.urljoin(self.base_uri, location)
+
+    def get_url_kwargs(self):
+        return {'code': self.block.code, 'year': self.year_list()[0], 'pk': self.id}
+
+    def get_absolute_url(self):
+        return reverse('block-download-job', kwargs=self.get_url_kwargs())
+
+    def get_status_url(self):
+        return reverse('block-download-job-status', kwargs=self.get_url_kwargs())
+
+    def get_file_url(self):
+        return reverse('block-download-job-file', kwargs=self.get_url_kwargs())
+
+    def is_viewable_by(self, student):
+        # The document does not depend on who requested it, so anyone who can download every year in it can see the job.
+        if student.user.is_superuser or self.requested_by_id == student.id:
+            return True
+
+        if not self.block.is_available_for_download_by(student):
+            return False
+        visible_years = TeachingBlockYear.objects.get_visible_block_years_for_student(student).filter(block=self.block).values_list('year', flat=True)
+        return set(self.year_list()) <= set(visible_years)
+
+    def set_total(self, total):
+        self.total = total
+        self.date_updated = timezone.now()
+        DocumentJob.objects.filter(id=self.id).update(total=total, date_updated=self.date_updated)
+
+    def set_progress(self, progress):
+        if progress == self.total or progress - self.progress >= self.PROGRESS_INTERVAL:
+            self.progress = progress
+            self.date_updated = timezone.now()
+            DocumentJob.objects.filter(id=self.id).update(progress=progress, date_updated=self.date_updated)
+
+    def finish(self, artifact):
+        self.status = self.COMPLETE_STATUS
+        self.artifact = artifact
+        self.progress = self.total
+        self.date_completed = timezone.now()
+        self.save()
+
+    def fail(self, error):
+        self.status = self.FAILED_STATUS
+        self.error = error
+        self.date_completed = timezone.now()
+        self.save()
+
+    def rebuild(self):
+        # Queues a finished job to be built again, e.g. when its document has been evicted from storage.
+        return bool(DocumentJob.objects.filter(id=self.id, status=self.COMPLETE_STATUS).update(
+            status=self.PENDING_STATUS, artifact=None, progress=0, attempts=0, error="", date_started=None, date_updated=None, date_completed=None,
+        ))
+
+    def json_repr(self):
+        data = {
+            'status': self.get_status_display().lower(),
+            'progress': self.progress,
+            'total': self.total,
+        }
+        if self.complete and self.artifact_id:
+            data['url'] = self.get_file_url()
+        return data
+
+
+class QuestionBankExportManager(models.Manager):
+    def stale_filter(self):
+        # A running export which hasn't reported its progress for a while belonged to a worker which has stopped.
+        return models.Q(status=QuestionBankExport.RUNNING_STATUS) & \
+               (models.Q(date_updated__isnull=True) | models.Q(date_updated__lt=timezone.now() - QuestionBankExport.STALE_TIMEOUT))
+
+    def fail_abandoned(self):
+        # Stale exports which have already been tried too many times probably stop the worker which builds them.
+        return self.get_queryset().filter(self.stale_filter(), attempts__gte=QuestionBankExport.MAX_ATTEMPTS) \
+                                  .update(status=QuestionBankExport.FAILED_STATUS, error="The worker building this export stopped.", date_completed=timezone.now())
+
+    def claim_next(self):
+        # Marks the oldest pending or stale export as running and returns it, or returns None if there are no such
+        # exports. An export is only claimed if it is still pending or stale when it is updated, as with document jobs.
+        self.fail_abandoned()
+        claimable = models.Q(status=QuestionBankExport.PENDING_STATUS) | self.stale_filter()
+        claimable_ids = self.get_queryset().filter(claimable).order_by('date_created').values_list('id', flat=True)
+        for export_id in claimable_ids[:10]:
+            now = timezone.now()
+            claimed = self.get_queryset().filter(claimable, id=export_id) \
+                                         .update(status=QuestionBankExport.RUNNING_STATUS, date_started=now, date_updated=now, progress=0, attempts=models.F('attempts') + 1)
+            if claimed:
+                return self.get_queryset().get(id=export_id)
+        return None
+
+
+class QuestionBankExport(models.Model):
+    """
+        A request from an administrator for the approved questions of several blocks to be exported as a zip file of
+        documents by the run_document_jobs management command.
+        * blocks: the blocks to export
+        * base_uri: the absolute URI of the site, used for the links to each question
+        * progress: the number of blocks which have been exported
+        * total: the number of blocks to export
+        * file: the finished zip file
+        * size: the size of the file in bytes
+        * error: the reason the export failed
+        * attempts: the number of times a worker has started building the export
+        * date_updated: when the worker building the export last reported its progress
+    """
+    PENDING_STATUS = 0
+    RUNNING_STATUS = 1
+    COMPLETE_STATUS = 2
+    FAILED_STATUS = 3
+    STATUS_CHOICES = (
+        (PENDING_STATUS, 'Pending'),
+        (RUNNING_STATUS, 'Running'),
+        (COMPLETE_STATUS, 'Complete'),
+        (FAILED_STATUS, 'Failed'),
+    )
+    # Progress is only reported when a whole block has been exported, so a running export is given longer than a
+    # document job before another worker builds it again, up to MAX_ATTEMPTS times.
+    STALE_TIMEOUT = datetime.timedelta(minutes=30)
+    MAX_ATTEMPTS = 3
+
+    blocks = models.ManyToManyField(TeachingBlock, related_name="bank_exports")
+    show_answers = models.BooleanField(default=True)
+    base_uri = models.CharField(max_length=200)
+    requested_by = models.ForeignKey(Student, related_name="bank_exports", blank=True, null=True)
+    status = models.IntegerField(choices=STATUS_CHOICES, default=PENDING_STATUS)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to="exports", blank=True)
+    size = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(blank=True, null=True)
+    date_updated = models.DateTimeField(blank=True, null=True)
+    date_completed = models.DateTimeField(blank=True, null=True)
+
+    objects = QuestionBankExportManager()
+
+    pending = status_property(PENDING_STATUS)
+    running = status_property(RUNNING_STATUS)
+    complete = status_property(COMPLETE_STATUS)
+    failed = status_property(FAILED_STATUS)
+
+    def __unicode__(self):
+        return "Question bank export %s" % self.id
+
+    def get_absolute_url(self):
+        return reverse('bank-export', kwargs={'pk': self.id})
+
+    def get_status_url(self):
+        return reverse('bank-export-status', kwargs={'pk': self.id})
+
+    def get_file_url(self):
+        return reverse('bank-export-file', kwargs={'pk': self.id})
+
+    def file_exists(self):
+        return bool(self.file.name) and self.file.storage.exists(self.file.name)
+
+    def open(self):
+        return self.file.storage.open(self.file.name, 'rb')
+
+    def set_progress(self, progress):
+        self.progress = progress
+        self.date_updated = timezone.now()
+        QuestionBankExport.objects.filter(id=self.id).update(progress=progress, date_updated=self.date_updated)
+
+    def finish(self):
+        self.status = self.COMPLETE_STATUS
+        self.progress = self.total
+        self.date_completed = timezone.now()
+        self.save()
+
+    def fail(self, error):
+        self.status = self.FAILED_STATUS
+        self.error = error
+        self.date_completed = timezone.now()
+        self.save()
+
+    def rebuild(self):
+        # Queues a finished export to be built again, e.g. when its file has been removed from storage.
+        return bool(QuestionBankExport.objects.filter(id=self.id, status=self.COMPLETE_STATUS).update(
+            status=self.PENDING_STATUS, file="", size=0, progress=0, attempts=0, error="", date_started=None, date_updated=None, date_completed=None,
+        ))
+
+    def json_repr(self):
+        data = {
+            'status': self.get_status_display().lower(),
+            'progress': self.progress,
+            'total': self.total,
+        }
+        if self.complete:
+            data['url'] = self.get_file_url()
+        return data
+
+
+@receiver(models.signals.post_delete, sender=QuestionBankExport)
+def delete_question_bank_export_file(sender, instance, **kwargs):
+    if instance.file.name:
+        instance.file.delete(save=False)
+
+
+class EmailBatchManager(models.Manager):
+    def stale_filter(self):
+        # A batch which hasn't reported its progress for a while belonged to a mailer which has stopped.
+        return models.Q(status=EmailBatch.SENDING_STATUS) & \
+               (models.Q(date_updated__isnull=True) | models.Q(date_updated__lt=timezone.now() - EmailBatch.STALE_TIMEOUT))
+
+    def fail_abandoned(self):
+        # Stale batches which have already been tried too many times probably stop the mailer which sends them.
+        return self.get_queryset().filter(self.stale_filter(), attempts__gte=EmailBatch.MAX_ATTEMPTS) \
+                                  .update(status=EmailBatch.FAILED_STATUS, error="The mailer sending this email stopped.", date_completed=timezone.now())
+
+    def claim_next(self):
+        # Marks the oldest pending or stale batch as sending and returns it, or returns None if there are no such
+        # batches. A stale batch carries on from the last recipients its mailer recorded.
+        self.fail_abandoned()
+        claimable = models.Q(status=EmailBatch.PENDING_STATUS) | self.stale_filter()
+        claimable_ids = self.get_queryset().filter(claimable).order_by('date_created').values_list('id', flat=True)
+        for batch_id in claimable_ids[:10]:
+            now = timezone.now()
+            claimed = self.get_queryset().filter(claimable, id=batch_id) \
+                                         .update(status=EmailBatch.SENDING_STATUS, date_started=now, date_updated=now, attempts=models.F('attempts') + 1)
+            if claimed:
+                return self.get_queryset().get(id=batch_id)
+        return None
+
+
+class EmailBatch(models.Model):
+    """
+        An email to many recipients which is sent by the send_email_batches management command.
+        * body: the HTML of the email, which is the same for every recipient
+        * recipients: the email addresses to send to, one per line
+        * sent_count: the number of recipients which have been dealt with so far, in the order of recipients
+        * failed_recipients: the recipients which were refused by the mail server, one per line
+        * error: the reason the batch failed
+        * attempts: the number of times a mailer has started sending the batch
+        * date_updated: when the mailer sending the batch last reported its progress
+    """
+    PENDING_STATUS = 0
+    SENDING_STATUS = 1
+    COMPLETE_STATUS = 2
+    FAILED_STATUS = 3
+    STATUS_CHOICES = (
+        (PENDING_STATUS, 'Pending'),
+        (SENDING_STATUS, 'Sending'),
+        (COMPLETE_STATUS, 'Complete'),
+        (FAILED_STATUS, 'Failed'),
+    )
+    # A batch which hasn't been updated for this long is sent by another mailer, up to MAX_ATTEMPTS times.
+    STALE_TIMEOUT = datetime.timedelta(minutes=10)
+    MAX_ATTEMPTS = 3
+
+    block_year = models.ForeignKey(TeachingBlockYear, related_name="email_batches", blank=True, null=True)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    from_email = models.CharField(max_length=200)
+    recipients = models.TextField()
+    sent_by = models.ForeignKey(Student, related_name="email_batches", blank=True, null=True)
+    status = models.IntegerField(choices=STATUS_CHOICES, default=PENDING_STATUS)
+    total = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_recipients = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(blank=True, null=True)
+    date_updated = models.DateTimeField(blank=True, null=True)
+    date_completed = models.DateTimeField(blank=True, null=True)
+
+    objects = EmailBatchManager()
+
+    pending = status_property(PENDING_STATUS)
+    sending = status_property(SENDING_STATUS)
+    complete = status_property(COMPLETE_STATUS)
+    failed = status_property(FAILED_STATUS)
+
+    def __unicode__(self):
+        return "Email batch %s: %s" % (self.id, self.subject)
+
+    def save(self, *args, **kwargs):
+        self.total = len(self.recipient_list())
+        super(EmailBatch, self).save(*args, **kwargs)
+
+    def recipient_list(self):
+        return [recipient for recipient in self.recipients.split("\n") if recipient]
+
+    def failed_recipient_list(self):
+        return [recipient for recipient in self.failed_recipients.split("\n") if recipient]
+
+    def get_absolute_url(self):
+        return reverse('email-batch', kwargs={'pk': self.id})
+
+    def get_status_url(self):
+        return reverse('email-batch-status', kwargs={'pk': self.id})
+
+    def get_retry_url(self):
+        return reverse('email-batch-retry', kwargs={'pk': self.id})
+
+    def stale(self):
+        return self.sending and (self.date_updated is None or self.date_updated < timezone.now() - self.STALE_TIMEOUT)
+    stale = property(stale)
+
+    def set_progress(self, sent_count, failed_recipients):
+        self.sent_count = sent_count
+        self.failed_recipients = "\n".join(failed_recipients)
+        self.date_updated = timezone.now()
+        EmailBatch.objects.filter(id=self.id).update(sent_count=self.sent_count, failed_recipients=self.failed_recipients, date_updated=self.date_updated)
+
+    def finish(self):
+        self.status = self.COMPLETE_STATUS
+        self.date_completed = timezone.now()
+        self.save()
+
+    def fail(self, error):
+        self.status = self.FAILED_STATUS
+        self.error = error
+        self.date_completed = timezone.now()
+        self.save()
+
+    def retry(self):
+        # Sending continues from the first recipient which hasn't been dealt with. A batch whose mailer has stopped can
+        # be retried as well as one which failed.
+        retryable = models.Q(status=self.FAILED_STATUS) | EmailBatch.objects.stale_filter()
+        return bool(EmailBatch.objects.filter(retryable, id=self.id).update(status=self.PENDING_STATUS, error="", attempts=0, date_completed=None))
+
+    def json_repr(self):
+        return {
+            'status': self.get_status_display().lower(),
+            'sent': self.sent_count,
+            'failed': len(self.failed_recipient_list()),
+            'total': self.total,
+            'stale': self.stale,
+        }
+
+
 class QuestionRating(models.Model):
     UPVOTE = 1
     DOWNVOTE = -1
@@ -206,6 +206,12 @@ var Questions = (function (questions_module, $) {
             if (self.options_widget.chosen()) params["choice"] = self.options_widget.choice();
             if (self.confidence_widget.chosen()) params["confidence_rating"] = self.confidence_widget.choice();
             params["time_taken"] = self.timer.total;
+
+            if (questions_module.globals.answer_queue) {
+                questions_module.globals.answer_queue.add(self, params);
+                return;
+            }
+
             $.post(questions_module.globals.question_submission_url, params)
                 .done(function (data) {
                     if (data["status"] === "success") {
@@ -354,6 +360,9 @@ var Questions = (function (questions_module, $) {
         var self = this;
 
         $.extend(questions_module.globals, options);
+        if (questions_module.globals.question_batch_submission_url) {
+            questions_module.globals.answer_queue = new questions_module.AnswerQueue();
+        }
         var question_manager = null;
         var ready_to_finish = true;
 
@@ -420,6 +429,54 @@ var Questions = (function (questions_module, $) {
         question_manager = new questions_module.QuestionManager();
     };
 
+    questions_module.AnswerQueue = function (options) {
+        // Answers are sent to the server in the background. Any answers given while a request is in progress are
+        // queued and sent together in a single request once it has finished.
+        var self = this;
+        var queued = [];
+        var sending = false;
+
+        this.add = function (question, params) {
+            queued.push({question: question, params: params});
+            self.flush();
+        };
+
+        this.flush = function () {
+            if (sending || queued.length === 0) return;
+
+            var to_send = queued;
+            queued = [];
+            sending = true;
+
+            var answers = [];
+            var questions_by_id = {};
+            $.each(to_send, function (index, item) {
+                answers.push(item.params);
+                questions_by_id[item.question.id] = item.question;
+            });
+
+            $.post(questions_module.globals.question_batch_submission_url, {answers: JSON.stringify(answers)})
+                .done(function (data) {
+                    if (data["status"] !== "success") {
+                        $.event.trigger(questions_module.globals.quiz_error_event);
+                        return;
+                    }
+
+                    $.each(data["questions"], function (index, question_info) {
+                        var question = questions_by_id[question_info.id];
+                        if (question) question.display_answer(question_info);
+                    });
+                })
+                .fail(function (data) {
+                    $.event.trigger(questions_module.globals.quiz_error_event);
+                })
+                .always(function () {
+                    sending = false;
+                    self.flush();
+                });
+        };
+    };
+
     questions_module.SubmissionManager = function (options) {
         var self = this;
         var form_element = $(".submission-form");
@@ -2,6 +2,7 @@ $(document).ready(function () {
     $(".typeahead").each(function (i, e) {
         $element = $(e);
         var prefetch_url = $element.attr("data-prefetch");
+        var remote_url = $element.attr("data-remote");
 
         if (prefetch_url) {
             options = {
@@ -28,6 +29,41 @@ $(document).ready(function () {
               displayKey: 'value',
               source: data_source.ttAdapter()
             });
+        } else if (remote_url) {
+            options = {
+                datumTokenizer: Bloodhound.tokenizers.obj.whitespace("value"),
+                queryTokenizer: Bloodhound.tokenizers.whitespace,
+                limit: 20,
+                remote: {
+                    url: remote_url + "?q=%QUERY&limit=20",
+                    wildcard: "%QUERY",
+                    filter: function (response) {
+                        return $.map(response.results, function(v) { return { "value": v.username, "stage": v.stage }; });
+                    }
+                }
+            };
+            data_source = new Bloodhound(options);
+            data_source.initialize();
+
+            $element.typeahead({
+              hint: true,
+              highlight: true,
+              minLength: 1
+            },
+            {
+              name: 'data_source',
+              displayKey: 'value',
+              source: data_source.ttAdapter(),
+              templates: {
+                suggestion: function (datum) {
+                  var $suggestion = $("<p>").text(datum.value);
+                  if (datum.stage) {
+                    $suggestion.append(" ", $("<small>").addClass("text-muted").text(datum.stage));
+                  }
+                  return $suggestion.prop("outerHTML");
+                }
+              }
+            });
         }
     });
 });
@@ -14,7 +14,9 @@ teaching_block_year_urls = [
     url(r'^edit/$', block.EditBlock.as_view(), name='block-edit'),
     url(r'^activity/all/$', block.BlockActivitiesView.as_view(), name='block-activities'),
     url(r'^download/$', block.DownloadView.as_view(), name="block-download"),
-    url(r'^admin/upload/confirm/$', block.ConfirmUploadForTeachingBlock.as_view(), name='block-activity-upload-confirm'),
+    url(r'^download/job/(?P<pk>\d+)/$', block.DocumentJobView.as_view(), name="block-download-job"),
+    url(r'^download/job/(?P<pk>\d+)/status/$', block.DocumentJobStatusView.as_view(), name="block-download-job-status"),
+    url(r'^download/job/(?P<pk>\d+)/file/$', block.DocumentJobFileView.as_view(), name="block-download-job-file"),
     url(r'^admin/upload/submit/$', block.UploadForTeachingBlock.as_view(), name='block-activity-upload-submit'),
     url(r'^admin/upload/start/$', block.StartUploadForTeachingBlock.as_view(), name='block-activity-upload'),
 ]
@@ -24,7 +26,8 @@ specific_block_admin_urls = [
     url(r'^period/(?P<id>\d+)/remove/$', block.DeleteQuestionWritingPeriod.as_view(), name="block-admin-period-remove"),
     url(r'^period/(?P<id>\d+)/edit/$', block.EditQuestionWritingPeriod.as_view(), name="block-admin-period-edit"),
     url(r'^period/(?P<id>\d+)/upload/start/$', block.StartUploadForWritingPeriod.as_view(), name="block-admin-period-upload"),
-    url(r'^period/(?P<id>\d+)/upload/confirm/$', block.ConfirmUploadForWritingPeriod.as_view(), name='block-admin-period-upload-confirm'),
+    url(r'^period/(?P<id>\d+)/upload/(?P<token>[a-f\d]{32})/$', block.ReviewUploadForWritingPeriod.as_view(), name='block-admin-period-upload-review'),
+    url(r'^period/(?P<id>\d+)/upload/(?P<token>[a-f\d]{32})/confirm/$', block.ConfirmUploadForWritingPeriod.as_view(), name='block-admin-period-upload-confirm'),
     url(r'^period/(?P<id>\d+)/upload/submit/$', block.UploadForWritingPeriod.as_view(), name='block-admin-period-upload-submit'),
 ]
 
@@ -56,6 +59,12 @@ student_urls = [
 admin_urls = [
     url(r'^$', admin.AdminView.as_view(), name='admin'),
     url(r'^email/(?P<code>[a-z\d]{1,10})/(?P<year>\d{4})/$', general.EmailView.as_view(), name='email'),
+    url(r'^email/batch/(?P<pk>\d+)/$', general.EmailBatchView.as_view(), name='email-batch'),
+    url(r'^email/batch/(?P<pk>\d+)/status/$', general.EmailBatchStatusView.as_view(), name='email-batch-status'),
+    url(r'^email/batch/(?P<pk>\d+)/retry/$', general.RetryEmailBatch.as_view(), name='email-batch-retry'),
+    url(r'^export/(?P<pk>\d+)/$', general.QuestionBankExportView.as_view(), name='bank-export'),
+    url(r'^export/(?P<pk>\d+)/status/$', general.QuestionBankExportStatusView.as_view(), name='bank-export-status'),
+    url(r'^export/(?P<pk>\d+)/file/$', general.QuestionBankExportFileView.as_view(), name='bank-export-file'),
     url(r'^dashboard/', general.DashboardAdminView.as_view(), name='dashboard-admin'),
     url(r'^settings/create/$', admin.CreateMissingSettingsView.as_view(), name='admin-settings-create'),
     url(r'^settings/(?P<pk>\d+)/view/$', admin.SettingView.as_view(), name='admin-settings-view'),
@@ -99,6 +108,7 @@ quiz_attempt_urls = [
     url(r"^questions/$", quiz.QuizAttemptQuestionsView.as_view(), name="quiz-attempt-questions"),
     url(r"^submit/$", quiz.SubmitAnswerView.as_view(), name="quiz-attempt-submit"),
     url(r"^submit/all/$", quiz.SubmitAllAnswersView.as_view(), name="quiz-attempt-submit-all"),
+    url(r"^submit/batch/$", quiz.SubmitAnswersView.as_view(), name="quiz-attempt-submit-batch"),
     url(r"^report/$", quiz.QuizAttemptReport.as_view(), name="quiz-attempt-report"),
     url(r'^start/$', quiz.ResumeAttemptView.as_view(), name="quiz-attempt-start"),
     url(r"^resume/$", quiz.ResumeAttemptView.as_view(), name="quiz-attempt-resume"),
@@ -107,6 +117,7 @@ quiz_attempt_urls = [
 specific_quiz_specification_urls = [
     url(r"^$", quiz.QuizSpecificationView.as_view(), name="quiz-specification-view"),
     url(r"^edit/$", quiz.UpdateQuizSpecificationView.as_view(), name="quiz-specification-edit"),
+    url(r"^analyse/$", quiz.AnalyseQuizSpecificationView.as_view(), name="quiz-specification-analyse"),
     url(r"^questions/add/$", quiz.AddQuizSpecificationQuestions.as_view(), name="quiz-specification-questions-add"),
     url(r"^questions/add/confirm/$", quiz.ConfirmQuizSpecificationQuestions.as_view(), name="quiz-specification-questions-add-confirm"),
 ]
@@ -168,12 +168,12 @@ class ViewStudent(GetObjectMixin, DetailView):
         c = super(ViewStudent, self).get_context_data(**kwargs)
         c['student'] = self.object
 
-        questions_written = list(self.object.questions_created.all())
+        questions_written = list(self.object.questions_created.select_related('block_year__block'))
         c['number_questions_written'] = len(questions_written)
 
         blocks_with_questions = {}
         for question in questions_written:
-            questions_for_block =  blocks_with_questions.setdefault(question.teaching_activity_year.block_week.writing_period.block_year, [])
+            questions_for_block =  blocks_with_questions.setdefault(question.block_year, [])
             questions_for_block.append(question)
         c['blocks_with_questions'] = blocks_with_questions
         return c
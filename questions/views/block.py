@@ -4,18 +4,18 @@ from django.contrib.auth.decorators import login_required, permission_required
 from django.views.generic import View, DetailView, ListView, FormView
 from django.views.generic.base import RedirectView
 from django.views.generic.edit import CreateView, UpdateView
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
 from django.conf import settings
 
-from .base import class_view_decorator, user_is_superuser, GetObjectMixin
+from .base import class_view_decorator, user_is_superuser, GetObjectMixin, JsonResponseMixin
 
-import document
-from questions import models, forms
+from questions import models, forms, exports, imports
 
-import datetime, csv, math
+from wsgiref.util import FileWrapper
+import datetime
 
 
 @class_view_decorator(login_required)
@@ -170,67 +170,78 @@ class DownloadView(FormView):
         c['teaching_block_year'] = self.teaching_block_year
         return c
 
-    def build_answer_table(self, data, number_of_columns=3):
-        table_data = []
-        number_of_rows = int(math.ceil(len(data)/float(number_of_columns)))
-        number_of_columns = min(int(math.ceil(len(data)/float(number_of_rows))), number_of_columns)
+    def form_valid(self, form):
+        show_answers = form.cleaned_data['document_type'] == form.ANSWER_TYPE
+        years = form.cleaned_data['years']
+        content_hash, artifact = exports.find_block_document_artifact(self.teaching_block, years, show_answers, self.request.build_absolute_uri)
+        if artifact:
+            return artifact_response(self.request, artifact, self.teaching_block, show_answers)
 
-        for i in range(number_of_columns):
-            for j, d in enumerate(data[i*number_of_rows:(i+1)*number_of_rows]):
-                ll = []
-                try:
-                    ll = table_data[j]
-                except IndexError:
-                    table_data.insert(j, ll)
+        # The document is built by the run_document_jobs command so that this worker is not held up.
+        base_uri = self.request.build_absolute_uri("/")
+        job = models.DocumentJob.objects.get_unfinished_job(self.teaching_block, years, show_answers, base_uri)
+        if not job:
+            job = models.DocumentJob.objects.create(
+                block=self.teaching_block,
+                years=models.DocumentJob.years_string(years),
+                show_answers=show_answers,
+                base_uri=base_uri,
+                requested_by=self.request.user.student,
+            )
 
-                ll += [unicode(j + 1 + i*number_of_rows), d.answer]
+        return redirect(job.get_absolute_url())
 
-        header = []
-        for i in range(number_of_columns):
-            header += ["Question", "Answer"]
-        table_data.insert(0, header)
-        return table_data
 
-    def form_valid(self, form):
-        show_answers = form.cleaned_data['document_type'] == form.ANSWER_TYPE
-        years = form.cleaned_data['years']
-        questions = list(models.Question.objects.get_approved_questions_for_block_and_years(self.teaching_block, years))
-        questions = sorted(questions, key=lambda x: x.unicode_body().strip()[:-1][::-1] if x.unicode_body().strip()[-1] in "?:." else x.unicode_body().strip()[::-1])
+def artifact_response(request, artifact, teaching_block, show_answers):
+    if request.META.get('HTTP_IF_NONE_MATCH') == artifact.etag():
+        return HttpResponseNotModified()
 
-        doc = document.WordDocument()
-        doc.add_heading(self.teaching_block.name)
-        if show_answers:
-            doc.add_heading("Answer grid")
-            doc.add_table(self.build_answer_table(questions), has_heading_row=False)
-            doc.insert_pagebreak(break_type='page', orientation='portrait')
-            doc.add_heading("Questions and explanations")
+    response = StreamingHttpResponse(FileWrapper(artifact.open()), content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+    response['Content-Length'] = artifact.size
+    response['ETag'] = artifact.etag()
+    response['Content-Disposition'] = 'attachment; filename=%sQuestions%s.docx' % (teaching_block.filename(), "Answers" if show_answers else "")
 
-        for question_number, question in enumerate(questions):
-            doc.add_paragraph("Question %s" % (question_number + 1))
-            doc.add_html(question.body)
-            doc.add_list_html(question.options_list())
+    return response
 
-            if show_answers:
-                doc.add_paragraph("Answer: %s" % question.answer)
-                doc.add_paragraph("The following explanations were provided:")
-                doc.add_list(question.unicode_explanation_list())
-                if self.teaching_block.code_includes_week:
-                    doc.add_paragraph("%s.%02d Lecture %d: %s" % (self.teaching_block.code, question.teaching_activity_year.block_week.sort_index, question.teaching_activity_year.position, question.teaching_activity_year.name))
-                else:
-                    doc.add_paragraph("%s %s: %s" % (self.teaching_block.code, question.teaching_activity_year.teaching_activity.get_activity_type_display(), question.teaching_activity_year.name))
 
-                p = doc.add_paragraph("To view this question online, click ")
-                url = self.request.build_absolute_uri(question.get_absolute_url())
-                p.add_hyperlink("here", url)
+class DocumentJobMixin(object):
+    def get_object(self, queryset=None):
+        try:
+            job = models.DocumentJob.objects.select_related('block', 'artifact').get(id=self.kwargs['pk'], block__code=self.kwargs['code'])
+        except models.DocumentJob.DoesNotExist:
+            raise Http404
 
-                doc.add_paragraph("")
+        if not job.is_viewable_by(self.request.user.student):
+            raise Http404
 
+        return job
 
-        response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
-        response['Content-Disposition'] = 'attachment; filename=%sQuestions%s.docx' % (self.teaching_block.filename(), "Answers" if show_answers else "")
-        doc.save(response)
 
-        return response
+@class_view_decorator(login_required)
+class DocumentJobView(DocumentJobMixin, DetailView):
+    template_name = "block/download_job.html"
+    context_object_name = "job"
+
+
+@class_view_decorator(login_required)
+class DocumentJobStatusView(DocumentJobMixin, JsonResponseMixin, View):
+    def get(self, request, *args, **kwargs):
+        return self.render_to_json_response(self.get_object().json_repr())
+
+
+@class_view_decorator(login_required)
+class DocumentJobFileView(DocumentJobMixin, View):
+    def get(self, request, *args, **kwargs):
+        job = self.get_object()
+        if not job.complete:
+            return redirect(job.get_absolute_url())
+
+        if not job.artifact or not job.artifact.file_exists():
+            # The document has been removed from storage since the job finished, so it is built again.
+            job.rebuild()
+            return redirect(job.get_absolute_url())
+
+        return artifact_response(request, job.artifact, job.block, job.show_answers)
 
 
 @class_view_decorator(user_is_superuser)
@@ -381,159 +392,55 @@ class StartUploadForWritingPeriod(FormView):
         return c
 
 
-@class_view_decorator(user_is_superuser)
-class UploadForWritingPeriod(FormView):
+class ActivityUploadMixin(object):
+    """
+        Checks an uploaded activity file and stages the activities in it to be reviewed. Subclasses set
+        self.writing_period to the writing period the activities are uploaded to when they are dispatched.
+    """
     form_class = forms.QuestionWritingPeriodUploadForm
+    template_name = "block/upload_errors.html"
 
-    def dispatch(self, request, *args, **kwargs):
-        try:
-            self.writing_period = models.QuestionWritingPeriod.objects.get_from_kwargs(**kwargs)
-        except models.QuestionWritingPeriod.DoesNotExist:
-            raise Http404
-
-        self.new_activity_years = {}
-        self.errors = {}
-
-        return super(UploadForWritingPeriod, self).dispatch(request, *args, **kwargs)
+    def get_upload_url(self):
+        return self.writing_period.get_activity_upload_url()
 
     def get_context_data(self, **kwargs):
-        c = super(UploadForWritingPeriod, self).get_context_data(**kwargs)
+        c = super(ActivityUploadMixin, self).get_context_data(**kwargs)
         c['writing_period'] = self.writing_period
-        c['new_activity_years'] = self.new_activity_years
-        c['errors'] = self.errors
+        c['errors'] = getattr(self, 'errors', {})
         return c
 
-    def get_template_names(self):
+    def form_valid(self, form):
+        try:
+            rows = imports.read_activity_rows(form.cleaned_data['upload_file'])
+        except imports.MissingColumnError as e:
+            messages.error(self.request, 'That CSV file does not contain a column named "%s". Please try again.' % e.column_name)
+            return redirect(self.get_upload_url())
+
+        staged_activities, self.errors = imports.validate_activity_rows(self.writing_period, rows)
         if any(self.errors.values()):
-            return "block/upload_errors.html"
+            return self.get(self.request)
 
-        return "block/upload_activities_confirm.html"
+        upload = imports.stage_activity_upload(self.writing_period, staged_activities, uploaded_by=self.request.user.student)
+        return redirect(upload.get_absolute_url())
 
-    def form_valid(self, form):
-        upload_file = form.cleaned_data['upload_file']
-
-        rows = list(csv.reader(upload_file.read().splitlines()))
-        column_titles = [title.lower().replace(" ", "_") for title in rows[0]]
-        content_rows = rows[1:]
-
-        # Keeps track of errors so that we can present all of them at once and process
-        # the whole file
-        bad_activity_types = self.errors.setdefault('bad_activity_type', [])
-        bad_reference_id = self.errors.setdefault('bad_reference_id', [])
-        bad_teaching_activity = self.errors.setdefault('bad_teaching_activity', [])
-        bad_activity_year = self.errors.setdefault("bad_activity_year", [])
-        bad_activity_week = self.errors.setdefault("bad_activity_week", [])
-        duplicated_by_position = self.errors.setdefault("duplicated_by_position", [])
-        duplicated_by_name = self.errors.setdefault("duplicated_by_name", [])
-
-        # Create a mapping from reference ID to teaching activity so that we can identify
-        # teaching activities which already exist.
-        existing_teaching_activities = models.TeachingActivity.objects.all()
-        existing_teaching_activities_by_referenceID = dict((activity.reference_id, activity) for activity in existing_teaching_activities)
-        # Lists for the new teaching activity years.
-        self.new_block_weeks = {}
-        new_activity_years_old_activity = self.new_activity_years.setdefault('old_activity', [])
-        new_activity_years_new_activity = self.new_activity_years.setdefault('new_activity', [])
-
-        # Mappings to check for duplicated activity years.
-        new_activity_years_by_position = {}
-        new_activity_years_by_name = {}
-
-        # Check first that we have all the columns which we need.
-        for title, pretty_name in {'reference_id': "Reference ID", 'name': "Name", 'activity_type': "Activity type", 'week': "Week", 'position': "Position"}.items():
-            if title not in column_titles:
-                messages.error(self.request, 'That CSV file does not contain a column named "%s". Please try again.' % pretty_name)
-                return redirect(self.writing_period.get_activity_upload_url())
-
-        for row in content_rows:
-            # Creates a mapping from column heading to row value for that particular column.
-            column_to_value = dict(zip(column_titles, row))
-            # This will be the data we pass to the validation form.
-            data = {}
-
-            activity_type = column_to_value['activity_type']
-            try:
-                activity_type = models.TeachingActivity.get_type_value_from_name(activity_type)
-            except ValueError:
-                bad_activity_types.append(column_to_value)
-                continue
 
-            referenceID = column_to_value['reference_id']
-            try:
-                referenceID = int(referenceID)
-            except ValueError:
-                bad_reference_id.append(column_to_value)
-                continue
-
-            if referenceID in existing_teaching_activities_by_referenceID:
-                activity = existing_teaching_activities_by_referenceID[referenceID]
-                new_activity_year_list = new_activity_years_old_activity
-            else:
-                data = {
-                    'activity_type': activity_type,
-                    'reference_id': referenceID,
-                    'name': column_to_value['name']
-                }
-                activity_form = forms.TeachingActivityValidationForm(data)
-                if activity_form.is_valid():
-                    activity = activity_form.save(commit=False)
-                    new_activity_year_list = new_activity_years_new_activity
-                else:
-                    bad_teaching_activity.append(column_to_value)
-                    continue
-
-            data = {
-                'position': column_to_value['position'],
-            }
-
-            activity_year_form = forms.TeachingActivityYearValidationForm(data)
-            if activity_year_form.is_valid():
-                activity_year = activity_year_form.save(commit=False)
-                activity_year.teaching_activity = activity
-
-                new_activity_year_list.append(activity_year)
-            else:
-                bad_activity_year.append(column_to_value)
-                continue
-
-            data = {
-                'name': str(column_to_value['week'])
-            }
-
-            block_week_form = forms.BlockWeekValidationForm(data)
-            if block_week_form.is_valid():
-                block_week = block_week_form.save(commit=False)
-
-                activity_year.block_week = block_week
-
-                # Keeps track to check that there are no two activities with the same position.
-                activity_year_position = (column_to_value["week"], activity_year.position, activity.activity_type)
-                activities_with_same_position = new_activity_years_by_position.setdefault(activity_year_position, [])
-                activities_with_same_position.append(activity_year)
-
-                # Keeps track to check that we haven't made a mistake and there are no two activities with the same name.
-                activities_with_same_name = new_activity_years_by_name.setdefault(activity.name.lower(), [])
-                activities_with_same_name.append(activity_year)
-            else:
-                bad_activity_week.append(column_to_value)
-                continue
-
-        for activities_with_same_position in new_activity_years_by_position.values():
-            if len(activities_with_same_position) > 1:
-                duplicated_by_position += activities_with_same_position
-
-        for activities_with_same_name in new_activity_years_by_name.values():
-            if len(activities_with_same_name) > 1:
-                duplicated_by_name += activities_with_same_name
-
-        for activity_list in self.new_activity_years.values():
-            activity_list.sort(key=lambda a: (a.block_week.name, a.position))
-
-        return self.get(self.request)
+@class_view_decorator(user_is_superuser)
+class UploadForWritingPeriod(ActivityUploadMixin, FormView):
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.writing_period = models.QuestionWritingPeriod.objects.get_from_kwargs(**kwargs)
+        except models.QuestionWritingPeriod.DoesNotExist:
+            raise Http404
+
+        return super(UploadForWritingPeriod, self).dispatch(request, *args, **kwargs)
 
 
 @class_view_decorator(user_is_superuser)
-class UploadForTeachingBlock(FormView):
+class UploadForTeachingBlock(ActivityUploadMixin, FormView):
+    """
+        Uploads activities to a teaching block year. Activities belong to a week in a writing period, so this is only
+        possible when the block year has exactly one writing period.
+    """
     form_class = forms.TeachingBlockActivityUploadForm
 
     def dispatch(self, request, *args, **kwargs):
@@ -542,271 +449,66 @@ class UploadForTeachingBlock(FormView):
         except models.TeachingBlockYear.DoesNotExist:
             raise Http404
 
-        return super(UploadForTeachingBlock, self).dispatch(request, *args, **kwargs)
-
-    def get_context_data(self, **kwargs):
-        c = super(UploadForTeachingBlock, self).get_context_data(**kwargs)
-        c['teaching_block_year'] = self.teaching_block_year
-        c['new_activity_years'] = self.new_activity_years
-        c['errors'] = self.errors
-        return c
-
-    def get_template_names(self):
-        if any(self.errors.values()):
-            return "block/upload_errors.html"
+        writing_periods = list(self.teaching_block_year.writing_periods.all()[:2])
+        if len(writing_periods) != 1:
+            messages.error(request, "Activities can only be uploaded to a block with a single question writing period. Please upload them to one of its writing periods instead.")
+            return redirect(self.teaching_block_year.get_admin_url())
+        self.writing_period = writing_periods[0]
 
-        return "block/upload_activities_confirm.html"
-
-    def form_valid(self, form):
-        upload_file = form.cleaned_data['upload_file']
-
-        rows = list(csv.reader(upload_file.read().splitlines()))
-        column_titles = [title.lower().replace(" ", "_") for title in rows[0]]
-        content_rows = rows[1:]
-
-        # Keeps track of errors so that we can present all of them at once instead of
-        # presenting them individually.
-        self.errors = {}
-        bad_activity_types = self.errors.setdefault('bad_activity_type', [])
-        bad_reference_id = self.errors.setdefault('bad_reference_id', [])
-        bad_teaching_activity = self.errors.setdefault('bad_teaching_activity', [])
-        bad_activity_year = self.errors.setdefault("bad_activity_year", [])
-        duplicated_by_position = self.errors.setdefault("duplicated_by_position", [])
-        duplicated_by_name = self.errors.setdefault("duplicated_by_name", [])
-
-        # Create a mapping from reference ID to teaching activity so that we can identify
-        # teaching activities which already exist.
-        existing_teaching_activities = models.TeachingActivity.objects.all()
-        existing_teaching_activities_by_referenceID = dict((activity.reference_id, activity) for activity in existing_teaching_activities)
-        # Lists for the new teaching activity years.
-        self.new_block_weeks = {}
-        self.new_activity_years = {}
-        new_activity_years_old_activity = self.new_activity_years.setdefault('old_activity', [])
-        new_activity_years_new_activity = self.new_activity_years.setdefault('new_activity', [])
-
-        # Mappings to check for duplicated activity years.
-        new_activity_years_by_position = {}
-        new_activity_years_by_name = {}
-
-        for title, pretty_name in {'reference_id': "Reference ID", 'name': "Name", 'activity_type': "Activity type", 'week': "Week", 'position': "Position"}.items():
-            if title not in column_titles:
-                messages.error(self.request, 'That CSV file does not contain a column named "%s". Please try again.' % pretty_name)
-                return redirect(self.teaching_block_year.get_activity_upload_url())
-
-        for row in content_rows:
-            # Creates a mapping from column heading to row value for that particular column.
-            column_to_value = dict(zip(column_titles, row))
-            # This will be the data we pass to the validation form.
-            data = {}
-
-            activity_type = column_to_value['activity_type']
-            try:
-                activity_type = models.TeachingActivity.get_type_value_from_name(activity_type)
-            except ValueError:
-                bad_activity_types.append(column_to_value)
-                continue
+        return super(UploadForTeachingBlock, self).dispatch(request, *args, **kwargs)
 
-            referenceID = column_to_value['reference_id']
-            try:
-                referenceID = int(referenceID)
-            except ValueError:
-                bad_reference_id.append(column_to_value)
-                continue
-
-            if referenceID in existing_teaching_activities_by_referenceID:
-                activity = existing_teaching_activities_by_referenceID[referenceID]
-                new_activity_year_list = new_activity_years_old_activity
-            else:
-                data = {
-                    'activity_type': activity_type,
-                    'reference_id': referenceID,
-                    'name': column_to_value['name']
-                }
-                activity_form = forms.TeachingActivityValidationForm(data)
-                if activity_form.is_valid():
-                    activity = activity_form.save(commit=False)
-                    new_activity_year_list = new_activity_years_new_activity
-                else:
-                    bad_teaching_activity.append(column_to_value)
-                    continue
-
-            data = {
-                'position': column_to_value['position'],
-            }
-
-            activity_year_form = forms.TeachingActivityYearValidationForm(data)
-            if activity_year_form.is_valid():
-                activity_year = activity_year_form.save(commit=False)
-                activity_year.teaching_activity = activity
-
-                # Keeps track to check that there are no two activities with the same position.
-                activity_year_position = (activity_year.week, activity_year.position, activity.activity_type)
-                activities_with_same_position = new_activity_years_by_position.setdefault(activity_year_position, [])
-                activities_with_same_position.append(activity_year)
-
-                # Keeps track to check that we haven't made a mistake and there are no two activities with the same name.
-                activities_with_same_name = new_activity_years_by_name.setdefault(activity.name.lower(), [])
-                activities_with_same_name.append(activity_year)
-
-                new_activity_year_list.append(activity_year)
-            else:
-                bad_activity_year.append(column_to_value)
-
-        for activities_with_same_position in new_activity_years_by_position.values():
-            if len(activities_with_same_position) > 1:
-                duplicated_by_position += activities_with_same_position
-
-        for activities_with_same_name in new_activity_years_by_name.values():
-            if len(activities_with_same_name) > 1:
-                duplicated_by_name += activities_with_same_name
-
-        for activity_list in self.new_activity_years.values():
-            activity_list.sort(key=lambda a: (a.week, a.position))
-
-        return self.get(self.request)
+    def get_upload_url(self):
+        return self.teaching_block_year.get_activity_upload_url()
 
 
-@class_view_decorator(user_is_superuser)
-class ConfirmUploadForWritingPeriod(View):
-    def post(self, request, *args, **kwargs):
-        post = request.POST
+class StagedUploadMixin(object):
+    def dispatch(self, request, *args, **kwargs):
         try:
-            self.writing_period = models.QuestionWritingPeriod.objects.get_from_kwargs(**kwargs)
-        except models.QuestionWritingPeriod.DoesNotExist:
+            self.upload = models.ActivityUpload.objects.get_from_kwargs(**kwargs)
+        except (models.ActivityUpload.DoesNotExist, ValueError):
             raise Http404
 
-        existing_teaching_activities = models.TeachingActivity.objects.all()
-        existing_teaching_activities_by_referenceID = dict((activity.reference_id, activity) for activity in existing_teaching_activities)
+        if self.upload.committed:
+            messages.info(request, "Those activities have already been saved.")
+            return redirect(self.upload.writing_period.block_year.get_admin_url())
 
-        every_referenceID = post.getlist('reference_id')
+        if self.upload.expired:
+            messages.error(request, "That upload has expired. Please upload the file again.")
+            return redirect(self.upload.writing_period.get_activity_upload_url())
 
-        activity_years_by_category = {}
-        block_week_names = []
-        block_weeks_by_name = {}
+        return super(StagedUploadMixin, self).dispatch(request, *args, **kwargs)
 
-        new_activity_years_with_activities = []
-        new_weeks = []
 
-        for referenceID in every_referenceID:
-            try:
-                referenceID = int(referenceID)
-            except ValueError:
-                messages.error(request, "An unexpected error has occurred.")
-                return redirect(self.writing_period.get_activity_upload_url())
-
-            week = post.get("week_%s" % referenceID)
-            activity_years = activity_years_by_category.setdefault(week, [])
-            activity_years.append({
-                'reference_id': referenceID,
-                'name': post.get("name_%s" % referenceID),
-                'activity_type': post.get("activity_type_%s" % referenceID),
-                'position': post.get('position_%s' % referenceID),
-            })
-
-            block_week_names.append(week)
-
-        block_week_names = list(set(block_week_names))
-        block_week_names.sort()
-        for n, week_name in enumerate(block_week_names):
-            data =  {
-                'name': week_name,
-                'sort_index': n + 1
-            }
-
-            block_week_form = forms.NewBlockWeekForm(data)
-            if block_week_form.is_valid():
-                block_week = block_week_form.save(commit=False)
-                block_week.writing_period = self.writing_period
-                block_weeks_by_name[week_name] = block_week
-                new_weeks.append(block_week)
-            else:
-                messages.error(request, "An unexpected error has occurred.")
-                return redirect(self.writing_period.get_activity_upload_url())
-
-        for week_name, activity_years in activity_years_by_category.items():
-            for activity_year_information in activity_years:
-                if activity_year_information["reference_id"] in existing_teaching_activities_by_referenceID:
-                    activity = existing_teaching_activities_by_referenceID[activity_year_information["reference_id"]]
-                else:
-                    activity_form = forms.NewTeachingActivityForm(activity_year_information)
-                    if activity_form.is_valid():
-                        activity = activity_form.save(commit=False)
-                    else:
-                        messages.error(request, "An unexpected error has occurred.")
-                        return redirect(self.writing_period.get_activity_upload_url())
-
-                activity_year_form = forms.NewTeachingActivityYearForm(activity_year_information)
-                if activity_year_form.is_valid():
-                    activity_year = activity_year_form.save(commit=False)
-                    new_activity_years_with_activities.append((activity, activity_year, week_name))
-                else:
-                    messages.error(request, "An unexpected error has occurred.")
-                    return redirect(self.writing_period.get_activity_upload_url())
-
-        for block_week in new_weeks:
-            block_week.save()
-
-        for activity, activity_year, week_name in new_activity_years_with_activities:
-            activity.save()
-            activity_year.teaching_activity = activity
-            activity_year.block_week = block_weeks_by_name[week_name]
-            activity_year.save()
+@class_view_decorator(user_is_superuser)
+class ReviewUploadForWritingPeriod(StagedUploadMixin, ListView):
+    template_name = "block/upload_activities_confirm.html"
+    paginate_by = 100
+    status_names = dict((name.lower(), status) for status, name in models.StagedActivity.STATUS_CHOICES)
 
-        return redirect(self.writing_period.block_year.get_admin_url())
+    def get_queryset(self):
+        activities = self.upload.activities.all()
 
+        status = self.status_names.get(self.request.GET.get('status'))
+        if status is not None:
+            activities = activities.filter(status=status)
 
-@class_view_decorator(user_is_superuser)
-class ConfirmUploadForTeachingBlock(View):
-    def post(self, request, *args, **kwargs):
-        post = request.POST
-        try:
-            self.teaching_block_year = models.TeachingBlockYear.objects.get_from_kwargs(**kwargs)
-        except models.TeachingBlockYear.DoesNotExist:
-            raise Http404
+        return activities
 
-        existing_teaching_activities = models.TeachingActivity.objects.filter(years__block_week__writing_period__block_year__block=self.teaching_block_year.block)
-        existing_teaching_activities_by_referenceID = dict((activity.reference_id, activity) for activity in existing_teaching_activities)
+    def get_context_data(self, **kwargs):
+        c = super(ReviewUploadForWritingPeriod, self).get_context_data(**kwargs)
+        c['upload'] = self.upload
+        c['writing_period'] = self.upload.writing_period
+        c['status_counts'] = self.upload.status_counts()
+        c['current_status'] = self.request.GET.get('status', "")
+        return c
 
-        every_referenceID = post.getlist('reference_id')
 
-        for referenceID in every_referenceID:
-            try:
-                referenceID = int(referenceID)
-            except ValueError:
-                messages.error(request, "An unexpected error has occurred.")
-                return redirect(self.teaching_block_year.get_activity_upload_url())
-
-            # Build up the data required to create a teaching activity.
-            if referenceID in existing_teaching_activities_by_referenceID:
-                activity = existing_teaching_activities_by_referenceID[referenceID]
-            else:
-                data = {
-                    'reference_id': referenceID,
-                    'name': post.get("name_%s" % referenceID),
-                    'activity_type': post.get("activity_type_%s" % referenceID),
-                }
-                activity_form = forms.NewTeachingActivityForm(data)
-                if activity_form.is_valid():
-                    activity = activity_form.save(commit=False)
-                else:
-                    messages.error(request, "An unexpected error has occurred.")
-                    return redirect(self.teaching_block_year.get_activity_upload_url())
-
-            # Now build up data to create a teaching activity year.
-            data = {
-                'block_year': self.teaching_block_year.id,
-                'week': post.get('week_%s' % referenceID),
-                'position': post.get('position_%s' % referenceID),
-            }
-
-            activity_year_form = forms.NewTeachingActivityYearForm(data)
-            if activity_year_form.is_valid():
-                activity_year = activity_year_form.save(commit=False)
-                activity.save()
-                activity_year.teaching_activity = activity
-                activity_year.save()
-            else:
-                messages.error(request, "An unexpected error has occurred.")
-                return redirect(self.teaching_block_year.get_activity_upload_url())
+@class_view_decorator(user_is_superuser)
+class ConfirmUploadForWritingPeriod(StagedUploadMixin, View):
+    def post(self, request, *args, **kwargs):
+        if imports.commit_activity_upload(self.upload):
+            messages.success(request, "The activities were saved successfully.")
+        else:
+            messages.info(request, "Those activities have already been saved.")
 
-        return redirect(self.teaching_block_year.get_admin_url())
+        return redirect(self.upload.writing_period.block_year.get_admin_url())
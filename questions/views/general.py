@@ -1,17 +1,18 @@
 from __future__ import unicode_literals
 
 from django.contrib.auth.decorators import login_required, permission_required
-from django.views.generic import FormView, TemplateView, ListView
+from django.views.generic import View, FormView, TemplateView, ListView, DetailView
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
 from django.conf import settings
-from django.core.mail import EmailMessage, send_mass_mail, get_connection, EmailMultiAlternatives
+from django.http import Http404, StreamingHttpResponse
 
-from .base import class_view_decorator, user_is_superuser
+from .base import class_view_decorator, user_is_superuser, JsonResponseMixin
 
-from questions import models, forms
+from questions import models, forms, emails
 
+from wsgiref.util import FileWrapper
 import datetime
 
 @class_view_decorator(login_required)
@@ -103,10 +104,10 @@ class EmailView(FormView):
 
 
     def get_recipients(self):
-        recipients = models.Student.objects.filter(assigned_activities__block_week__writing_period__block_year=self.tb).distinct()
+        recipients = models.Student.objects.filter(assigned_activities__block_week__writing_period__block_year=self.tb)
         if 'document' in self.request.GET:
-            recipients = recipients.filter(questions_created__teaching_activity_year__block_week__writing_period__block_year=self.tb).distinct()
-        return recipients
+            recipients = recipients.filter(questions_created__block_year=self.tb)
+        return list(recipients.order_by('user__email').values_list('user__email', flat=True).distinct())
 
 
     def get_context_data(self, **kwargs):
@@ -125,31 +126,93 @@ class EmailView(FormView):
 
     def form_valid(self, form):
         c = form.cleaned_data
-        recipients = [s.user.email for s in self.get_recipients()]
+        recipients = self.get_recipients()
         if self.request.user.email not in recipients:
             recipients.append(self.request.user.email)
-        tags = {
-            '<strong>': '<strong style="font-weight:bold">',
-            '<p>': '<p style="font-family:%s,Helvetica,Arial,sans-serif;font-size:14px;margin: 0 0 10px;">' % ("'Helvetica Neue'",),
-            '<a href="': '<a style="color:#428bca;text-decoration:none;" href="',
-            '\r': '',
-            '\r\n': '',
-            '\n': ''
-        }
-
-        for tag in tags:
-            c['email'] = c['email'].replace(tag, tags[tag])
-
-        subject = "[MedBank] %s" % c['subject']
-        body = '<html><body style="font-family:%s,Helvetica,Arial,sans-serif;font-size:14px;">%s</body></html>' % ("'Helvetica Neue'", c['email'])
-        from_email = "SUMS MedBank <medbank@sydneymedsoc.org.au>"
-        c = get_connection(fail_silently=False)
-
-        email_messages = tuple(EmailMessage(subject, body, from_email, [r, ]) for r in recipients)
-        for m in email_messages:
-            m.content_subtype = 'html'
-        c.send_messages(email_messages)
+
+        # The email is the same for every recipient, so it is rendered once and sent by the send_email_batches
+        # management command rather than during the request.
+        batch = models.EmailBatch.objects.create(
+            block_year=self.tb,
+            subject="[MedBank] %s" % c['subject'],
+            body=emails.render_bulk_email(c['email']),
+            from_email="SUMS MedBank <medbank@sydneymedsoc.org.au>",
+            recipients="\n".join(recipients),
+            sent_by=self.request.user.student,
+        )
 
         messages.success(self.request, "Your email has been successfully queued to be sent.")
-        return redirect('admin')
+        return redirect(batch.get_absolute_url())
+
+
+class EmailBatchMixin(object):
+    def get_object(self, queryset=None):
+        try:
+            return models.EmailBatch.objects.select_related('block_year__block').get(id=self.kwargs['pk'])
+        except models.EmailBatch.DoesNotExist:
+            raise Http404
+
+
+@class_view_decorator(user_is_superuser)
+class EmailBatchView(EmailBatchMixin, DetailView):
+    template_name = "admin/email_batch.html"
+    context_object_name = "batch"
+
+
+@class_view_decorator(user_is_superuser)
+class EmailBatchStatusView(EmailBatchMixin, JsonResponseMixin, View):
+    def get(self, request, *args, **kwargs):
+        return self.render_to_json_response(self.get_object().json_repr())
+
+
+@class_view_decorator(user_is_superuser)
+class RetryEmailBatch(EmailBatchMixin, View):
+    def post(self, request, *args, **kwargs):
+        batch = self.get_object()
+        if batch.retry():
+            messages.success(request, "The email will be sent to the remaining recipients.")
+        return redirect(batch.get_absolute_url())
+
+
+class QuestionBankExportMixin(object):
+    def get_object(self, queryset=None):
+        try:
+            return models.QuestionBankExport.objects.get(id=self.kwargs['pk'])
+        except models.QuestionBankExport.DoesNotExist:
+            raise Http404
+
+
+@class_view_decorator(user_is_superuser)
+class QuestionBankExportView(QuestionBankExportMixin, DetailView):
+    template_name = "admin/bank_export.html"
+    context_object_name = "export"
+
+    def get_context_data(self, **kwargs):
+        c = super(QuestionBankExportView, self).get_context_data(**kwargs)
+        c['blocks'] = self.object.blocks.order_by('code')
+        return c
+
+
+@class_view_decorator(user_is_superuser)
+class QuestionBankExportStatusView(QuestionBankExportMixin, JsonResponseMixin, View):
+    def get(self, request, *args, **kwargs):
+        return self.render_to_json_response(self.get_object().json_repr())
+
+
+@class_view_decorator(user_is_superuser)
+class QuestionBankExportFileView(QuestionBankExportMixin, View):
+    def get(self, request, *args, **kwargs):
+        export = self.get_object()
+        if not export.complete:
+            return redirect(export.get_absolute_url())
+
+        if not export.file_exists():
+            # The zip file has been removed from storage since the export finished, so it is built again.
+            export.rebuild()
+            return redirect(export.get_absolute_url())
+
+        response = StreamingHttpResponse(FileWrapper(export.open()), content_type="application/zip")
+        response['Content-Length'] = export.size
+        response['Content-Disposition'] = 'attachment; filename=QuestionBank%s.zip' % ("Answers" if export.show_answers else "")
+        return response
 
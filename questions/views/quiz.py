@@ -6,7 +6,7 @@ from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
 from django.http import HttpResponse, Http404
 
-from questions import models, forms
+from questions import models, forms, item_analysis
 from .base import class_view_decorator, user_is_superuser, GetObjectMixin, JsonResponseMixin
 from django.contrib.auth.decorators import login_required
 
@@ -24,17 +24,13 @@ class QuizDashboard(TemplateView):
             c['latest_quiz_attempt'] = models.QuizAttempt.objects.get_latest_quiz_attempt_for_student(self.request.user.student)
         except models.QuizAttempt.DoesNotExist:
             pass
-        question_attempts = models.QuestionAttempt.objects.get_question_attempts_for_student(self.request.user.student)
-        scores = []
-        question_attempts_by_quiz_attempt = {}
-        for question_attempt in question_attempts:
-            l = question_attempts_by_quiz_attempt.setdefault(question_attempt.quiz_attempt, [])
-            l.append(question_attempt)
-
-        for question_list in question_attempts_by_quiz_attempt.values():
-            if len(question_list) == 0: continue
-            scores.append(float(sum(question.score() for question in question_list))/len(question_list))
-        c['average_score'] = 100*float(sum(scores))/len(scores) if len(scores) > 0 else None
+        try:
+            quiz_stats = models.StudentQuizStats.objects.get(student=self.request.user.student)
+        except models.StudentQuizStats.DoesNotExist:
+            quiz_stats = models.StudentQuizStats(student=self.request.user.student)
+        c['quiz_stats'] = quiz_stats
+        c['average_score'] = quiz_stats.average_score
+        c['block_scores'] = quiz_stats.block_scores()
         return c
 
 
@@ -191,10 +187,15 @@ class QuizView(TemplateView):
         quiz_type = self.current_type_form.cleaned_data["quiz_type"]
 
         question_list = []
-        quiz_specification = None
         if isinstance(self.current_form, self.get_preset_form_class()):
             quiz_specification = self.current_form.cleaned_data["quiz_specification"]
-            question_list = list(quiz_specification.get_questions())
+            question_ids = quiz_specification.get_question_ids()
+            if not question_ids:
+                messages.warning(self.request, "Unfortunately there were no questions which matched those parameters.")
+                return redirect("quiz-choose")
+
+            attempt = models.QuizAttempt.create_from_specification_and_student(quiz_specification, self.request.user.student, quiz_type=quiz_type, question_ids=question_ids)
+            return redirect(attempt.get_start_url(quiz_type))
         else:
             cleaned_data = self.current_form.cleaned_data
             unique_questions_only = not cleaned_data['repeat_questions']
@@ -204,16 +205,13 @@ class QuizView(TemplateView):
                 return redirect("quiz-choose")
 
             random.seed()
+            attempted_question_ids = models.Question.objects.get_question_ids_attempted_by(self.request.user.student) if unique_questions_only else None
+            question_ids = []
             for block in self.get_allowed_blocks():
                 number_of_questions = cleaned_data[block.name_for_form_fields()]
                 if number_of_questions:
-                    questions_for_block = models.Question.objects.filter(teaching_activity_year__block_week__writing_period__block_year__block=block, status=models.Question.APPROVED_STATUS).distinct()
-                    if unique_questions_only:
-                        questions_for_block = questions_for_block.exclude(attempts__quiz_attempt__student=self.request.user.student)
-                    questions_for_block = list(questions_for_block)
-                    if len(questions_for_block) < number_of_questions:
-                        number_of_questions = len(questions_for_block)
-                    question_list += random.sample(questions_for_block, number_of_questions)
+                    question_ids += models.Question.objects.sample_approved_question_ids_for_block(block, number_of_questions, excluded_ids=attempted_question_ids)
+            question_list = models.Question.objects.get_approved_questions_in_order(question_ids)
 
         random.seed()
         random.shuffle(question_list)
@@ -221,7 +219,7 @@ class QuizView(TemplateView):
             messages.warning(self.request, "Unfortunately there were no questions which matched those parameters.")
             return redirect("quiz-choose")
 
-        attempt = models.QuizAttempt.create_from_list_and_student(question_list, self.request.user.student, quiz_type=quiz_type, quiz_specification=None)
+        attempt = models.QuizAttempt.create_from_list_and_student(question_list, self.request.user.student, quiz_type=quiz_type)
 
         return redirect(attempt.get_start_url(quiz_type))
 
@@ -256,6 +254,7 @@ class ResumeAttemptView(GetObjectMixin, DetailView):
         c['quiz_attempt_report_url'] = self.object.get_report_url()
         if self.object.quiz_type == models.QuizAttempt.INDIVIDUAL_QUIZ_TYPE:
             c['quiz_attempt_question_submission_url'] = self.object.get_answer_submission_url()
+            c['quiz_attempt_batch_submission_url'] = self.object.get_batch_submission_url()
         elif self.object.quiz_type == models.QuizAttempt.CLASSIC_QUIZ_TYPE:
             c['quiz_attempt_submission_url'] = self.object.get_submission_url()
         return c
@@ -282,10 +281,15 @@ class QuizAttemptQuestionsView(JsonResponseMixin, View):
 
         data["status"] = "success"
         questions = []
-        question_attempts = attempt.questions_in_order()
+        question_attempts = list(attempt.questions_in_order().select_related('question__teaching_activity_year__teaching_activity'))
+        completed_questions = [question_attempt.question for question_attempt in question_attempts if question_attempt.date_completed]
+        incomplete_questions = [question_attempt.question for question_attempt in question_attempts if not question_attempt.date_completed]
+        completed_json = models.Question.objects.get_cached_json_reprs(completed_questions, include_answer=True)
+        incomplete_json = models.Question.objects.get_cached_json_reprs(incomplete_questions, include_answer=False)
+
         for question_attempt in question_attempts:
             completed = question_attempt.date_completed is not None
-            question = question_attempt.question.json_repr(include_answer=completed)
+            question = dict((completed_json if completed else incomplete_json)[question_attempt.question_id])
             question["position"] = question_attempt.position
             question["completed"] = completed
             if completed:
@@ -297,6 +301,14 @@ class QuizAttemptQuestionsView(JsonResponseMixin, View):
         return self.render_to_json_response(data)
 
 
+def completed_question_json(question_attempt):
+    data = dict(models.Question.objects.get_cached_json_reprs([question_attempt.question, ], include_answer=True)[question_attempt.question_id])
+    data["completed"] = True
+    data["confidence_rating"] = question_attempt.confidence_rating
+    data["choice"] = question_attempt.answer
+    return data
+
+
 @class_view_decorator(login_required)
 class SubmitAllAnswersView(RedirectView):
     permanent = False
@@ -312,14 +324,14 @@ class SubmitAllAnswersView(RedirectView):
             messages.error(self.request, "Unfortunately you do not have permission to be able to submit answers for that particular quiz attempt.")
             return reverse('quiz-home')
 
-        date_completed = datetime.datetime.now()
-        for question_attempt in attempt.incomplete_questions():
-            question_id = question_attempt.question.id
-            question_attempt.answer = self.request.POST.get("question-%s-choice" % question_id) or models.QuestionAttempt.DEFAULT_ANSWER
-            question_attempt.confidence_rating = self.request.POST.get("question-%s-confidence_rating" % question_id) or models.QuestionAttempt.DEFAULT_CONFIDENCE
-            question_attempt.time_taken = self.request.POST.get("question-%s-time_taken" % question_id) or 0
-            question_attempt.date_completed = date_completed
-            question_attempt.save()
+        answers = {}
+        for question_id in attempt.incomplete_questions().values_list('question', flat=True):
+            answers[question_id] = {
+                "choice": self.request.POST.get("question-%s-choice" % question_id),
+                "confidence_rating": self.request.POST.get("question-%s-confidence_rating" % question_id),
+                "time_taken": self.request.POST.get("question-%s-time_taken" % question_id),
+            }
+        attempt.submit_answers(answers)
 
         return attempt.get_report_url()
 
@@ -358,21 +370,43 @@ class SubmitAnswerView(JsonResponseMixin, View):
             data = {"status": "error", "message": "Question already answered for this quiz."}
             return self.render_to_json_response(data)
 
-        question_attempt.answer = request.POST.get("choice", question_attempt.DEFAULT_ANSWER)
-        question_attempt.confidence_rating = request.POST.get("confidence_rating", question_attempt.DEFAULT_CONFIDENCE)
-        question_attempt.time_taken = request.POST.get("time_taken", 0)
-        # question_attempt.save()
-        question_attempt.date_completed = datetime.datetime.now()
-        question_attempt.save()
-
-        question = question_attempt.question
+        completed = attempt.submit_answers({question_attempt.question_id: request.POST})
+        if not completed:
+            data = {"status": "error", "message": "Question already answered for this quiz."}
+            return self.render_to_json_response(data)
 
-        data = question.json_repr(include_answer=True)
+        data = completed_question_json(completed[0])
         data["status"] = "success"
-        data["completed"] = True
-        data["status"] = "success"
-        data["confidence_rating"] = question_attempt.confidence_rating
-        data["choice"] = question_attempt.answer
+
+        return self.render_to_json_response(data)
+
+
+@class_view_decorator(login_required)
+class SubmitAnswersView(JsonResponseMixin, View):
+    # Accepts several answers at once as a JSON list in the answers parameter, so that answers which have been queued
+    # by the client can be submitted together.
+    def post(self, request, *args, **kwargs):
+        try:
+            attempt = models.QuizAttempt.objects.get_from_kwargs(**kwargs)
+        except models.QuizAttempt.DoesNotExist:
+            data = {'status': 'error', 'message': 'Not found.'}
+            return self.render_to_json_response(data)
+
+        if not attempt.is_viewable_by(self.request.user.student):
+            data = {'status': 'error', 'message': 'Permission denied.'}
+            return self.render_to_json_response(data)
+
+        try:
+            answers = dict((int(answer["question_id"]), answer) for answer in json.loads(request.POST.get("answers", "")))
+        except (ValueError, TypeError, KeyError):
+            data = {"status": "error", "message": "The answers could not be read."}
+            return self.render_to_json_response(data)
+
+        attempt.submit_answers(answers)
+
+        # Questions which were already completed are returned as well, so that resubmitting a queue is harmless.
+        question_attempts = attempt.questions.filter(question__id__in=answers.keys(), date_completed__isnull=False).select_related('question')
+        data = {"status": "success", "questions": [completed_question_json(question_attempt) for question_attempt in question_attempts]}
 
         return self.render_to_json_response(data)
 
@@ -383,7 +417,7 @@ class QuizAdminView(TemplateView):
 
     def get_context_data(self, **kwargs):
         c = super(QuizAdminView, self).get_context_data(**kwargs)
-        c['quiz_specifications'] = models.QuizSpecification.objects.order_by('stage')
+        c['quiz_specifications'] = models.QuizSpecification.objects.select_related('stage', 'stats').order_by('stage')
         return c
 
 
@@ -414,9 +448,42 @@ class QuizSpecificationView(DetailView):
     def get_context_data(self, **kwargs):
         c = super(QuizSpecificationView, self).get_context_data(**kwargs)
         c['specification'] = self.object
+
+        questions = list(self.object.get_questions_in_order().select_related('block_year__block'))
+        try:
+            analysis = self.object.analysis
+        except models.QuizSpecificationAnalysis.DoesNotExist:
+            analysis = None
+        else:
+            items = analysis.items_by_question()
+            for question in questions:
+                question.item_analysis = items.get(question.id)
+
+        c['questions'] = questions
+        c['analysis'] = analysis
         return c
 
 
+@class_view_decorator(user_is_superuser)
+class AnalyseQuizSpecificationView(RedirectView):
+    permanent = False
+
+    def get_redirect_url(self, slug):
+        try:
+            specification = models.QuizSpecification.objects.get_from_kwargs(**{'slug': slug})
+        except models.QuizSpecification.DoesNotExist:
+            messages.error(self.request, "That quiz specification does not exist.")
+            return reverse('quiz-admin')
+
+        if self.request.method != "POST":
+            messages.error(self.request, "Sorry, an unexpected error occurred. Please try again.")
+        else:
+            analysis = item_analysis.update_analysis_for_specification(specification)
+            messages.success(self.request, "The item analysis was recalculated from %d attempts." % analysis.number_of_attempts)
+
+        return specification.get_absolute_url()
+
+
 @class_view_decorator(user_is_superuser)
 class AddQuizSpecificationQuestions(FormView):
     template_name = "quiz/specification/add_questions.html"